@@ -1,6 +1,5 @@
 # Placeholder for configuration loading (API keys etc.)
 import os
-import yaml
 from pathlib import Path
 # Remove streamlit import
 # import streamlit as st
@@ -33,6 +32,7 @@ def _load_yaml_config(config_path: Path, default_config: dict) -> dict:
     """Loads configuration from a YAML file, falling back to defaults."""
     if config_path.exists():
         try:
+            import yaml # Imported on first load; only needed when a config file exists
             with open(config_path, 'r') as f:
                 config_data = yaml.safe_load(f)
                 print(f"Successfully loaded configuration from {config_path}")
@@ -56,25 +56,31 @@ def _load_yaml_config(config_path: Path, default_config: dict) -> dict:
         print(f"Warning: Configuration file not found at {config_path}. Using defaults.")
         return default_config
 
-# Load Logging Config
-LOGGING_CONFIG = _load_yaml_config(PROJECT_ROOT / "logging_config.yaml", DEFAULT_LOGGING_CONFIG)
-
-# Load Application Config
-_APP_CONFIG = _load_yaml_config(PROJECT_ROOT / "config.yaml", DEFAULT_APP_CONFIG)
+# The YAML files are loaded on first use rather than at import time, so importing this module is
+# cheap and processes only pay for (and print) the configuration they actually read.
+_LOGGING_CONFIG = None
+_APP_CONFIG = None
 
 # --- Configuration Accessors ---
 
 def get_logging_config() -> dict:
-    """Returns the loaded logging configuration."""
-    return LOGGING_CONFIG
+    """Returns the logging configuration, loading logging_config.yaml on first use."""
+    global _LOGGING_CONFIG
+    if _LOGGING_CONFIG is None:
+        _LOGGING_CONFIG = _load_yaml_config(PROJECT_ROOT / "logging_config.yaml", DEFAULT_LOGGING_CONFIG)
+    return _LOGGING_CONFIG
 
 def get_app_config() -> dict:
-    """Returns the loaded application configuration."""
+    """Returns the application configuration, loading config.yaml on first use."""
+    global _APP_CONFIG
+    if _APP_CONFIG is None:
+        _APP_CONFIG = _load_yaml_config(PROJECT_ROOT / "config.yaml", DEFAULT_APP_CONFIG)
+        _print_config_summary(_APP_CONFIG)
     return _APP_CONFIG
 
 def get_nifi_servers() -> list[dict]:
     """Returns the list of configured NiFi servers."""
-    return _APP_CONFIG.get('nifi', {}).get('servers', [])
+    return get_app_config().get('nifi', {}).get('servers', [])
 
 def get_nifi_server_config(server_id: str) -> dict | None:
     """Finds and returns the configuration for a specific NiFi server by its ID."""
@@ -84,25 +90,113 @@ def get_nifi_server_config(server_id: str) -> dict | None:
     print(f"Warning: NiFi server configuration not found for ID: {server_id}")
     return None
 
+def get_flow_definitions_directory() -> Path:
+    """Returns the directory where reusable flow definitions are stored (created on demand)."""
+    directory = Path(get_app_config().get('nifi', {}).get('flow_definitions_directory', 'flow_definitions'))
+    if not directory.is_absolute():
+        directory = PROJECT_ROOT / directory
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+def get_trace_export_settings() -> dict | None:
+    """Returns the request trace export settings with an absolute `directory`, or None when trace export is disabled."""
+    nifi_config = get_app_config().get('nifi', {})
+    directory = nifi_config.get('trace_export_directory')
+    if not directory:
+        return None
+    directory = Path(directory)
+    return {
+        'directory': directory if directory.is_absolute() else PROJECT_ROOT / directory,
+        'max_files': int(nifi_config.get('trace_export_max_files', 1000)),
+        'sample_rate': float(nifi_config.get('trace_export_sample_rate', 1.0)),
+    }
+
+def get_shared_cache_settings() -> dict | None:
+    """Returns the shared cache settings with an absolute `path`, or None when no cache is configured.
+
+    With the shared cache disabled but start-up warm-up enabled, a memory-only cache (`path` None) is
+    used so that what the warm-up loads is kept for the following requests.
+    """
+    cache_config = get_app_config().get('nifi', {}).get('shared_cache') or {}
+    local_max_entries = int(cache_config.get('local_max_entries', 1024))
+    if not cache_config.get('enabled', False):
+        return {'path': None, 'local_max_entries': local_max_entries} if get_warmup_settings() else None
+    path = Path(cache_config.get('path', 'cache/nifi_mcp_cache.sqlite3'))
+    return {
+        'path': path if path.is_absolute() else PROJECT_ROOT / path,
+        'local_max_entries': local_max_entries,
+    }
+
+def get_warmup_settings() -> dict | None:
+    """Returns the start-up warm-up settings, or None when warm-up is disabled (the default)."""
+    warmup_config = get_app_config().get('nifi', {}).get('warmup') or {}
+    if not warmup_config.get('enabled', False):
+        return None
+    return {
+        'timeout_seconds': float(warmup_config.get('timeout_seconds', 30.0)),
+        'max_process_groups': int(warmup_config.get('max_process_groups', 500)),
+        'crawl_concurrency': int(warmup_config.get('crawl_concurrency', 8)),
+    }
+
+DEFAULT_HEAVY_TOOLS = [
+    'document_nifi_flow', 'list_nifi_objects', 'list_flowfiles', 'search_nifi_flow', 'create_nifi_flow',
+    'apply_process_group_spec', 'bulk_update_processor_properties', 'bulk_operate_nifi_components',
+    'teardown_process_group', 'invoke_nifi_http_endpoint', 'save_flow_definition', 'instantiate_flow_definition',
+]
+
+def get_scheduler_settings() -> dict | None:
+    """Returns the REST bridge's per-server fair scheduler settings, or None when scheduling is disabled (the default)."""
+    scheduler_config = get_app_config().get('nifi', {}).get('scheduler') or {}
+    if not scheduler_config.get('enabled', False):
+        return None
+    return {
+        'max_concurrent': int(scheduler_config.get('max_concurrent_per_server', 16)),
+        'max_heavy': int(scheduler_config.get('max_heavy_per_server', 4)),
+        'max_queue': int(scheduler_config.get('max_queue_per_server', 100)),
+        'max_queue_per_user': int(scheduler_config.get('max_queue_per_user', 20)),
+        'heavy_tools': scheduler_config.get('heavy_tools', DEFAULT_HEAVY_TOOLS),
+        'heavy_cost': float(scheduler_config.get('heavy_cost', 4.0)),
+        'user_weights': {str(user): float(weight) for user, weight in (scheduler_config.get('user_weights') or {}).items()},
+    }
+
+def get_tool_deadline(tool_name: str) -> float | None:
+    """Returns the seconds after which the REST bridge cancels `tool_name`, or None for no deadline."""
+    deadline_config = get_app_config().get('nifi', {}).get('tool_deadlines') or {}
+    seconds = (deadline_config.get('tools') or {}).get(tool_name, deadline_config.get('default_seconds'))
+    return float(seconds) if seconds else None
+
 # --- Specific Config Values ---
+# Module attributes resolved from the configuration on first access (PEP 562), so
+# `config.settings.OPENAI_MODELS` and `from config.settings import LOGGING_CONFIG` keep working.
+
+_LAZY_VALUES = {
+    'LOGGING_CONFIG': get_logging_config,
+    # Load API keys using nested gets for safety
+    'GOOGLE_API_KEY': lambda: get_app_config().get('llm', {}).get('google', {}).get('api_key'),
+    'OPENAI_API_KEY': lambda: get_app_config().get('llm', {}).get('openai', {}).get('api_key'),
+    # Load model configurations with defaults from DEFAULT_APP_CONFIG if necessary
+    'OPENAI_MODELS': lambda: get_app_config().get('llm', {}).get('openai', {}).get('models', DEFAULT_APP_CONFIG['llm']['openai']['models']),
+    'GEMINI_MODELS': lambda: get_app_config().get('llm', {}).get('google', {}).get('models', DEFAULT_APP_CONFIG['llm']['google']['models']),
+}
 
-# Load API keys using nested gets for safety
-GOOGLE_API_KEY = _APP_CONFIG.get('llm', {}).get('google', {}).get('api_key')
-OPENAI_API_KEY = _APP_CONFIG.get('llm', {}).get('openai', {}).get('api_key')
-
-# Load model configurations with defaults from DEFAULT_APP_CONFIG if necessary
-OPENAI_MODELS = _APP_CONFIG.get('llm', {}).get('openai', {}).get('models', DEFAULT_APP_CONFIG['llm']['openai']['models'])
-GEMINI_MODELS = _APP_CONFIG.get('llm', {}).get('google', {}).get('models', DEFAULT_APP_CONFIG['llm']['google']['models'])
-
-# Print loaded configuration (excluding sensitive values like full NiFi server details)
-print("\nLoaded application configuration:")
-print(f"OPENAI_MODELS: {OPENAI_MODELS}")
-print(f"GEMINI_MODELS: {GEMINI_MODELS}")
-print(f"GOOGLE_API_KEY configured: {'Yes' if GOOGLE_API_KEY else 'No'}")
-print(f"OPENAI_API_KEY configured: {'Yes' if OPENAI_API_KEY else 'No'}")
-nifi_server_summary = [(s.get('id', 'N/A'), s.get('name', 'N/A')) for s in get_nifi_servers()]
-print(f"NiFi Servers configured: {len(nifi_server_summary)} {nifi_server_summary if nifi_server_summary else '(None)'}")
-print(f"Logging config loaded: {'Yes' if LOGGING_CONFIG != DEFAULT_LOGGING_CONFIG else 'No (Using Defaults)'}")
+def __getattr__(name: str):
+    if name in _LAZY_VALUES:
+        value = _LAZY_VALUES[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _print_config_summary(app_config: dict) -> None:
+    """Prints the loaded configuration (excluding sensitive values like full NiFi server details)."""
+    llm_config = app_config.get('llm', {})
+    print("\nLoaded application configuration:")
+    print(f"OPENAI_MODELS: {llm_config.get('openai', {}).get('models', DEFAULT_APP_CONFIG['llm']['openai']['models'])}")
+    print(f"GEMINI_MODELS: {llm_config.get('google', {}).get('models', DEFAULT_APP_CONFIG['llm']['google']['models'])}")
+    print(f"GOOGLE_API_KEY configured: {'Yes' if llm_config.get('google', {}).get('api_key') else 'No'}")
+    print(f"OPENAI_API_KEY configured: {'Yes' if llm_config.get('openai', {}).get('api_key') else 'No'}")
+    nifi_server_summary = [(s.get('id', 'N/A'), s.get('name', 'N/A')) for s in app_config.get('nifi', {}).get('servers', [])]
+    print(f"NiFi Servers configured: {len(nifi_server_summary)} {nifi_server_summary if nifi_server_summary else '(None)'}")
+    print(f"Logging config loaded: {'Yes' if get_logging_config() != DEFAULT_LOGGING_CONFIG else 'No (Using Defaults)'}")
 
 # --- Deprecated Functions (Keep temporarily for reference/smooth transition if needed, but remove eventually) ---
 
@@ -4,6 +4,9 @@
 import streamlit as st
 import requests # Use requests for HTTP calls
 import json
+import copy
+import time
+import uuid
 from typing import List, Dict, Any, Optional
 import os
 # Remove standard logging import
@@ -14,6 +17,11 @@ from google.protobuf.internal.containers import MessageMap # Import the type if
 # --- Configuration --- #
 # URL for the FastAPI server
 API_BASE_URL = "http://localhost:8000"
+# Tools run as server-side jobs; the client long-polls for the result up to this many seconds
+TOOL_JOB_TIMEOUT_SECONDS = 600
+TOOL_JOB_POLL_WAIT_SECONDS = 25
+# Upper bound for honouring a Retry-After when the server's scheduler rejects a job with 429
+MAX_RETRY_AFTER_SECONDS = 30
 
 # --- Remove All MCP Client, Threading, Asyncio imports and helpers --- #
 # (Imports like ClientSession, stdio_client, websocket_client, McpError, ToolError removed)
@@ -95,7 +103,7 @@ def execute_mcp_tool(
     # Bind context IDs for logging within this function call
     bound_logger = logger.bind(user_request_id=user_request_id, action_id=action_id, nifi_server_id=selected_nifi_server_id)
     selected_nifi_pg=""
-    url = f"{API_BASE_URL}/tools/{tool_name}"
+    url = f"{API_BASE_URL}/jobs/tools/{tool_name}"
 
     # Log context IDs explicitly for debugging
     bound_logger.debug(f"Tool execution context: user_request_id={user_request_id}, action_id={action_id}, nifi_server_id={selected_nifi_server_id}")
@@ -121,10 +129,13 @@ def execute_mcp_tool(
         }
     }
 
-    # Create headers with context IDs
+    # Create headers with context IDs; X-User-Id lets the server queue this browser session fairly
+    if "mcp_user_id" not in st.session_state:
+        st.session_state.mcp_user_id = str(uuid.uuid4())
     headers = {
         "X-Request-ID": user_request_id or "-",
         "X-Action-ID": action_id or "-",
+        "X-User-Id": st.session_state.mcp_user_id,
         "Content-Type": "application/json"
     }
     # Add the NiFi Server ID header if provided
@@ -152,10 +163,45 @@ def execute_mcp_tool(
     # -----------------------
     
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=60) # Add timeout
+        # Submit as a job. The key is unique per call, so the 429 retries below reuse the submitted job
+        # while an identical call later in the same LLM turn still runs again
+        headers["X-Job-Key"] = str(uuid.uuid4())
+        deadline = time.monotonic() + TOOL_JOB_TIMEOUT_SECONDS
+        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        while response.status_code == 429 and time.monotonic() < deadline:
+            retry_after = min(float(response.headers.get("Retry-After", 5)), MAX_RETRY_AFTER_SECONDS)
+            bound_logger.warning(f"Server is busy; retrying tool '{tool_name}' in {retry_after}s")
+            time.sleep(retry_after)
+            response = requests.post(url, json=payload, headers=headers, timeout=30)
         response.raise_for_status() # Raise exception for bad status codes (4xx or 5xx)
-        
-        result_data = response.json()
+        job = response.json()
+
+        while job.get("status") == "running":
+            if time.monotonic() > deadline:
+                requests.delete(f"{API_BASE_URL}/jobs/{job['job_id']}", headers=headers, timeout=30)
+                raise requests.exceptions.Timeout(f"Job {job['job_id']} did not finish within {TOOL_JOB_TIMEOUT_SECONDS}s")
+            response = requests.get(
+                f"{API_BASE_URL}/jobs/{job['job_id']}",
+                params={"wait": TOOL_JOB_POLL_WAIT_SECONDS},
+                headers=headers,
+                timeout=TOOL_JOB_POLL_WAIT_SECONDS + 15
+            )
+            response.raise_for_status()
+            job = response.json()
+
+        if job.get("status") != "succeeded":
+            error = job.get("error") or {}
+            error_message = f"API Error executing tool '{tool_name}': {error.get('status_code')} - {error.get('detail', job.get('status'))}"
+            bound_logger.error(error_message)
+            bound_logger.bind(
+                interface="mcp",
+                direction="response",
+                data={"status_code": error.get("status_code"), "body": job}
+            ).debug("Received error response from MCP API")
+            st.error(error_message) # Keep UI error
+            return error_message
+
+        result_data = job.get("result")
         bound_logger.info(f"Received successful response from API for tool '{tool_name}'.")
         bound_logger.debug(f"API Response data: {result_data}")
         
@@ -219,7 +265,9 @@ def execute_mcp_tool(
         return f"{error_message}: {e}" # Return error string
 
 # --- Tool Definitions (Synchronous HTTP) --- #
-# @st.cache_data # Consider caching this
+# Last tool list and ETag per URL; the server answers 304 while the catalog is unchanged
+_tools_cache: Dict[str, tuple] = {}
+
 def get_available_tools(
     selected_nifi_server_id: str | None, # Added parameter
     user_request_id: str | None = None,
@@ -257,16 +305,25 @@ def get_available_tools(
             # Log a warning if the ID is missing, as /tools endpoint might work without it but /tools/{tool_name} won't
             bound_logger.warning("NiFi Server ID not provided for get_available_tools request. Backend might default or error.")
         
+        cached = _tools_cache.get(url)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
         # Log headers for debugging
         bound_logger.debug(f"Headers for tools request: {headers}")
         
         response = requests.get(url, headers=headers, timeout=30) # Add timeout and headers
         response.raise_for_status() # Raise exception for bad status codes
+        if response.status_code == 304 and cached:
+            bound_logger.debug(f"Tool catalog unchanged; using {len(cached[1])} cached tool definitions.")
+            return copy.deepcopy(cached[1]) # Callers adapt schemas in place
         
         tools = response.json() # Expecting a list of tool dicts
         if isinstance(tools, list):
             # Use logger instead of print
             bound_logger.info(f"Successfully retrieved {len(tools)} tool definitions from API.")
+            if response.headers.get("ETag"):
+                _tools_cache[url] = (response.headers["ETag"], copy.deepcopy(tools))
             return tools
         else:
             error_message = f"API Error: Unexpected format received for tools list (expected list, got {type(tools)})."
@@ -1,4 +1,8 @@
 import asyncio
+import json
+import re
+import time
+from pathlib import Path
 from typing import List, Dict, Optional, Any, Union, Literal
 
 # Import necessary components from parent/utils
@@ -19,6 +23,7 @@ from .utils import (
     filter_processor_data # Needed for create_nifi_flow
 )
 from nifi_mcp_server.nifi_client import NiFiClient, NiFiAuthenticationError
+from config.settings import get_flow_definitions_directory
 from mcp.server.fastmcp.exceptions import ToolError
 
 # --- Tool Definitions --- 
@@ -256,84 +261,79 @@ async def create_nifi_connection(
          local_logger.error(f"Unexpected error fetching component details: {e}", exc_info=True)
          raise ToolError(f"An unexpected error occurred fetching details: {e}")
 
-    local_logger.info(f"Checking for existing connections between {source_id} and {target_id}...")
-    try:
-        nifi_list_req = {"operation": "list_connections", "process_group_id": common_parent_pg_id}
-        local_logger.bind(interface="nifi", direction="request", data=nifi_list_req).debug("Calling NiFi API")
-        existing_connections = await nifi_client.list_connections(common_parent_pg_id, user_request_id=user_request_id, action_id=action_id)
-        nifi_list_resp = {"connection_count": len(existing_connections)}
-        local_logger.bind(interface="nifi", direction="response", data=nifi_list_resp).debug("Received from NiFi API")
-        
-        for existing_conn_entity in existing_connections:
-            existing_comp = existing_conn_entity.get("component", {})
-            existing_source = existing_comp.get("source", {})
-            existing_dest = existing_comp.get("destination", {})
-            
-            if existing_source.get("id") == source_id and existing_dest.get("id") == target_id:
+    # Hold the (group, source, target) lock across the duplicate check and the create, so concurrent
+    # creations of the same pair (e.g. from the parallel create_nifi_flow DAG) cannot both pass the check
+    async with nifi_client.hold_connection_pair(common_parent_pg_id, source_id, target_id):
+        local_logger.info(f"Checking for existing connections between {source_id} and {target_id}...")
+        try:
+            # The client's connection index lists the group once per request; later checks are local lookups
+            nifi_list_req = {"operation": "find_connections", "process_group_id": common_parent_pg_id, "source_id": source_id, "target_id": target_id}
+            local_logger.bind(interface="nifi", direction="request", data=nifi_list_req).debug("Calling NiFi API")
+            existing_connections = await nifi_client.find_connections(common_parent_pg_id, source_id, target_id, user_request_id=user_request_id, action_id=action_id)
+            nifi_list_resp = {"matching_connection_count": len(existing_connections)}
+            local_logger.bind(interface="nifi", direction="response", data=nifi_list_resp).debug("Received from NiFi API")
+
+            if existing_connections:
+                existing_conn_entity = existing_connections[0]
                 existing_conn_id = existing_conn_entity.get("id")
+                existing_relationships = existing_conn_entity.get("component", {}).get("selectedRelationships", [])
                 local_logger.warning(f"Duplicate connection detected: {existing_conn_id}")
-                try:
-                    existing_conn_details = await nifi_client.get_connection(existing_conn_id)
-                    existing_relationships = existing_conn_details.get("component", {}).get("selectedRelationships", [])
-                except Exception as detail_err:
-                    local_logger.error(f"Could not fetch details for existing connection {existing_conn_id}: {detail_err}")
-                    existing_relationships = ["<error retrieving>"]
                 error_msg = (
                     f"A connection already exists between source '{source_id}' and target '{target_id}'. "
                     f"ID: {existing_conn_id}. Relationships: {existing_relationships}. "
                     f"Use 'update_nifi_connection' to modify."
                 )
                 return {"status": "error", "message": error_msg, "entity": None}
-        local_logger.info("No duplicate connection found. Proceeding with creation.")
-    except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
-        local_logger.error(f"API error checking existing connections: {e}", exc_info=False)
-        local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
-        raise ToolError(f"Failed to check for existing connections: {e}")
-    except Exception as e:
-        local_logger.error(f"Unexpected error checking existing connections: {e}", exc_info=True)
-        local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
-        raise ToolError(f"An unexpected error occurred checking connections: {e}")
+            local_logger.info("No duplicate connection found. Proceeding with creation.")
+        except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+            local_logger.error(f"API error checking existing connections: {e}", exc_info=False)
+            local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
+            raise ToolError(f"Failed to check for existing connections: {e}")
+        except Exception as e:
+            local_logger.error(f"Unexpected error checking existing connections: {e}", exc_info=True)
+            local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
+            raise ToolError(f"An unexpected error occurred checking connections: {e}")
 
-    local_logger.info(f"Attempting to create connection from {source_type} '{source_id}' ({relationships}) to {target_type} '{target_id}' in group {common_parent_pg_id}")
-    try:
-        nifi_create_req = {
-            "operation": "create_connection",
-            "process_group_id": common_parent_pg_id,
-            "source_id": source_id,
-            "target_id": target_id,
-            "relationships": relationships,
-            "source_type": source_type,
-            "target_type": target_type
-        }
-        local_logger.bind(interface="nifi", direction="request", data=nifi_create_req).debug("Calling NiFi API")
+        local_logger.info(f"Attempting to create connection from {source_type} '{source_id}' ({relationships}) to {target_type} '{target_id}' in group {common_parent_pg_id}")
+        try:
+            nifi_create_req = {
+                "operation": "create_connection",
+                "process_group_id": common_parent_pg_id,
+                "source_id": source_id,
+                "target_id": target_id,
+                "relationships": relationships,
+                "source_type": source_type,
+                "target_type": target_type
+            }
+            local_logger.bind(interface="nifi", direction="request", data=nifi_create_req).debug("Calling NiFi API")
         
-        connection_entity = await nifi_client.create_connection(
-            process_group_id=common_parent_pg_id,
-            source_id=source_id,
-            target_id=target_id,
-            relationships=relationships,
-            source_type=source_type,
-            target_type=target_type
-        )
-        filtered_entity = filter_connection_data(connection_entity)
-        local_logger.bind(interface="nifi", direction="response", data=filtered_entity).debug("Received from NiFi API")
+            connection_entity = await nifi_client.create_connection(
+                process_group_id=common_parent_pg_id,
+                source_id=source_id,
+                target_id=target_id,
+                relationships=relationships,
+                source_type=source_type,
+                target_type=target_type
+            )
+            filtered_entity = filter_connection_data(connection_entity)
+            local_logger.bind(interface="nifi", direction="response", data=filtered_entity).debug("Received from NiFi API")
         
-        local_logger.info(f"Successfully created connection with ID: {connection_entity.get('id', 'N/A')}")
-        return {
-            "status": "success",
-            "message": "Connection created successfully.",
-            "entity": filtered_entity
-        }
+            local_logger.info(f"Successfully created connection with ID: {connection_entity.get('id', 'N/A')}")
+            return {
+                "status": "success",
+                "message": "Connection created successfully.",
+                "entity": filtered_entity
+            }
 
-    except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
-        local_logger.error(f"API error creating connection: {e}", exc_info=False)
-        local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
-        # Return structured error instead of raising ToolError
-        return {"status": "error", "message": f"Failed to create NiFi connection: {e}", "entity": None}
-    except Exception as e:
-        local_logger.error(f"Unexpected error creating connection: {e}", exc_info=True)
-        local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
-        return {"status": "error", "message": f"An unexpected error occurred during connection creation: {e}", "entity": None}
+        except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+            local_logger.error(f"API error creating connection: {e}", exc_info=False)
+            local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
+            # Return structured error instead of raising ToolError
+            return {"status": "error", "message": f"Failed to create NiFi connection: {e}", "entity": None}
+        except Exception as e:
+            local_logger.error(f"Unexpected error creating connection: {e}", exc_info=True)
+            local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API")
+            return {"status": "error", "message": f"An unexpected error occurred during connection creation: {e}", "entity": None}
 
 
 @mcp.tool()
@@ -529,7 +529,8 @@ async def create_nifi_process_group(
 async def create_nifi_flow(
     nifi_objects: List[Dict[str, Any]],
     process_group_id: str | None = None,
-    create_process_group: Optional[Dict[str, Any]] = None
+    create_process_group: Optional[Dict[str, Any]] = None,
+    max_concurrency: int = 4
 ) -> List[Dict[str, Any]]:
     """
     Creates a NiFi flow based on a list of processors and connections.
@@ -551,9 +552,10 @@ async def create_nifi_flow(
             Note: Processor 'name' is used for mapping connections and must be unique within this list. The tool attempts to parse common variations, but the preferred format is recommended.
         process_group_id: The ID of the existing process group to create the flow in. Ignored if `create_process_group` is provided.
         create_process_group: Optional. If provided, a new process group is created with this configuration {"name": "NewGroup", "position_x": X, "position_y": Y} and the flow is built inside it.
+        max_concurrency: Maximum number of NiFi create calls in flight at once. Processors are created concurrently and each connection is created as soon as both of its endpoints exist.
 
     Returns:
-        A list of results, one for each object creation attempt (success or error).
+        A list of results, one for each object creation attempt (success or error), in the same order as `nifi_objects`.
     """
     # Get client and logger from context
     nifi_client: Optional[NiFiClient] = current_nifi_client.get()
@@ -625,97 +627,138 @@ async def create_nifi_flow(
         
         local_logger = local_logger.bind(target_process_group_id=target_pg_id)
 
-        # 2. Create Processors
-        local_logger.info(f"Processing {len(nifi_objects)} objects for processor creation...")
-        for item in nifi_objects:
-            if item.get("type") == "processor": # Check top-level type
-                proc_def = item # Use the item directly
-                proc_name = proc_def.get("name")
-                # Get type from 'class' key, fallback to 'processor_type' or 'type'
-                proc_type = proc_def.get("class") or proc_def.get("processor_type") or proc_def.get("type")
-                # Get position dictionary
-                position_dict = proc_def.get("position", {})
-                pos_x = position_dict.get("x")
-                pos_y = position_dict.get("y")
-                # Get properties (might be nested or top-level depending on LLM mood)
-                properties = proc_def.get("properties", {}) 
-
-                if not proc_name:
-                    results.append({"status": "error", "message": "Processor definition missing 'name'.", "definition": proc_def})
-                    continue
-                if proc_name in id_map:
-                    results.append({"status": "error", "message": f"Duplicate processor name '{proc_name}' found. Names must be unique for connection mapping.", "definition": proc_def})
-                    continue
-
-                if not all([proc_type, pos_x is not None, pos_y is not None]):
-                    results.append({"status": "error", "message": f"Processor '{proc_name}' definition missing required fields (class/processor_type/type, position.x, position.y).", "definition": proc_def})
-                    continue
-
+        # 2. Validate definitions and build the dependency graph
+        # Each processor becomes a task; each connection task waits on the tasks of
+        # both of its endpoints, so it starts as soon as those two exist.
+        max_concurrency = max(1, max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        item_results: List[Optional[Dict[str, Any]]] = [None] * len(nifi_objects)
+        processor_tasks: Dict[str, asyncio.Task] = {}
+        object_tasks: Dict[int, asyncio.Task] = {} # Input index -> task producing its result
+
+        async def _create_processor_node(proc_def: Dict[str, Any], proc_name: str, proc_type: str, pos_x, pos_y, properties) -> Dict[str, Any]:
+            async with semaphore:
                 local_logger.info(f"Attempting to create processor: Name='{proc_name}', Type='{proc_type}'")
-                # Call create_nifi_processor tool logic
-                proc_creation_result = await create_nifi_processor(
-                    processor_type=proc_type,
-                    name=proc_name,
-                    position_x=pos_x,
-                    position_y=pos_y,
-                    process_group_id=target_pg_id,
-                    properties=properties
-                )
-                # We also need to apply the properties if provided
-                created_proc_id = None
-                if proc_creation_result.get("status") != "error":
-                    created_proc_id = proc_creation_result.get("entity", {}).get("id")
-                proc_creation_result["name_used_for_mapping"] = proc_name
-                results.append(proc_creation_result)
-
-                if proc_creation_result.get("status") != "error" and created_proc_id:
-                    id_map[proc_name] = created_proc_id # Map NAME to NiFi ID
-                    local_logger.debug(f"Mapped name '{proc_name}' to ID '{created_proc_id}'")
-                elif proc_creation_result.get("status") != "error" and not created_proc_id:
-                    local_logger.error(f"Could not get NiFi ID for created processor with name '{proc_name}'")
-                    proc_creation_result["status"] = "error"
-                    proc_creation_result["message"] += " (Could not retrieve NiFi ID after creation)"
-                else:
-                    local_logger.error(f"Failed to create processor with name '{proc_name}': {proc_creation_result.get('message')}")
-
-        # 3. Create Connections
-        local_logger.info(f"Processing {len(nifi_objects)} objects for connection creation...")
-        for item in nifi_objects:
-            if item.get("type") == "connection": # Check top-level type
-                conn_def = item # Use the item directly
-                # Extract details using names
-                source_name = conn_def.get("source") # Expecting name
-                target_name = conn_def.get("dest") or conn_def.get("destination") # Allow variations
-                relationships = conn_def.get("relationships")
-
-                if not all([source_name, target_name, relationships]):
-                    results.append({"status": "error", "message": "Connection definition missing required fields (source name, dest/destination name, relationships).", "definition": conn_def})
-                    continue
-                
-                # Use names to lookup NiFi IDs from our map
-                source_nifi_id = id_map.get(source_name)
-                target_nifi_id = id_map.get(target_name)
-
-                if not source_nifi_id:
-                    results.append({"status": "error", "message": f"Source component with name '{source_name}' not found or failed to create.", "definition": conn_def})
-                    continue
-                if not target_nifi_id:
-                    results.append({"status": "error", "message": f"Target component with name '{target_name}' not found or failed to create.", "definition": conn_def})
-                    continue
-
+                try:
+                    proc_creation_result = await create_nifi_processor(
+                        processor_type=proc_type,
+                        name=proc_name,
+                        position_x=pos_x,
+                        position_y=pos_y,
+                        process_group_id=target_pg_id,
+                        properties=properties
+                    )
+                except ToolError as e:
+                    proc_creation_result = {"status": "error", "message": str(e), "entity": None}
+            created_proc_id = None
+            if proc_creation_result.get("status") != "error":
+                created_proc_id = (proc_creation_result.get("entity") or {}).get("id")
+            proc_creation_result["name_used_for_mapping"] = proc_name
+
+            if proc_creation_result.get("status") != "error" and created_proc_id:
+                id_map[proc_name] = created_proc_id # Map NAME to NiFi ID
+                local_logger.debug(f"Mapped name '{proc_name}' to ID '{created_proc_id}'")
+            elif proc_creation_result.get("status") != "error" and not created_proc_id:
+                local_logger.error(f"Could not get NiFi ID for created processor with name '{proc_name}'")
+                proc_creation_result["status"] = "error"
+                proc_creation_result["message"] += " (Could not retrieve NiFi ID after creation)"
+            else:
+                local_logger.error(f"Failed to create processor with name '{proc_name}': {proc_creation_result.get('message')}")
+            return proc_creation_result
+
+        async def _create_connection_node(conn_def: Dict[str, Any], source_name: str, target_name: str, relationships: List[str]) -> Dict[str, Any]:
+            # Wait for both endpoints; they may belong to the same task
+            await asyncio.gather(*{processor_tasks[source_name], processor_tasks[target_name]})
+            source_nifi_id = id_map.get(source_name)
+            target_nifi_id = id_map.get(target_name)
+            if not source_nifi_id:
+                return {"status": "error", "message": f"Source component with name '{source_name}' not found or failed to create.", "definition": conn_def}
+            if not target_nifi_id:
+                return {"status": "error", "message": f"Target component with name '{target_name}' not found or failed to create.", "definition": conn_def}
+
+            async with semaphore:
                 local_logger.info(f"Attempting to create connection: From='{source_name}' ({source_nifi_id}) To='{target_name}' ({target_nifi_id}) Rel='{relationships}'")
-                # Call create_nifi_connection tool logic
-                conn_creation_result = await create_nifi_connection(
-                    source_id=source_nifi_id,
-                    target_id=target_nifi_id,
-                    relationships=relationships
-                )
-                conn_creation_result["definition"] = conn_def
-                results.append(conn_creation_result)
-                
-                if conn_creation_result.get("status") == "error":
-                     local_logger.error(f"Failed to create connection from '{source_name}' to '{target_name}': {conn_creation_result.get('message')}")
-                 
+                try:
+                    conn_creation_result = await create_nifi_connection(
+                        source_id=source_nifi_id,
+                        target_id=target_nifi_id,
+                        relationships=relationships
+                    )
+                except ToolError as e:
+                    conn_creation_result = {"status": "error", "message": str(e), "entity": None}
+            conn_creation_result["definition"] = conn_def
+            if conn_creation_result.get("status") == "error":
+                local_logger.error(f"Failed to create connection from '{source_name}' to '{target_name}': {conn_creation_result.get('message')}")
+            return conn_creation_result
+
+        local_logger.info(f"Processing {len(nifi_objects)} objects with concurrency {max_concurrency}...")
+        for index, item in enumerate(nifi_objects):
+            if item.get("type") != "processor": # Check top-level type
+                continue
+            proc_def = item # Use the item directly
+            proc_name = proc_def.get("name")
+            # Get type from 'class' key, fallback to 'processor_type' or 'type'
+            proc_type = proc_def.get("class") or proc_def.get("processor_type") or proc_def.get("type")
+            # Get position dictionary
+            position_dict = proc_def.get("position", {})
+            pos_x = position_dict.get("x")
+            pos_y = position_dict.get("y")
+            # Get properties (might be nested or top-level depending on LLM mood)
+            properties = proc_def.get("properties", {})
+
+            if not proc_name:
+                item_results[index] = {"status": "error", "message": "Processor definition missing 'name'.", "definition": proc_def}
+                continue
+            if proc_name in processor_tasks:
+                item_results[index] = {"status": "error", "message": f"Duplicate processor name '{proc_name}' found. Names must be unique for connection mapping.", "definition": proc_def}
+                continue
+            if not all([proc_type, pos_x is not None, pos_y is not None]):
+                item_results[index] = {"status": "error", "message": f"Processor '{proc_name}' definition missing required fields (class/processor_type/type, position.x, position.y).", "definition": proc_def}
+                continue
+
+            processor_tasks[proc_name] = asyncio.create_task(
+                _create_processor_node(proc_def, proc_name, proc_type, pos_x, pos_y, properties)
+            )
+            object_tasks[index] = processor_tasks[proc_name]
+
+        for index, item in enumerate(nifi_objects):
+            if item.get("type") != "connection": # Check top-level type
+                continue
+            conn_def = item # Use the item directly
+            # Extract details using names
+            source_name = conn_def.get("source") # Expecting name
+            target_name = conn_def.get("dest") or conn_def.get("destination") # Allow variations
+            relationships = conn_def.get("relationships")
+
+            if not all([source_name, target_name, relationships]):
+                item_results[index] = {"status": "error", "message": "Connection definition missing required fields (source name, dest/destination name, relationships).", "definition": conn_def}
+                continue
+            if source_name not in processor_tasks:
+                item_results[index] = {"status": "error", "message": f"Source component with name '{source_name}' not found or failed to create.", "definition": conn_def}
+                continue
+            if target_name not in processor_tasks:
+                item_results[index] = {"status": "error", "message": f"Target component with name '{target_name}' not found or failed to create.", "definition": conn_def}
+                continue
+
+            object_tasks[index] = asyncio.create_task(
+                _create_connection_node(conn_def, source_name, target_name, relationships)
+            )
+
+        # 3. Run the graph and collect per-object results in input order
+        pending_indices = list(object_tasks.keys())
+        try:
+            outcomes = await asyncio.gather(*(object_tasks[i] for i in pending_indices), return_exceptions=True)
+        except asyncio.CancelledError:
+            for task in object_tasks.values():
+                task.cancel()
+            raise
+        for index, outcome in zip(pending_indices, outcomes):
+            if isinstance(outcome, BaseException):
+                local_logger.error(f"Unexpected error creating object at index {index}: {outcome}")
+                outcome = {"status": "error", "message": f"An unexpected error occurred: {outcome}", "definition": nifi_objects[index]}
+            item_results[index] = outcome
+        results.extend(r for r in item_results if r is not None)
+
         # 4. Identify and report any unprocessed items
         processed_indices = set()
         for i, item in enumerate(nifi_objects):
@@ -754,3 +797,284 @@ async def create_nifi_flow(
         local_logger.error(f"Unexpected error during flow creation: {e}", exc_info=True)
         results.append({"status": "error", "message": f"An unexpected error occurred during flow creation: {e}"})
         return results
+
+
+# --- Flow Definitions --- #
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+_DEFINITION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+$")
+_FLOW_COMPONENT_KEYS = ("processors", "connections", "inputPorts", "outputPorts", "funnels", "processGroups", "controllerServices")
+
+
+def _definition_path(definition_name: str) -> Path:
+    """Resolves the file of a saved flow definition, rejecting names that could escape the directory."""
+    if not _DEFINITION_NAME_PATTERN.match(definition_name or ""):
+        raise ToolError(f"Invalid flow definition name '{definition_name}'. Use letters, digits, '.', '_' or '-'.")
+    return get_flow_definitions_directory() / f"{definition_name}.json"
+
+
+def _count_flow_components(flow_contents: Dict[str, Any], counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Counts components by kind in a versioned flow's contents, including nested groups."""
+    counts = counts if counts is not None else {key: 0 for key in _FLOW_COMPONENT_KEYS}
+    for key in _FLOW_COMPONENT_KEYS:
+        counts[key] += len(flow_contents.get(key, []) or [])
+    for child in flow_contents.get("processGroups", []) or []:
+        _count_flow_components(child, counts)
+    return counts
+
+
+def _parameterize_properties(data: Any, literals: Dict[str, str]) -> Any:
+    """Replaces property values equal to a literal with {{name}} placeholders inside every 'properties' map.
+
+    Only whole values are replaced, so a short literal such as "80" leaves "8080", URLs and expressions alone.
+    """
+    if isinstance(data, list):
+        return [_parameterize_properties(item, literals) for item in data]
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for key, value in data.items():
+        if key == "properties" and isinstance(value, dict):
+            placeholders = {literal: f"{{{{{name}}}}}" for name, literal in literals.items() if literal}
+            result[key] = {
+                prop_name: placeholders.get(prop_value, prop_value) if isinstance(prop_value, str) else prop_value
+                for prop_name, prop_value in value.items()
+            }
+        else:
+            result[key] = _parameterize_properties(value, literals)
+    return result
+
+
+def _find_placeholders(data: Any, found: set) -> set:
+    """Collects the names of all {{name}} placeholders in a flow definition."""
+    if isinstance(data, str):
+        found.update(_PLACEHOLDER_PATTERN.findall(data))
+    elif isinstance(data, list):
+        for item in data:
+            _find_placeholders(item, found)
+    elif isinstance(data, dict):
+        for value in data.values():
+            _find_placeholders(value, found)
+    return found
+
+
+def _substitute_placeholders(data: Any, values: Dict[str, str]) -> Any:
+    """Replaces {{name}} placeholders in every string of a flow definition."""
+    if isinstance(data, str):
+        return _PLACEHOLDER_PATTERN.sub(lambda m: str(values[m.group(1)]), data)
+    if isinstance(data, list):
+        return [_substitute_placeholders(item, values) for item in data]
+    if isinstance(data, dict):
+        return {key: _substitute_placeholders(value, values) for key, value in data.items()}
+    return data
+
+
+@mcp.tool()
+@tool_phases(["Modify"])
+async def save_flow_definition(
+    process_group_id: str,
+    definition_name: str,
+    description: Optional[str] = None,
+    parameterize: Optional[Dict[str, str]] = None,
+    overwrite: bool = False
+) -> Dict:
+    """
+    Saves the contents of a process group as a reusable flow definition stored locally on the MCP server.
+
+    The definition can later be deployed any number of times with `instantiate_flow_definition`, which
+    creates the whole flow in a single NiFi upload request instead of one call per component.
+    Property values may contain `{{name}}` placeholders that are filled in at instantiation time
+    (NiFi Expression Language `${...}` is left untouched).
+
+    Example Call:
+    ```tool_code
+    print(default_api.save_flow_definition(process_group_id='pg-uuid', definition_name='kafka-ingest', parameterize={'topic': 'orders', 'bootstrap_servers': 'kafka:9092'}))
+    ```
+
+    Args:
+        process_group_id: The UUID of the process group whose contents should be saved.
+        definition_name: Name to store the definition under (letters, digits, '.', '_' or '-').
+        description: Optional human-readable description of the pattern.
+        parameterize: Optional mapping of placeholder name to a literal value currently used in processor
+            properties. Every property whose whole value equals the literal is set to `{{name}}`, and the
+            literal is kept as the placeholder's default value. Values that merely contain it are left as is.
+        overwrite: Whether to replace an existing definition with the same name.
+
+    Returns:
+        A dictionary with the status, the saved definition's name, its placeholders (with defaults) and component counts.
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    session_pg_id = current_process_group.get()
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+
+    local_logger = local_logger.bind(process_group_id=process_group_id, definition_name=definition_name)
+    path = _definition_path(definition_name)
+    if path.exists() and not overwrite:
+        raise ToolError(f"Flow definition '{definition_name}' already exists. Set overwrite=True to replace it.")
+
+    try:
+        if session_pg_id and not await nifi_client.is_descendant(process_group_id, session_pg_id):
+            raise ToolError(f"Process group {process_group_id} is not a descendant of the current process group {session_pg_id}.")
+        nifi_request_data = {"operation": "download_flow_definition", "process_group_id": process_group_id}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_request_data).debug("Calling NiFi API")
+        flow_definition = await nifi_client.download_flow_definition(process_group_id)
+        flow_contents = flow_definition.get("flowContents", {})
+        counts = _count_flow_components(flow_contents)
+        local_logger.bind(interface="nifi", direction="response", data={"counts": counts}).debug("Received from NiFi API")
+
+        defaults = dict(parameterize or {})
+        if defaults:
+            flow_definition = _parameterize_properties(flow_definition, defaults)
+        placeholders = {name: defaults.get(name) for name in sorted(_find_placeholders(flow_definition, set()))}
+
+        stored = {
+            "name": definition_name,
+            "description": description,
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "source_process_group_id": process_group_id,
+            "source_process_group_name": flow_contents.get("name"),
+            "placeholders": placeholders,
+            "component_counts": counts,
+            "flow_definition": flow_definition,
+        }
+        path.write_text(json.dumps(stored, indent=2))
+        local_logger.info(f"Saved flow definition '{definition_name}' ({sum(counts.values())} components) to {path}")
+        return {
+            "status": "success",
+            "message": f"Flow definition '{definition_name}' saved with {sum(counts.values())} components.",
+            "definition_name": definition_name,
+            "placeholders": placeholders,
+            "component_counts": counts,
+        }
+    except ValueError as e:
+        local_logger.warning(f"Error saving flow definition: {e}")
+        return {"status": "error", "message": f"Error saving flow definition: {e}"}
+    except (NiFiAuthenticationError, ConnectionError, ToolError) as e:
+        local_logger.error(f"API error saving flow definition: {e}", exc_info=False)
+        return {"status": "error", "message": f"Failed to save flow definition: {e}"}
+    except Exception as e:
+        local_logger.error(f"Unexpected error saving flow definition: {e}", exc_info=True)
+        return {"status": "error", "message": f"An unexpected error occurred: {e}"}
+
+
+@mcp.tool()
+@tool_phases(["Review", "Modify"])
+async def list_flow_definitions() -> Dict:
+    """
+    Lists the reusable flow definitions saved with `save_flow_definition`.
+
+    Returns:
+        A dictionary with a `definitions` list giving each definition's name, description, save time,
+        placeholders (with default values) and component counts.
+    """
+    local_logger = current_request_logger.get() or logger
+    definitions = []
+    for path in sorted(get_flow_definitions_directory().glob("*.json")):
+        try:
+            stored = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            local_logger.warning(f"Skipping unreadable flow definition {path}: {e}")
+            continue
+        definitions.append({key: stored.get(key) for key in ("name", "description", "saved_at", "placeholders", "component_counts")})
+    return {"status": "success", "message": f"Found {len(definitions)} flow definitions.", "definitions": definitions}
+
+
+@mcp.tool()
+@tool_phases(["Modify"])
+async def instantiate_flow_definition(
+    definition_name: str,
+    group_name: str,
+    parameters: Optional[Dict[str, str]] = None,
+    parent_process_group_id: Optional[str] = None,
+    position_x: float = 0.0,
+    position_y: float = 0.0
+) -> Dict:
+    """
+    Deploys a saved flow definition as a new process group using a single NiFi upload request.
+
+    All `{{name}}` placeholders are substituted from `parameters`, falling back to the defaults recorded
+    when the definition was saved. Processors, connections, ports, controller services and nested groups
+    are created by NiFi in one step and come up stopped.
+
+    Example Call:
+    ```tool_code
+    print(default_api.instantiate_flow_definition(definition_name='kafka-ingest', group_name='Ingest Payments', parameters={'topic': 'payments'}))
+    ```
+
+    Args:
+        definition_name: Name of a definition saved with `save_flow_definition`.
+        group_name: Name of the process group to create.
+        parameters: Values for the definition's placeholders.
+        parent_process_group_id: The UUID of the parent process group. Defaults to the session's process group or the root.
+        position_x: X coordinate of the new process group on the canvas.
+        position_y: Y coordinate of the new process group on the canvas.
+
+    Returns:
+        A dictionary with the status, the created process group entity and component counts.
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    session_pg_id = current_process_group.get()
+    user_request_id = current_user_request_id.get() or "-"
+    action_id = current_action_id.get() or "-"
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+
+    path = _definition_path(definition_name)
+    if not path.exists():
+        raise ToolError(f"Flow definition '{definition_name}' not found.")
+    try:
+        stored = json.loads(path.read_text())
+        if not isinstance(stored, dict) or not isinstance(stored.get("flow_definition"), dict):
+            raise ValueError("it has no 'flow_definition'")
+    except (OSError, ValueError) as e:
+        local_logger.error(f"Unreadable flow definition {path}: {e}")
+        raise ToolError(f"Flow definition '{definition_name}' could not be read: {e}") from e
+
+    values = {name: default for name, default in (stored.get("placeholders") or {}).items() if default is not None}
+    values.update(parameters or {})
+    missing = sorted(_find_placeholders(stored["flow_definition"], set()) - set(values))
+    if missing:
+        raise ToolError(f"Missing values for placeholders of '{definition_name}': {missing}")
+    flow_definition = _substitute_placeholders(stored["flow_definition"], values)
+
+    try:
+        target_parent_pg_id = parent_process_group_id or session_pg_id
+        if target_parent_pg_id is None:
+            target_parent_pg_id = await nifi_client.get_root_process_group_id(user_request_id=user_request_id, action_id=action_id)
+        if session_pg_id and not await nifi_client.is_descendant(target_parent_pg_id, session_pg_id):
+            raise ToolError(f"Target process group {target_parent_pg_id} is not a descendant of the current process group {session_pg_id}.")
+
+        local_logger = local_logger.bind(parent_process_group_id=target_parent_pg_id, definition_name=definition_name)
+        nifi_request_data = {
+            "operation": "upload_flow_definition",
+            "parent_process_group_id": target_parent_pg_id,
+            "group_name": group_name,
+            "parameters": sorted(values),
+        }
+        local_logger.bind(interface="nifi", direction="request", data=nifi_request_data).debug("Calling NiFi API")
+        pg_entity = await nifi_client.upload_flow_definition(
+            target_parent_pg_id, group_name, flow_definition, {"x": position_x, "y": position_y}
+        )
+        filtered_entity = filter_process_group_data(pg_entity)
+        local_logger.bind(interface="nifi", direction="response", data=filtered_entity).debug("Received from NiFi API")
+
+        counts = stored.get("component_counts") or _count_flow_components(flow_definition.get("flowContents", {}))
+        local_logger.info(f"Instantiated flow definition '{definition_name}' as process group {pg_entity.get('id')}")
+        return {
+            "status": "success",
+            "message": f"Flow definition '{definition_name}' deployed as process group '{group_name}'.",
+            "entity": filtered_entity,
+            "component_counts": counts,
+        }
+    except ValueError as e:
+        local_logger.warning(f"Error instantiating flow definition: {e}")
+        return {"status": "error", "message": f"Error instantiating flow definition: {e}"}
+    except (NiFiAuthenticationError, ConnectionError, ToolError) as e:
+        local_logger.error(f"API error instantiating flow definition: {e}", exc_info=False)
+        return {"status": "error", "message": f"Failed to instantiate flow definition: {e}"}
+    except Exception as e:
+        local_logger.error(f"Unexpected error instantiating flow definition: {e}", exc_info=True)
+        return {"status": "error", "message": f"An unexpected error occurred: {e}"}
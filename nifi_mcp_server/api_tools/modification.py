@@ -1,4 +1,5 @@
 import asyncio
+import re
 from typing import List, Dict, Optional, Any, Union, Literal
 
 # Import necessary components from parent/utils
@@ -597,3 +598,563 @@ async def delete_nifi_object(
         local_logger.error(f"Unexpected error deleting {object_type} {object_id}: {e}", exc_info=True)
         local_logger.bind(interface="nifi", direction="response", data={"error": str(e)}).debug("Received error from NiFi API (delete)")
         return {"status": "error", "message": f"An unexpected error occurred during deletion: {e}"}
+
+
+# --- Bulk Property Updates --- #
+
+async def _collect_processor_entities(
+    nifi_client: NiFiClient,
+    process_group_id: str,
+    recursive: bool
+) -> List[Dict[str, Any]]:
+    """Lists processor entities in a process group, walking child groups concurrently when recursive."""
+    processors = await nifi_client.list_processors(process_group_id)
+    if not recursive:
+        return processors
+    child_groups = await nifi_client.get_process_groups(process_group_id)
+    child_results = await asyncio.gather(
+        *(_collect_processor_entities(nifi_client, child["id"], True) for child in child_groups if child.get("id"))
+    )
+    for child_processors in child_results:
+        processors.extend(child_processors)
+    return processors
+
+
+def _processor_matches(
+    entity: Dict[str, Any],
+    processor_type: Optional[str],
+    name_regex: Optional[re.Pattern],
+    property_match: Optional[Dict[str, Any]]
+) -> bool:
+    """Checks a processor entity against the bulk update selectors (all given selectors must match)."""
+    component = entity.get("component", {})
+    if processor_type:
+        full_type = component.get("type", "")
+        if processor_type not in (full_type, full_type.rsplit(".", 1)[-1]):
+            return False
+    if name_regex and not name_regex.search(component.get("name", "")):
+        return False
+    if property_match:
+        current_properties = component.get("config", {}).get("properties", {}) or {}
+        for prop_name, expected in property_match.items():
+            if current_properties.get(prop_name) != expected:
+                return False
+    return True
+
+
+@mcp.tool()
+@tool_phases(["Modify"])
+async def bulk_update_processor_properties(
+    property_updates: Dict[str, Any],
+    processor_ids: Optional[List[str]] = None,
+    process_group_id: Optional[str] = None,
+    recursive: bool = True,
+    processor_type: Optional[str] = None,
+    name_pattern: Optional[str] = None,
+    property_match: Optional[Dict[str, Any]] = None,
+    dry_run: bool = False,
+    max_concurrency: int = 4
+) -> Dict[str, Any]:
+    """
+    Applies the same property changes to many processors at once.
+
+    Processors are selected either by explicit `processor_ids`, or from a process group scope filtered by
+    `processor_type`, `name_pattern` and/or `property_match` (all given filters must match). Only the
+    properties named in `property_updates` are changed; set a value to None to remove a property.
+    Updates run concurrently; a stale revision is retried once with a freshly fetched revision.
+    Running processors are skipped, since NiFi rejects configuration changes while they run.
+
+    Example:
+    ```python
+    {
+        "property_updates": {"Log Level": "warn"},
+        "process_group_id": "123e4567-e89b-12d3-a456-426614174000",
+        "processor_type": "LogAttribute"
+    }
+    ```
+
+    Args:
+        property_updates: Property names and their new values. Cannot be empty.
+        processor_ids: Explicit processor IDs to update. When given, the scope filters below still apply to them.
+        process_group_id: Scope to search for processors. Defaults to the session process group, or root.
+        recursive: Whether to include processors in nested process groups of the scope.
+        processor_type: Fully qualified or simple processor type name to match (e.g. 'LogAttribute').
+        name_pattern: Regular expression matched (search) against processor names.
+        property_match: Only select processors whose current properties equal all of these values.
+        dry_run: If True, report the selected processors without changing them.
+        max_concurrency: Maximum number of update calls in flight at once.
+
+    Returns:
+        A dictionary with `status`, outcome counts and a compact `results` table
+        (`columns` plus one row per processor: id, name, outcome, version, message).
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    session_pg_id = current_process_group.get() or None
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+    if not property_updates or not isinstance(property_updates, dict):
+        raise ToolError("The 'property_updates' argument must be a non-empty dictionary.")
+    if not processor_ids and not any([processor_type, name_pattern, property_match, process_group_id]):
+        raise ToolError("Provide 'processor_ids' or at least one selector (process_group_id, processor_type, name_pattern, property_match).")
+    try:
+        name_regex = re.compile(name_pattern) if name_pattern else None
+    except re.error as e:
+        raise ToolError(f"Invalid name_pattern '{name_pattern}': {e}")
+
+    max_concurrency = max(1, max_concurrency)
+    local_logger = local_logger.bind(process_group_id=process_group_id, bulk_operation="update_properties")
+
+    # --- Step 1: Resolve candidate processor entities --- #
+    try:
+        if processor_ids:
+            local_logger.info(f"Fetching {len(processor_ids)} processors for bulk update")
+            fetched = await asyncio.gather(
+                *(nifi_client.get_processor_details(pid) for pid in processor_ids), return_exceptions=True
+            )
+            candidates = []
+            missing = []
+            for pid, entity in zip(processor_ids, fetched):
+                if isinstance(entity, Exception):
+                    missing.append([pid, None, "error", None, str(entity)])
+                else:
+                    candidates.append(entity)
+        else:
+            scope_pg_id = process_group_id or session_pg_id or await nifi_client.get_root_process_group_id()
+            if session_pg_id and not await nifi_client.is_descendant(scope_pg_id, session_pg_id):
+                raise ToolError(f"Process group {scope_pg_id} is not in the current process group {session_pg_id}.")
+            nifi_req = {"operation": "list_processors", "process_group_id": scope_pg_id, "recursive": recursive}
+            local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+            candidates = await _collect_processor_entities(nifi_client, scope_pg_id, recursive)
+            local_logger.bind(interface="nifi", direction="response", data={"processor_count": len(candidates)}).debug("Received from NiFi API")
+            missing = []
+    except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+        local_logger.error(f"API error selecting processors for bulk update: {e}", exc_info=False)
+        return {"status": "error", "message": f"Failed to select processors: {e}", "results": None}
+
+    selected = [e for e in candidates if _processor_matches(e, processor_type, name_regex, property_match)]
+    local_logger.info(f"Selected {len(selected)} of {len(candidates)} processors for bulk property update (dry_run={dry_run})")
+
+    # --- Step 2: Apply updates concurrently --- #
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _apply(entity: Dict[str, Any]) -> List[Any]:
+        component = entity.get("component", {})
+        proc_id = entity.get("id")
+        name = component.get("name")
+        version = (entity.get("revision") or {}).get("version")
+        if session_pg_id and not await nifi_client.is_descendant(component.get("parentGroupId"), session_pg_id):
+            return [proc_id, name, "skipped", version, f"Not in the current process group {session_pg_id}."]
+        if component.get("state") == "RUNNING":
+            return [proc_id, name, "skipped", version, "Processor is RUNNING. Stop it before updating properties."]
+        if dry_run:
+            return [proc_id, name, "selected", version, None]
+
+        # NiFi only touches the property keys present in the request, so send just the changes
+        # (echoing current values back would also write masked sensitive values)
+        properties = dict(property_updates)
+        async with semaphore:
+            try:
+                # The listing revision is used optimistically; the client refreshes it once on a 409
+                updated = await nifi_client.update_processor_config(
+                    processor_id=proc_id, update_type="properties", update_data=properties, current_entity=entity
+                )
+            except (NiFiAuthenticationError, ConnectionError, ValueError, TypeError) as e:
+                local_logger.warning(f"Bulk update failed for processor {proc_id}: {e}")
+                return [proc_id, name, "error", version, str(e)]
+            except Exception as e:
+                local_logger.error(f"Unexpected error in bulk update for processor {proc_id}: {e}", exc_info=True)
+                return [proc_id, name, "error", version, f"An unexpected error occurred: {e}"]
+
+        updated_component = updated.get("component", {})
+        new_version = (updated.get("revision") or {}).get("version")
+        validation_status = updated_component.get("validationStatus", "UNKNOWN")
+        if validation_status == "VALID":
+            return [proc_id, name, "updated", new_version, None]
+        validation_errors = updated_component.get("validationErrors", [])
+        return [proc_id, name, "updated_invalid", new_version, validation_errors[0] if validation_errors else validation_status]
+
+    rows = missing + list(await asyncio.gather(*(_apply(e) for e in selected)))
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row[2]] = counts.get(row[2], 0) + 1
+    status = "error" if counts.get("error") and len(counts) == 1 else ("warning" if counts.get("error") or counts.get("updated_invalid") else "success")
+    local_logger.info(f"Bulk property update finished: {counts}")
+    return {
+        "status": status,
+        "message": f"Processed {len(rows)} processors: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) if rows else "No processors matched the selection.",
+        "counts": counts,
+        "results": {
+            "columns": ["processor_id", "name", "outcome", "version", "message"],
+            "rows": rows
+        }
+    }
+
+
+# --- Declarative Apply --- #
+
+async def _wait_for_processor_threads(nifi_client: NiFiClient, processor_id: str, timeout_seconds: float) -> bool:
+    """Polls a stopped processor until it has no active threads; NiFi rejects edits until then."""
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout_seconds
+    delay = 0.1
+    while True:
+        status = await nifi_client.get_processor_status(processor_id)
+        if not status.get("activeThreadCount"):
+            return True
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, 1.0)
+
+
+def _plan_process_group_spec(
+    flow: Dict[str, Any],
+    spec: Dict[str, Any],
+    prune: bool,
+    update_sensitive: bool = False
+) -> Dict[str, Any]:
+    """Diffs a desired-state spec against a live process group flow and returns the minimal operations.
+
+    NiFi masks the values of sensitive properties, so a set sensitive property never compares equal to the
+    spec; unless `update_sensitive` is True such properties are left out of the diff and reported in
+    `sensitive_skipped`. Operations the plan declines to perform are listed in `skipped` as result rows.
+    """
+    live_processors: Dict[str, Dict[str, Any]] = {}
+    for entity in flow.get("processors", []) or []:
+        name = entity.get("component", {}).get("name")
+        if name in live_processors:
+            raise ToolError(f"Processor name '{name}' is used more than once in the process group; names must be unique to apply a spec.")
+        live_processors[name] = entity
+
+    desired_processors = spec.get("processors", []) or []
+    desired_names = [p.get("name") for p in desired_processors]
+    if None in desired_names or len(set(desired_names)) != len(desired_names):
+        raise ToolError("Every processor in the spec needs a unique 'name'.")
+
+    plan = {"stop": set(), "delete_connections": [], "delete_processors": [], "create_processors": [],
+            "update_processors": [], "create_connections": [], "update_connections": [], "states": {},
+            "sensitive_skipped": {}, "skipped": []}
+
+    # Processors: create missing ones, update only changed properties / relationships
+    for index, desired in enumerate(desired_processors):
+        name = desired["name"]
+        live = live_processors.get(name)
+        state = (desired.get("state") or "").upper() or None
+        if state not in (None, "RUNNING", "STOPPED"):
+            raise ToolError(f"Invalid state '{desired.get('state')}' for processor '{name}'. Must be 'RUNNING' or 'STOPPED'.")
+        if live is None:
+            if not desired.get("type"):
+                raise ToolError(f"Processor '{name}' does not exist yet, so its 'type' is required.")
+            plan["create_processors"].append({"name": name, "spec": desired, "index": index})
+            if state == "RUNNING":
+                plan["states"][name] = "RUNNING"
+            continue
+
+        component = live.get("component", {})
+        if desired.get("type") and desired["type"] not in (component.get("type"), component.get("type", "").rsplit(".", 1)[-1]):
+            raise ToolError(f"Processor '{name}' exists with type {component.get('type')}; delete it first to change its type.")
+        config = component.get("config", {}) or {}
+        live_props = config.get("properties", {}) or {}
+        descriptors = config.get("descriptors", {}) or {}
+        changed = {}
+        for key, value in (desired.get("properties") or {}).items():
+            if live_props.get(key) == value:
+                continue
+            if (not update_sensitive and value is not None and live_props.get(key) is not None
+                    and (descriptors.get(key) or {}).get("sensitive")):
+                plan["sensitive_skipped"].setdefault(name, []).append(key)
+                continue
+            changed[key] = value
+        relationships = desired.get("auto_terminated_relationships")
+        if relationships is not None and set(relationships) == set(config.get("autoTerminatedRelationships") or []):
+            relationships = None
+        if changed or relationships is not None:
+            plan["update_processors"].append({"name": name, "entity": live, "properties": changed, "relationships": relationships})
+            if component.get("state") == "RUNNING":
+                plan["stop"].add(name)
+        if state and state != component.get("state"):
+            plan["states"][name] = state
+
+    # Connections between processors, keyed by (source name, target name)
+    id_to_name = {e["id"]: name for name, e in live_processors.items()}
+    live_connections: Dict[tuple, List[Dict[str, Any]]] = {}
+    for entity in flow.get("connections", []) or []:
+        component = entity.get("component", {})
+        key = (id_to_name.get(component.get("source", {}).get("id")), id_to_name.get(component.get("destination", {}).get("id")))
+        live_connections.setdefault(key, []).append(entity)
+
+    known_names = set(desired_names) | set(live_processors)
+    desired_keys = set()
+    for desired in spec.get("connections", []) or []:
+        key = (desired.get("source"), desired.get("target"))
+        if key[0] not in known_names or key[1] not in known_names:
+            raise ToolError(f"Connection {key[0]} -> {key[1]} references an unknown processor name.")
+        if not desired.get("relationships"):
+            raise ToolError(f"Connection {key[0]} -> {key[1]} needs a non-empty 'relationships' list.")
+        desired_keys.add(key)
+        existing = live_connections.get(key)
+        if not existing:
+            plan["create_connections"].append({"key": key, "relationships": sorted(desired["relationships"])})
+            continue
+        live_rels = existing[0].get("component", {}).get("selectedRelationships") or []
+        if set(live_rels) != set(desired["relationships"]):
+            plan["update_connections"].append({"key": key, "entity": existing[0], "relationships": sorted(desired["relationships"])})
+            if live_processors[key[0]].get("component", {}).get("state") == "RUNNING":
+                plan["stop"].add(key[0])
+
+    if prune:
+        # A kept spec connection would still hold the processor, so NiFi would reject its deletion with 409
+        referenced = sorted({name for key in desired_keys for name in key if name not in desired_names})
+        if referenced:
+            raise ToolError(f"With prune=True, spec connections reference processors missing from 'processors' "
+                            f"({', '.join(referenced)}); list them or drop those connections.")
+        # Only processor-to-processor connections are managed; connections to ports or funnels are left alone
+        for key, entities in live_connections.items():
+            if None in key:
+                continue
+            stale = entities if key not in desired_keys else entities[1:]
+            for entity in stale:
+                plan["delete_connections"].append({"key": key, "entity": entity})
+                if live_processors[key[0]].get("component", {}).get("state") == "RUNNING":
+                    plan["stop"].add(key[0])
+        # NiFi refuses to delete a processor that still has connections, so one wired to a port or funnel is kept
+        attached = {name for key in live_connections if None in key for name in key if name is not None}
+        for name, entity in live_processors.items():
+            if name not in desired_names:
+                if name in attached:
+                    plan["skipped"].append(["processor", name, "delete", entity["id"], "skipped",
+                                            "Processor is connected to a port or funnel; remove that connection first."])
+                    continue
+                plan["delete_processors"].append({"name": name, "entity": entity})
+                if entity.get("component", {}).get("state") == "RUNNING":
+                    plan["stop"].add(name)
+
+    deleted = {op["name"] for op in plan["delete_processors"]}
+    # Restart processors stopped only to apply changes, unless the spec asks for another state
+    for name in plan["stop"] - deleted:
+        plan["states"].setdefault(name, "RUNNING")
+    for name in deleted:
+        plan["states"].pop(name, None)
+    plan["live_processors"] = live_processors
+    return plan
+
+
+@mcp.tool()
+@tool_phases(["Modify"])
+async def apply_process_group_spec(
+    spec: Dict[str, Any],
+    process_group_id: Optional[str] = None,
+    prune: bool = False,
+    dry_run: bool = False,
+    max_concurrency: int = 4,
+    stop_timeout_seconds: float = 30.0,
+    update_sensitive: bool = False
+) -> Dict[str, Any]:
+    """
+    Brings a process group to a declared desired state using the minimal set of NiFi API calls.
+
+    The live group is fetched once and diffed against `spec`. Only missing processors and connections are
+    created, only changed properties/relationships are updated and only differing run states are changed.
+    Processors are matched by name and connections by (source name, target name). Operations run
+    concurrently in dependency order: stop affected processors, delete, create/update processors,
+    create/update connections, then set run states. Running processors that must change are stopped first
+    and restarted afterwards. Re-applying an unchanged spec makes no write calls.
+
+    Example:
+    ```python
+    {
+        "spec": {
+            "processors": [
+                {"name": "Generate", "type": "org.apache.nifi.processors.standard.GenerateFlowFile",
+                 "properties": {"File Size": "1KB"}, "position": {"x": 0, "y": 0}, "state": "RUNNING"},
+                {"name": "Log", "type": "org.apache.nifi.processors.standard.LogAttribute",
+                 "auto_terminated_relationships": ["success"], "position": {"x": 0, "y": 200}}
+            ],
+            "connections": [{"source": "Generate", "target": "Log", "relationships": ["success"]}]
+        },
+        "process_group_id": "123e4567-e89b-12d3-a456-426614174000"
+    }
+    ```
+
+    Args:
+        spec: Desired contents with `processors` (name, type, properties, auto_terminated_relationships,
+            position, state) and `connections` (source, target, relationships). Properties not listed are
+            left as they are; set a value to None to remove a property.
+        process_group_id: The process group to apply the spec to. Defaults to the session process group, or root.
+        prune: If True, delete processors and processor-to-processor connections that are not in the spec.
+            Processors still connected to a port or funnel are kept and reported as skipped.
+        dry_run: If True, return the planned operations without executing them.
+        max_concurrency: Maximum number of write calls in flight at once.
+        stop_timeout_seconds: Maximum seconds to wait for stopped processors to finish their active threads.
+        update_sensitive: If True, always write sensitive properties listed in the spec. NiFi masks their
+            current values, so by default those that are already set are left unchanged.
+
+    Returns:
+        A dictionary with `status`, per-outcome counts, a compact `results` table
+        (`columns` plus one row per operation: kind, name, action, id, outcome, message) and, when any were
+        left unchanged, `sensitive_properties_skipped` (processor name -> property names).
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    session_pg_id = current_process_group.get() or None
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+    if not isinstance(spec, dict) or not (spec.get("processors") or spec.get("connections") or prune):
+        raise ToolError("The 'spec' argument must be a dictionary with 'processors' and/or 'connections'.")
+
+    # --- Step 1: Fetch the live group once and compute the plan --- #
+    try:
+        pg_id = process_group_id or session_pg_id or await nifi_client.get_root_process_group_id()
+        if session_pg_id and not await nifi_client.is_descendant(pg_id, session_pg_id):
+            raise ToolError(f"Process group {pg_id} is not in the current process group {session_pg_id}.")
+        local_logger = local_logger.bind(process_group_id=pg_id)
+        nifi_req = {"operation": "get_process_group_flow", "process_group_id": pg_id}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+        flow = (await nifi_client.get_process_group_flow(pg_id)).get("processGroupFlow", {}).get("flow", {})
+        local_logger.bind(interface="nifi", direction="response", data={
+            "processors": len(flow.get("processors", []) or []), "connections": len(flow.get("connections", []) or [])
+        }).debug("Received from NiFi API")
+    except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+        local_logger.error(f"API error fetching process group for spec apply: {e}", exc_info=False)
+        return {"status": "error", "message": f"Failed to fetch process group: {e}", "results": None}
+
+    plan = _plan_process_group_spec(flow, spec, prune, update_sensitive)
+    live_processors = plan["live_processors"]
+    processor_ids = {name: entity["id"] for name, entity in live_processors.items()}
+    rows: List[List[Any]] = []
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    def _plan_rows() -> List[List[Any]]:
+        planned = [["processor", name, "stop", processor_ids.get(name)] for name in sorted(plan["stop"])]
+        planned += [["connection", f"{op['key'][0]} -> {op['key'][1]}", "delete", op["entity"]["id"]] for op in plan["delete_connections"]]
+        planned += [["processor", op["name"], "delete", op["entity"]["id"]] for op in plan["delete_processors"]]
+        planned += [["processor", op["name"], "create", None] for op in plan["create_processors"]]
+        planned += [["processor", op["name"], "update", op["entity"]["id"]] for op in plan["update_processors"]]
+        planned += [["connection", f"{op['key'][0]} -> {op['key'][1]}", "create", None] for op in plan["create_connections"]]
+        planned += [["connection", f"{op['key'][0]} -> {op['key'][1]}", "update", op["entity"]["id"]] for op in plan["update_connections"]]
+        planned += [["processor", name, f"set_{state.lower()}", processor_ids.get(name)] for name, state in sorted(plan["states"].items())]
+        return planned
+
+    rows.extend(plan["skipped"])
+    if dry_run:
+        rows += [row + ["planned", None] for row in _plan_rows()]
+    else:
+        async def _run(kind: str, name: str, action: str, object_id: Optional[str], coro_factory) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    result = await coro_factory()
+                except (NiFiAuthenticationError, ConnectionError, ValueError, TypeError, ToolError) as e:
+                    local_logger.warning(f"Spec apply: {action} {kind} '{name}' failed: {e}")
+                    rows.append([kind, name, action, object_id, "error", str(e)])
+                    return None
+                except Exception as e:
+                    local_logger.error(f"Spec apply: unexpected error during {action} {kind} '{name}': {e}", exc_info=True)
+                    rows.append([kind, name, action, object_id, "error", f"An unexpected error occurred: {e}"])
+                    return None
+            if isinstance(result, dict) and result.get("id"):
+                object_id = result["id"]
+            rows.append([kind, name, action, object_id, "done", None])
+            return result if result is not None else {}
+
+        async def _stop(name: str):
+            await nifi_client.update_processor_state(processor_ids[name], "STOPPED")
+            if not await _wait_for_processor_threads(nifi_client, processor_ids[name], stop_timeout_seconds):
+                raise ToolError(f"Processor still has active threads after {stop_timeout_seconds}s.")
+            return {"id": processor_ids[name]}
+
+        async def _update_processor(op: Dict[str, Any]):
+            entity = op["entity"]
+            if op["properties"]:
+                entity = await nifi_client.update_processor_config(entity["id"], "properties", op["properties"], current_entity=entity)
+            if op["relationships"] is not None:
+                entity = await nifi_client.update_processor_config(entity["id"], "auto-terminatedrelationships", op["relationships"], current_entity=entity)
+            return entity
+
+        async def _create_processor(op: Dict[str, Any]):
+            desired = op["spec"]
+            position = desired.get("position") or {"x": 0.0, "y": 200.0 * op["index"]}
+            properties = {k: v for k, v in (desired.get("properties") or {}).items() if v is not None}
+            entity = await nifi_client.create_processor(pg_id, desired["type"], op["name"], position, properties or None)
+            if desired.get("auto_terminated_relationships"):
+                entity = await nifi_client.update_processor_config(
+                    entity["id"], "auto-terminatedrelationships", desired["auto_terminated_relationships"], current_entity=entity
+                )
+            processor_ids[op["name"]] = entity["id"]
+            return entity
+
+        async def _update_connection(op: Dict[str, Any]):
+            entity = op["entity"]
+            payload = {"revision": entity["revision"], "component": {"id": entity["id"], "selectedRelationships": op["relationships"]}}
+            return await nifi_client.update_connection(entity["id"], payload)
+
+        planned = _plan_rows()
+        planned_order = {tuple(row[:3]): index for index, row in reversed(list(enumerate(planned)))}
+        local_logger.info(f"Applying spec to {pg_id}: {len(planned)} operations")
+        # Stopping is a precondition for everything else on those processors, so a failure there skips them
+        stop_names = sorted(plan["stop"])
+        stopped = await asyncio.gather(*(_run("processor", n, "stop", processor_ids[n], lambda n=n: _stop(n)) for n in stop_names))
+        blocked = {name for name, result in zip(stop_names, stopped) if result is None}
+        if blocked:
+            for kind, action, key in (("processor", "update", "update_processors"), ("processor", "delete", "delete_processors"),
+                                      ("connection", "update", "update_connections"), ("connection", "delete", "delete_connections")):
+                for op in plan[key]:
+                    name = op["name"] if kind == "processor" else f"{op['key'][0]} -> {op['key'][1]}"
+                    if (op["name"] if kind == "processor" else op["key"][0]) in blocked:
+                        rows.append([kind, name, action, op["entity"]["id"], "skipped", "Processor could not be stopped."])
+            plan["update_processors"] = [op for op in plan["update_processors"] if op["name"] not in blocked]
+            plan["delete_processors"] = [op for op in plan["delete_processors"] if op["name"] not in blocked]
+            plan["update_connections"] = [op for op in plan["update_connections"] if op["key"][0] not in blocked]
+            plan["delete_connections"] = [op for op in plan["delete_connections"] if op["key"][0] not in blocked]
+            plan["states"] = {name: state for name, state in plan["states"].items() if name not in blocked}
+        await asyncio.gather(*(
+            _run("connection", f"{op['key'][0]} -> {op['key'][1]}", "delete", op["entity"]["id"],
+                 lambda op=op: nifi_client.delete_connection(op["entity"]["id"], op["entity"]["revision"]["version"]))
+            for op in plan["delete_connections"]
+        ))
+        await asyncio.gather(*(
+            _run("processor", op["name"], "delete", op["entity"]["id"],
+                 lambda op=op: nifi_client.delete_processor(op["entity"]["id"]))
+            for op in plan["delete_processors"]
+        ))
+        await asyncio.gather(
+            *(_run("processor", op["name"], "create", None, lambda op=op: _create_processor(op)) for op in plan["create_processors"]),
+            *(_run("processor", op["name"], "update", op["entity"]["id"], lambda op=op: _update_processor(op)) for op in plan["update_processors"]),
+        )
+        await asyncio.gather(
+            *(_run("connection", f"{op['key'][0]} -> {op['key'][1]}", "create", None,
+                   lambda op=op: nifi_client.create_connection(pg_id, processor_ids[op["key"][0]], processor_ids[op["key"][1]], op["relationships"]))
+              for op in plan["create_connections"] if op["key"][0] in processor_ids and op["key"][1] in processor_ids),
+            *(_run("connection", f"{op['key'][0]} -> {op['key'][1]}", "update", op["entity"]["id"], lambda op=op: _update_connection(op))
+              for op in plan["update_connections"]),
+        )
+        await asyncio.gather(*(
+            _run("processor", name, f"set_{state.lower()}", processor_ids[name],
+                 lambda name=name, state=state: nifi_client.update_processor_state(processor_ids[name], state))
+            for name, state in plan["states"].items() if name in processor_ids
+        ))
+        # Operations finish in any order; report them in plan order (skipped prune rows first)
+        rows.sort(key=lambda row: (planned_order.get(tuple(row[:3]), -1), str(row[3] or "")))
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row[4]] = counts.get(row[4], 0) + 1
+    status = "warning" if counts.get("error") else "success"
+    if not rows:
+        message = f"Process group {pg_id} already matches the spec; no changes needed."
+    else:
+        message = f"{'Planned' if dry_run else 'Applied'} {len(rows)} operations: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+    local_logger.info(f"Spec apply finished for {pg_id}: {counts}")
+    result = {
+        "status": status,
+        "message": message,
+        "counts": counts,
+        "results": {
+            "columns": ["kind", "name", "action", "id", "outcome", "message"],
+            "rows": rows
+        }
+    }
+    if plan["sensitive_skipped"]:
+        result["sensitive_properties_skipped"] = plan["sensitive_skipped"]
+    return result
@@ -1,7 +1,11 @@
 import asyncio
+import math
+import re
 from typing import List, Dict, Optional, Any, Union, Literal
 import httpx
 import json
+import time
+import uuid
 
 # Import necessary components from parent/utils
 from loguru import logger
@@ -9,7 +13,7 @@ from loguru import logger
 from ..core import mcp
 # Removed nifi_api_client import
 # Import context variables
-from ..request_context import current_nifi_client, current_request_logger # Added
+from ..request_context import current_nifi_client, current_request_logger, current_process_group # Added
 # Import utils helper for filtering PG data
 from .utils import (
     tool_phases,
@@ -298,17 +302,564 @@ async def operate_nifi_object(
         return {"status": "error", "message": f"An unexpected error occurred: {e}", "entity": None}
 
 
+# --- Bulk Start/Stop --- #
+
+def _flatten_status_snapshot(aggregate: Dict[str, Any], group_id: str, components: Dict[str, Dict[str, Any]]) -> None:
+    """Collects processor and port run status from a (recursive) process group status snapshot, keyed by component id."""
+    for entry in aggregate.get("processorStatusSnapshots", []) or []:
+        snap = entry.get("processorStatusSnapshot", {})
+        components[entry.get("id") or snap.get("id")] = {
+            "type": "processor", "name": snap.get("name"), "group_id": group_id,
+            "run_status": snap.get("runStatus"), "active_threads": snap.get("activeThreadCount", 0)
+        }
+    for key, port_type in (("inputPortStatusSnapshots", "input_port"), ("outputPortStatusSnapshots", "output_port")):
+        for entry in aggregate.get(key, []) or []:
+            snap = entry.get("portStatusSnapshot", {})
+            components[entry.get("id") or snap.get("id")] = {
+                "type": port_type, "name": snap.get("name"), "group_id": group_id,
+                "run_status": snap.get("runStatus"), "active_threads": snap.get("activeThreadCount", 0)
+            }
+    for entry in aggregate.get("processGroupStatusSnapshots", []) or []:
+        child = entry.get("processGroupStatusSnapshot", {})
+        _flatten_status_snapshot(child, entry.get("id") or child.get("id"), components)
+
+
+async def _snapshot_components(nifi_client: NiFiClient, process_group_id: str) -> Dict[str, Dict[str, Any]]:
+    """Fetches one recursive status snapshot and returns run status for every processor and port beneath the group."""
+    status = await nifi_client.get_process_group_status_snapshot(process_group_id, recursive=True)
+    components: Dict[str, Dict[str, Any]] = {}
+    _flatten_status_snapshot(status.get("aggregateSnapshot", {}), process_group_id, components)
+    return components
+
+
+def _has_converged(component: Dict[str, Any], target_state: str) -> bool:
+    """Running components have converged when running; stopped ones also need their threads to drain."""
+    run_status = (component.get("run_status") or "").upper()
+    if target_state == "RUNNING":
+        return run_status == "RUNNING"
+    return run_status in ("STOPPED", "INVALID", "DISABLED") and not component.get("active_threads")
+
+
 @mcp.tool()
 @tool_phases(["Operate"])
-async def run_processor_once(processor_id: str) -> Dict:
+async def bulk_operate_nifi_components(
+    operation_type: Literal["start", "stop"],
+    component_ids: Optional[List[str]] = None,
+    process_group_id: Optional[str] = None,
+    component_types: Optional[List[Literal["processor", "input_port", "output_port"]]] = None,
+    name_pattern: Optional[str] = None,
+    max_concurrency: int = 8,
+    timeout_seconds: float = 30.0,
+    poll_interval: float = 1.0
+) -> Dict[str, Any]:
+    """
+    Starts or stops many processors and ports at once and waits until they reach the target state.
+
+    Components are given either as explicit `component_ids` or selected within `process_group_id`
+    (recursively) by `component_types` and `name_pattern`. Run-status changes are sent concurrently;
+    convergence is then checked with a single recursive status request per poll instead of one GET
+    per component. Components that have not converged when `timeout_seconds` expires are reported as stragglers.
+
+    Args:
+        operation_type: 'start' or 'stop'.
+        component_ids: Explicit processor/port IDs. They must lie within `process_group_id` (or the session/root group).
+        process_group_id: Scope for selection and status polling. Defaults to the session process group, or root.
+        component_types: Component types to include when selecting by scope. Defaults to all of processor, input_port and output_port.
+        name_pattern: Regular expression matched (search) against component names when selecting by scope.
+        max_concurrency: Maximum number of run-status requests in flight at once.
+        timeout_seconds: Maximum seconds to wait for all components to converge.
+        poll_interval: Seconds between status polls.
+
+    Returns:
+        A dictionary with `status`, `message`, per-outcome `counts`, the list of `stragglers` and a compact
+        `results` table (`columns` plus one row per component: id, name, type, outcome, final run status, message).
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    session_pg_id = current_process_group.get() or None
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+    if not component_ids and not process_group_id and not session_pg_id and not name_pattern and not component_types:
+        raise ToolError("Provide 'component_ids' or a selector (process_group_id, component_types, name_pattern).")
+    try:
+        name_regex = re.compile(name_pattern) if name_pattern else None
+    except re.error as e:
+        raise ToolError(f"Invalid name_pattern '{name_pattern}': {e}")
+
+    target_state = "RUNNING" if operation_type == "start" else "STOPPED"
+    types = set(component_types or ["processor", "input_port", "output_port"])
+    max_concurrency = max(1, max_concurrency)
+    local_logger = local_logger.bind(operation_type=operation_type, process_group_id=process_group_id)
+
+    # --- Step 1: One recursive status snapshot resolves types, names and current states --- #
+    try:
+        scope_pg_id = process_group_id or session_pg_id or await nifi_client.get_root_process_group_id()
+        if session_pg_id and not await nifi_client.is_descendant(scope_pg_id, session_pg_id):
+            raise ToolError(f"Process group {scope_pg_id} is not in the current process group {session_pg_id}.")
+        nifi_req = {"operation": "get_process_group_status_snapshot", "process_group_id": scope_pg_id, "recursive": True}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+        components = await _snapshot_components(nifi_client, scope_pg_id)
+        local_logger.bind(interface="nifi", direction="response", data={"component_count": len(components)}).debug("Received from NiFi API")
+    except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+        local_logger.error(f"Failed to read status snapshot for bulk {operation_type}: {e}")
+        return {"status": "error", "message": f"Failed to read process group status: {e}", "results": None}
+
+    rows: Dict[str, List[Any]] = {}
+    if component_ids:
+        selected = []
+        for cid in component_ids:
+            if cid in components:
+                selected.append(cid)
+            else:
+                rows[cid] = [cid, None, None, "not_found", None, f"Not a processor or port within process group {scope_pg_id}."]
+    else:
+        selected = [
+            cid for cid, comp in components.items()
+            if comp["type"] in types and (not name_regex or name_regex.search(comp.get("name") or ""))
+        ]
+
+    # --- Step 2: Dispatch run-status changes concurrently --- #
+    semaphore = asyncio.Semaphore(max_concurrency)
+    updaters = {
+        "processor": nifi_client.update_processor_state,
+        "input_port": nifi_client.update_input_port_state,
+        "output_port": nifi_client.update_output_port_state,
+    }
+
+    async def _dispatch(cid: str) -> None:
+        comp = components[cid]
+        if _has_converged(comp, target_state):
+            rows[cid] = [cid, comp["name"], comp["type"], "unchanged", comp.get("run_status"), None]
+            return
+        if target_state == "RUNNING" and (comp.get("run_status") or "").upper() in ("INVALID", "DISABLED"):
+            rows[cid] = [cid, comp["name"], comp["type"], "skipped", comp.get("run_status"), f"Cannot start a component that is {comp.get('run_status')}."]
+            return
+        async with semaphore:
+            try:
+                await updaters[comp["type"]](cid, target_state)
+                rows[cid] = [cid, comp["name"], comp["type"], "dispatched", comp.get("run_status"), None]
+            except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+                local_logger.warning(f"Failed to {operation_type} {comp['type']} {cid}: {e}")
+                rows[cid] = [cid, comp["name"], comp["type"], "error", comp.get("run_status"), str(e)]
+
+    await asyncio.gather(*(_dispatch(cid) for cid in selected))
+    pending = {cid for cid, row in rows.items() if row[3] == "dispatched"}
+    local_logger.info(f"Dispatched {operation_type} to {len(pending)} of {len(selected)} selected components; waiting for convergence")
+
+    # --- Step 3: Wait for convergence with one recursive status poll per interval --- #
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout_seconds
+    while pending:
+        await asyncio.sleep(poll_interval)
+        try:
+            components = await _snapshot_components(nifi_client, scope_pg_id)
+        except (NiFiAuthenticationError, ConnectionError, ValueError) as e:
+            local_logger.warning(f"Status poll failed during bulk {operation_type}: {e}")
+            components = {}
+        for cid in list(pending):
+            comp = components.get(cid)
+            if comp is None:
+                continue
+            rows[cid][4] = comp.get("run_status")
+            if _has_converged(comp, target_state):
+                rows[cid][3] = "converged"
+                pending.discard(cid)
+        if loop.time() >= deadline:
+            break
+
+    for cid in pending:
+        rows[cid][3] = "straggler"
+        rows[cid][5] = f"Did not reach {target_state} within {timeout_seconds}s."
+
+    ordered_rows = [rows[cid] for cid in (component_ids or selected) if cid in rows]
+    counts: Dict[str, int] = {}
+    for row in ordered_rows:
+        counts[row[3]] = counts.get(row[3], 0) + 1
+    status = "success" if not (counts.get("error") or counts.get("straggler") or counts.get("not_found")) else "warning"
+    local_logger.info(f"Bulk {operation_type} finished: {counts}")
+    return {
+        "status": status,
+        "message": f"Bulk {operation_type} of {len(ordered_rows)} components: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) if ordered_rows else "No components matched the selection.",
+        "counts": counts,
+        "stragglers": sorted(pending),
+        "results": {
+            "columns": ["component_id", "name", "type", "outcome", "run_status", "message"],
+            "rows": ordered_rows
+        }
+    }
+
+
+# --- Recursive Teardown --- #
+
+def _collect_group_tree(
+    aggregate: Dict[str, Any],
+    group_id: str,
+    depth: int,
+    groups: List[Dict[str, Any]],
+    connections: Dict[str, Dict[str, Any]]
+) -> None:
+    """Collects (group, depth) pairs and per-connection queue counts from a recursive status snapshot."""
+    groups.append({"id": group_id, "name": aggregate.get("name"), "depth": depth})
+    for entry in aggregate.get("connectionStatusSnapshots", []) or []:
+        snap = entry.get("connectionStatusSnapshot", {})
+        connections[entry.get("id") or snap.get("id")] = {
+            "group_id": group_id, "name": snap.get("name"), "queued": snap.get("flowFilesQueued", 0) or 0
+        }
+    for entry in aggregate.get("processGroupStatusSnapshots", []) or []:
+        child = entry.get("processGroupStatusSnapshot", {})
+        _collect_group_tree(child, entry.get("id") or child.get("id"), depth + 1, groups, connections)
+
+
+async def _drop_connection_queue(
+    nifi_client: NiFiClient,
+    connection_id: str,
+    polling_interval: float,
+    polling_timeout: float,
+    local_logger
+) -> Dict[str, Any]:
+    """Runs one drop request to completion and always deletes it afterwards."""
+    request_id = None
+    try:
+        nifi_req = {"operation": "create_drop_request", "connection_id": connection_id}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+        drop_request = await nifi_client.create_drop_request(connection_id)
+        request_id = drop_request.get("id")
+        local_logger.bind(interface="nifi", direction="response", data={"request_id": request_id}).debug("Received from NiFi API")
+        if not request_id:
+            raise ToolError(f"Failed to get drop request ID from NiFi for connection {connection_id}.")
+
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        while not drop_request.get("finished"):
+            if loop.time() - start_time > polling_timeout:
+                raise TimeoutError(f"Timed out waiting for drop request {request_id} on connection {connection_id}.")
+            await asyncio.sleep(polling_interval)
+            drop_request = await nifi_client.get_drop_request(connection_id, request_id)
+        if drop_request.get("failureReason"):
+            raise ToolError(f"Drop request for connection {connection_id} failed: {drop_request.get('failureReason')}")
+        return {"connection_id": connection_id, "dropped": drop_request.get("droppedCount", 0)}
+    finally:
+        if request_id:
+            try:
+                await nifi_client.shield_cleanup(nifi_client.delete_drop_request(connection_id, request_id))
+            except Exception as del_e:
+                local_logger.warning(f"Failed to delete drop request {request_id}: {del_e}")
+
+
+# Client method that stops a running component at the far end of a boundary connection, by NiFi connectable type
+_EXTERNAL_STOPPERS = {
+    "PROCESSOR": "update_processor_state",
+    "INPUT_PORT": "update_input_port_state",
+    "OUTPUT_PORT": "update_output_port_state",
+}
+
+
+@mcp.tool()
+@tool_phases(["Modify", "Operate"])
+async def teardown_process_group(
+    process_group_id: str,
+    delete_group: bool = True,
+    max_concurrency: int = 4,
+    timeout_seconds: float = 60.0,
+    polling_interval: float = 0.5
+) -> Dict[str, Any]:
+    """
+    Recursively tears down a process group: stops everything in it, empties every queue and deletes its contents.
+
+    Steps: stop the whole subtree and wait for running threads to finish; stop the components in the
+    parent group that feed or read the group's ports; disable every controller service in the subtree
+    and wait until they are disabled; drop the FlowFiles of every non-empty connection,
+    including the parent group's connections to the group's ports (drop requests run concurrently and
+    are always cleaned up); delete those boundary connections, then all connections inside; delete
+    nested process groups bottom-up (deepest first, each level in parallel); finally delete the group
+    itself, or only its processors, ports and funnels when `delete_group` is False.
+    This permanently discards queued data. If the group is the session process group, its parent is
+    outside the session's scope: connections from the parent to the group's ports are then reported as
+    errors and nothing is changed.
+
+    Args:
+        process_group_id: The ID of the process group to tear down.
+        delete_group: Whether to delete the process group itself. If False, the empty group is kept.
+        max_concurrency: Maximum number of NiFi requests of each step in flight at once.
+        timeout_seconds: Maximum seconds to wait for threads to stop and for each drop request.
+        polling_interval: Seconds between status/drop request polls.
+
+    Returns:
+        A dictionary with `status`, `message`, per-step counts (`stopped_components` counts the components
+        that were running, `stopped_external_components`, `disabled_controller_services`, `dropped_flowfiles`,
+        `deleted_connections`, `deleted_process_groups`, `deleted_components`) and a list of `errors`.
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    session_pg_id = current_process_group.get() or None
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+
+    local_logger = local_logger.bind(process_group_id=process_group_id, delete_group=delete_group)
+    max_concurrency = max(1, max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    errors: List[Dict[str, Any]] = []
+    summary = {"stopped_components": 0, "stopped_external_components": 0, "disabled_controller_services": 0, "dropped_flowfiles": 0,
+               "deleted_connections": 0, "deleted_process_groups": 0, "deleted_components": 0}
+
+    async def _bounded(coro_factory, object_id: str, step: str):
+        async with semaphore:
+            try:
+                return await coro_factory()
+            except (NiFiAuthenticationError, ConnectionError, ValueError, ToolError, TimeoutError) as e:
+                local_logger.warning(f"Teardown step '{step}' failed for {object_id}: {e}")
+                errors.append({"step": step, "id": object_id, "error": str(e)})
+                return None
+
+    def _result(status: str, message: str) -> Dict[str, Any]:
+        return {"status": status, "message": message, "process_group_id": process_group_id, **summary, "errors": errors}
+
+    try:
+        if session_pg_id and not await nifi_client.is_descendant(process_group_id, session_pg_id):
+            raise ToolError(f"Process group {process_group_id} is not in the current process group {session_pg_id}.")
+        if delete_group and process_group_id == await nifi_client.get_root_process_group_id():
+            raise ToolError("The root process group cannot be deleted. Use delete_group=False to empty it instead.")
+
+        # --- Step 0: Find the parent group's connections to the group's ports --- #
+        # NiFi refuses to delete a connection whose source or destination is running (funnels excepted),
+        # and refuses to delete a port, or the group, while such a connection exists.
+        parent_id = (await nifi_client.get_process_group_details(process_group_id)).get("component", {}).get("parentGroupId")
+        boundary_connections: List[Dict[str, Any]] = []
+        if parent_id:
+            boundary_connections = [
+                conn for conn in await nifi_client.list_connections(parent_id)
+                if process_group_id in (
+                    conn.get("component", {}).get("source", {}).get("groupId"),
+                    conn.get("component", {}).get("destination", {}).get("groupId"),
+                )
+            ]
+        if boundary_connections and session_pg_id and not await nifi_client.is_descendant(parent_id, session_pg_id):
+            for conn in boundary_connections:
+                errors.append({"step": "boundary_connection", "id": conn["id"],
+                               "error": f"Connection in parent group {parent_id}, outside the session process group {session_pg_id}; remove it first."})
+            return _result("error", f"{len(boundary_connections)} connections outside the session process group lead to the group's ports; nothing was changed.")
+
+        # --- Step 1: Stop the subtree and wait for active threads to finish --- #
+        local_logger.info(f"Stopping all components under process group {process_group_id}")
+        running_before = [cid for cid, comp in (await _snapshot_components(nifi_client, process_group_id)).items()
+                          if (comp.get("run_status") or "").upper() == "RUNNING"]
+        nifi_req = {"operation": "update_process_group_state", "process_group_id": process_group_id, "state": "STOPPED"}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+        await nifi_client.update_process_group_state(process_group_id, "STOPPED")
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout_seconds
+        while True:
+            components = await _snapshot_components(nifi_client, process_group_id)
+            busy = [cid for cid, comp in components.items() if comp.get("active_threads")]
+            if not busy:
+                break
+            if loop.time() >= deadline:
+                return _result("error", f"{len(busy)} components still have active threads after {timeout_seconds}s: {busy[:10]}")
+            await asyncio.sleep(polling_interval)
+        summary["stopped_components"] = len(running_before)
+
+        # --- Step 1b: Stop the components in the parent group at the other end of those connections --- #
+        external: Dict[str, str] = {}
+        for conn in boundary_connections:
+            for end in (conn.get("component", {}).get("source", {}), conn.get("component", {}).get("destination", {})):
+                if end.get("groupId") != process_group_id and end.get("running") and end.get("type") in _EXTERNAL_STOPPERS:
+                    external[end["id"]] = end["type"]
+        if external:
+            local_logger.info(f"Stopping {len(external)} components in parent group {parent_id} connected to the group's ports")
+        stopped = await asyncio.gather(*(
+            _bounded(lambda cid=cid, ctype=ctype: getattr(nifi_client, _EXTERNAL_STOPPERS[ctype])(cid, "STOPPED"), cid, "stop_external_component")
+            for cid, ctype in external.items()
+        ))
+        summary["stopped_external_components"] = sum(1 for s in stopped if s)
+        if errors:
+            return _result("error", f"Could not stop {len(errors)} components connected to the group's ports; nothing was deleted.")
+
+        # --- Step 1c: Disable the subtree's controller services; NiFi keeps groups holding enabled ones --- #
+        services = await nifi_client.list_controller_services(process_group_id)
+        enabled = [svc["id"] for svc in services if (svc.get("component", {}).get("state") or "").upper() != "DISABLED"]
+        if enabled:
+            local_logger.info(f"Disabling {len(enabled)} controller services under process group {process_group_id}")
+            nifi_req = {"operation": "update_controller_services_state", "process_group_id": process_group_id, "state": "DISABLED"}
+            local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+            await nifi_client.update_controller_services_state(process_group_id, "DISABLED")
+            deadline = loop.time() + timeout_seconds
+            while True:
+                services = await nifi_client.list_controller_services(process_group_id)
+                pending = [svc["id"] for svc in services if (svc.get("component", {}).get("state") or "").upper() != "DISABLED"]
+                if not pending:
+                    break
+                if loop.time() >= deadline:
+                    errors.extend({"step": "disable_controller_service", "id": sid, "error": f"Not disabled after {timeout_seconds}s."} for sid in pending)
+                    return _result("error", f"{len(pending)} controller services are still enabled after {timeout_seconds}s; nothing was deleted.")
+                await asyncio.sleep(polling_interval)
+            summary["disabled_controller_services"] = len(enabled)
+
+        # --- Step 2: Drop every non-empty queue concurrently --- #
+        status = await nifi_client.get_process_group_status_snapshot(process_group_id, recursive=True)
+        groups: List[Dict[str, Any]] = []
+        connections: Dict[str, Dict[str, Any]] = {}
+        _collect_group_tree(status.get("aggregateSnapshot", {}), process_group_id, 0, groups, connections)
+        # Boundary connections are dropped unconditionally; the parent listing carries no fresh queue counts
+        queued = [cid for cid, conn in connections.items() if conn["queued"]] + [conn["id"] for conn in boundary_connections]
+        local_logger.info(f"Dropping queued FlowFiles from {len(queued)} of {len(connections)} connections")
+        drops = await asyncio.gather(*(
+            _bounded(lambda cid=cid: _drop_connection_queue(nifi_client, cid, polling_interval, timeout_seconds, local_logger), cid, "drop_queue")
+            for cid in queued
+        ))
+        summary["dropped_flowfiles"] = sum(d["dropped"] or 0 for d in drops if d)
+        if errors:
+            return _result("error", f"Could not empty {len(errors)} queues; nothing was deleted.")
+
+        # --- Step 3: Delete the boundary connections, then all connections inside (listing feeds the revision cache) --- #
+        deleted = await asyncio.gather(*(
+            _bounded(lambda conn=conn: nifi_client.delete_connection(conn["id"], conn.get("revision", {}).get("version")), conn["id"], "delete_connection")
+            for conn in boundary_connections
+        ))
+        summary["deleted_connections"] = sum(1 for d in deleted if d)
+        listed = await asyncio.gather(*(
+            _bounded(lambda gid=group["id"]: nifi_client.list_connections(gid), group["id"], "list_connections") for group in groups
+        ))
+        connection_entities = [conn for group_conns in listed if group_conns for conn in group_conns]
+        deleted = await asyncio.gather(*(
+            _bounded(lambda conn=conn: nifi_client.delete_connection(conn["id"], conn.get("revision", {}).get("version")), conn["id"], "delete_connection")
+            for conn in connection_entities
+        ))
+        summary["deleted_connections"] += sum(1 for d in deleted if d)
+
+        # --- Step 4: Delete nested groups bottom-up, one depth level at a time --- #
+        max_depth = max((group["depth"] for group in groups), default=0)
+        for depth in range(max_depth, 0, -1):
+            level = [group["id"] for group in groups if group["depth"] == depth]
+            results = await asyncio.gather(*(
+                _bounded(lambda gid=gid: nifi_client.delete_process_group(gid), gid, "delete_process_group") for gid in level
+            ))
+            summary["deleted_process_groups"] += sum(1 for r in results if r)
+
+        # --- Step 5: Delete the group itself, or just its remaining processors, ports and funnels --- #
+        if delete_group:
+            if await _bounded(lambda: nifi_client.delete_process_group(process_group_id), process_group_id, "delete_process_group"):
+                summary["deleted_process_groups"] += 1
+        else:
+            processors, input_ports, output_ports, funnels = await asyncio.gather(
+                nifi_client.list_processors(process_group_id),
+                nifi_client.get_input_ports(process_group_id),
+                nifi_client.get_output_ports(process_group_id),
+                nifi_client.get_funnels(process_group_id),
+            )
+            deleters = (
+                [(p, nifi_client.delete_processor) for p in processors]
+                + [(p, nifi_client.delete_input_port) for p in input_ports]
+                + [(p, nifi_client.delete_output_port) for p in output_ports]
+                + [(f, nifi_client.delete_funnel) for f in funnels]
+            )
+            results = await asyncio.gather(*(
+                _bounded(lambda e=entity, d=deleter: d(e["id"], e.get("revision", {}).get("version")), entity["id"], "delete_component")
+                for entity, deleter in deleters
+            ))
+            summary["deleted_components"] = sum(1 for r in results if r)
+
+    except (NiFiAuthenticationError, ConnectionError, ValueError, ToolError) as e:
+        local_logger.error(f"Teardown of process group {process_group_id} failed: {e}")
+        errors.append({"step": "teardown", "id": process_group_id, "error": str(e)})
+        return _result("error", f"Teardown failed: {e}")
+
+    local_logger.info(f"Teardown of process group {process_group_id} finished: {summary}, {len(errors)} errors")
+    if errors:
+        return _result("warning", f"Teardown finished with {len(errors)} errors.")
+    return _result("success", f"Process group {process_group_id} torn down successfully.")
+
+
+# --- Run Once Polling --- #
+
+_RUN_ONCE_COUNTERS = {
+    "tasks_completed": "taskCount",
+    "flowfiles_in": "flowFilesIn",
+    "flowfiles_out": "flowFilesOut",
+    "bytes_in": "bytesIn",
+    "bytes_out": "bytesOut",
+    "bytes_read": "bytesRead",
+    "bytes_written": "bytesWritten",
+}
+# Seconds the processor may sit stopped and idle, with no sign of the run, before it is reported as not observed
+RUN_ONCE_IDLE_GRACE_SECONDS = 2.0
+
+async def _await_run_once_completion(
+    nifi_client: NiFiClient,
+    processor_id: str,
+    baseline: Dict[str, Any],
+    timeout_seconds: float,
+    local_logger
+) -> Dict[str, Any]:
+    """Polls processor status with a growing interval until the single run has finished or the timeout expires.
+
+    NiFi's status counters are rolling five-minute totals, so a counter can also fall as old tasks leave
+    the window. The run therefore only counts as finished once it was observed (a poll saw an active
+    thread, or the task counter rose above the baseline) and no threads are active any more. If the
+    processor sits stopped and idle for RUN_ONCE_IDLE_GRACE_SECONDS without either sign, the run is
+    reported as not observed: it may have finished between polls with the window hiding it, or found
+    nothing to do. The `io` deltas are differences of rolling totals and are best-effort for the same reason.
+    """
+    loop = asyncio.get_event_loop()
+    started = loop.time()
+    interval = 0.1
+    idle_since = None
+    status = baseline
+    observed = False
+    completed = False
+    timed_out = False
+    while True:
+        await asyncio.sleep(interval)
+        status = await nifi_client.get_processor_status(processor_id)
+        active_threads = status.get("activeThreadCount", 0) or 0
+        tasks_delta = (status.get("taskCount", 0) or 0) - (baseline.get("taskCount", 0) or 0)
+        stopped = (status.get("runStatus") or "").upper() != "RUNNING"
+        observed = observed or active_threads > 0 or tasks_delta > 0
+        if observed and active_threads == 0:
+            completed = True
+            break
+        now = loop.time()
+        if stopped and active_threads == 0:
+            idle_since = idle_since if idle_since is not None else now
+            if now - idle_since >= RUN_ONCE_IDLE_GRACE_SECONDS:
+                break
+        else:
+            idle_since = None
+        if now - started >= timeout_seconds:
+            timed_out = True
+            break
+        interval = min(interval * 1.5, 1.0)
+
+    duration = round(loop.time() - started, 3)
+    # Clamped at zero: tasks leaving the rolling window can make a delta negative
+    io = {name: max(0, (status.get(key, 0) or 0) - (baseline.get(key, 0) or 0)) for name, key in _RUN_ONCE_COUNTERS.items()}
+    local_logger.debug(f"Run-once poll finished after {duration}s (completed={completed}, observed={observed}): {io}")
+    return {
+        "completed": completed,
+        "observed": observed,
+        "timed_out": timed_out,
+        "duration_seconds": duration,
+        "active_threads": status.get("activeThreadCount", 0),
+        "io": io,
+    }
+
+
+@mcp.tool()
+@tool_phases(["Operate"])
+async def run_processor_once(processor_id: str, timeout_seconds: float = 10.0) -> Dict:
     """
     Attempts to run a single execution cycle for a specified processor.
 
-    Ensures the processor is stopped first, then requests a single run using the RUN_ONCE state.
-    Useful for step-by-step debugging.
+    Ensures the processor is stopped first, then requests a single run using the RUN_ONCE state and
+    polls the processor status (active threads, task count, in/out counters) until the run has
+    finished or `timeout_seconds` expires. Useful for step-by-step debugging.
+
+    NiFi reports these counters as rolling five-minute totals, so completion is only declared once the
+    run was seen (an active thread or a rising task count). A run that finishes between polls without
+    moving the totals is reported with `observed: false`, and the `io` deltas are best-effort.
 
     Args:
         processor_id: The ID of the target processor.
+        timeout_seconds: Maximum seconds to wait for the single run to finish.
 
     Returns:
         A dictionary indicating the status:
@@ -316,7 +867,11 @@ async def run_processor_once(processor_id: str) -> Dict:
           "status": "success" | "warning" | "error",
           "message": "Processor XYZ successfully triggered for one run.",
           "processor_id": "...",
-          "final_state": "STOPPED" | "RUNNING" | "DISABLED" | "INVALID" | "UNKNOWN"
+          "final_state": "STOPPED" | "RUNNING" | "DISABLED" | "INVALID" | "UNKNOWN",
+          "duration_seconds": 0.42,
+          "timed_out": false,
+          "observed": true,
+          "io": {"tasks_completed": 1, "flowfiles_in": 1, "flowfiles_out": 1, "bytes_in": 12, "bytes_out": 12, ...}
         }
     """
     # Get client and logger from context
@@ -366,29 +921,21 @@ async def run_processor_once(processor_id: str) -> Dict:
         else: # Already STOPPED
             local_logger.info("Processor is already stopped.")
 
-        # --- Step 3: Trigger RUN_ONCE ---
+        # --- Step 3: Capture baseline counters, then trigger RUN_ONCE ---
+        baseline_status = await nifi_client.get_processor_status(processor_id)
         local_logger.info(f"Triggering RUN_ONCE for processor '{processor_name}' (Revision: {latest_revision.get('version')})...")
-        run_once_payload = {
-            "revision": latest_revision,
-            "state": "RUN_ONCE",
-            "disconnectedNodeAcknowledged": False
-        }
-        client = await nifi_client._get_client() # Get httpx client
-        endpoint = f"/processors/{processor_id}/run-status"
-        nifi_runonce_req = {"operation": "set_run_once", "processor_id": processor_id, "state": "RUN_ONCE"}
+        nifi_runonce_req = {"operation": "update_processor_state", "processor_id": processor_id, "state": "RUN_ONCE"}
         local_logger.bind(interface="nifi", direction="request", data=nifi_runonce_req).debug("Calling NiFi API")
-        response = await client.put(endpoint, json=run_once_payload)
-        response.raise_for_status()
-        run_once_result = response.json()
+        # Same revisioned write path as start/stop: component lock, revision cache and one retry on 409
+        run_once_result = await nifi_client.update_processor_state(processor_id, "RUN_ONCE")
         # Update revision in case it changed again, though unlikely for RUN_ONCE
         latest_revision = run_once_result.get("revision", latest_revision)
         local_logger.info(f"RUN_ONCE command submitted successfully for processor '{processor_name}'.")
         local_logger.bind(interface="nifi", direction="response", data=filter_created_processor_data(run_once_result)).debug("Received from NiFi API")
 
-        # --- Step 4: Wait and Check Final State ---
-        wait_seconds = 2 # Wait a couple of seconds for potential execution
-        local_logger.info(f"Waiting {wait_seconds} seconds before checking final state...")
-        await asyncio.sleep(wait_seconds)
+        # --- Step 4: Poll until the run has finished, then check final state ---
+        local_logger.info(f"Waiting up to {timeout_seconds} seconds for the run to finish...")
+        run_result = await _await_run_once_completion(nifi_client, processor_id, baseline_status, timeout_seconds, local_logger)
 
         local_logger.info("Checking final processor state...")
         nifi_final_get_req = {"operation": "get_processor_details", "processor_id": processor_id}
@@ -398,11 +945,25 @@ async def run_processor_once(processor_id: str) -> Dict:
         local_logger.bind(interface="nifi", direction="response", data=filter_created_processor_data(final_details)).debug("Received from NiFi API")
         local_logger.info(f"Processor '{processor_name}' final state after RUN_ONCE attempt: {final_state}")
 
+        if run_result["timed_out"]:
+            message = (f"Processor '{processor_name}' was triggered for one run but had not finished after {timeout_seconds}s "
+                       f"({run_result['active_threads']} active threads). Final state observed: {final_state}.")
+        elif not run_result["observed"]:
+            message = (f"Processor '{processor_name}' was triggered for one run, but the run was not observed: no active "
+                       f"thread was seen and the task count did not rise (NiFi's counters are rolling five-minute totals, "
+                       f"and the run may have found nothing to do). Final state observed: {final_state}.")
+        else:
+            message = (f"Processor '{processor_name}' successfully triggered for one run in {run_result['duration_seconds']}s. "
+                       f"Final state observed: {final_state}.")
         return {
-            "status": "success",
-            "message": f"Processor '{processor_name}' successfully triggered for one run. Final state observed: {final_state}.",
+            "status": "success" if run_result["completed"] else "warning",
+            "message": message,
             "processor_id": processor_id,
-            "final_state": final_state
+            "final_state": final_state,
+            "duration_seconds": run_result["duration_seconds"],
+            "timed_out": run_result["timed_out"],
+            "observed": run_result["observed"],
+            "io": run_result["io"]
         }
 
     except ValueError as e:
@@ -425,6 +986,145 @@ async def run_processor_once(processor_id: str) -> Dict:
         return {"status": "error", "message": f"An unexpected error occurred: {e}", "processor_id": processor_id, "final_state": initial_state}
 
 
+# --- HTTP Load Mode --- #
+
+# Upper bounds of one load run, so a single tool call cannot flood the target or tie up the bridge
+MAX_LOAD_REQUESTS = 10000
+MAX_LOAD_CONCURRENCY = 100
+# Only these placeholders are substituted; any other '$' in a payload is sent unchanged
+_LOAD_PLACEHOLDER_PATTERN = re.compile(r"\$\{(request_index|request_uuid|request_timestamp)\}")
+
+def _fill_load_placeholders(payload_text: str, index: int) -> str:
+    """Substitutes ${request_index}, ${request_uuid} and ${request_timestamp} in a load payload."""
+    values = {"request_index": str(index), "request_uuid": str(uuid.uuid4()), "request_timestamp": str(int(time.time() * 1000))}
+    return _LOAD_PLACEHOLDER_PATTERN.sub(lambda match: values[match.group(1)], payload_text)
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _run_http_load(
+    url: str,
+    method: str,
+    headers: Dict[str, str],
+    payload_text: Optional[str],
+    timeout_seconds: float,
+    total_requests: Optional[int],
+    concurrency: int,
+    rate_per_second: Optional[float],
+    duration_seconds: Optional[float],
+    sample_responses: int,
+    local_logger
+) -> Dict[str, Any]:
+    """Sends many requests over one pooled client and aggregates throughput, errors and latency percentiles.
+
+    Either `total_requests` are sent by `concurrency` workers, or requests are launched at
+    `rate_per_second` for `duration_seconds` with at most `concurrency` in flight.
+    Payload text may contain ${request_index}, ${request_uuid} and ${request_timestamp} placeholders.
+    """
+    templated = payload_text is not None and _LOAD_PLACEHOLDER_PATTERN.search(payload_text) is not None
+    static_content = payload_text.encode("utf-8") if payload_text is not None and not templated else None
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+    errors: Dict[str, int] = {"timeout": 0, "connection_error": 0}
+    samples: List[Dict[str, Any]] = []
+
+    async def _send(client: httpx.AsyncClient, index: int) -> None:
+        content = static_content
+        if templated:
+            content = _fill_load_placeholders(payload_text, index).encode("utf-8")
+        started = time.perf_counter()
+        try:
+            response = await client.request(method=method, url=url, headers=headers, content=content)
+        except httpx.TimeoutException:
+            errors["timeout"] += 1
+            return
+        except httpx.RequestError as e:
+            errors["connection_error"] += 1
+            local_logger.debug(f"Load request {index} failed: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        latencies.append(elapsed_ms)
+        code = str(response.status_code)
+        status_codes[code] = status_codes.get(code, 0) + 1
+        if len(samples) < sample_responses:
+            samples.append({
+                "request_index": index,
+                "status_code": response.status_code,
+                "latency_ms": round(elapsed_ms, 2),
+                "body": response.text[:500]
+            })
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=timeout_seconds, limits=limits) as client:
+        if rate_per_second:
+            # Open loop: launch on schedule, cap in-flight requests with a semaphore
+            semaphore = asyncio.Semaphore(concurrency)
+            planned = int(rate_per_second * duration_seconds)
+            tasks = []
+
+            async def _paced(index: int) -> None:
+                async with semaphore:
+                    await _send(client, index)
+
+            for index in range(planned):
+                delay = started + index / rate_per_second - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(_paced(index)))
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: a fixed pool of workers drains the request counter
+            next_index = iter(range(total_requests))
+
+            async def _worker() -> None:
+                for index in next_index:
+                    await _send(client, index)
+
+            await asyncio.gather(*(_worker() for _ in range(min(concurrency, total_requests))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    sent = len(latencies) + errors["timeout"] + errors["connection_error"]
+    http_errors = sum(count for code, count in status_codes.items() if code[0] in "45")
+    succeeded = len(latencies) - http_errors
+    summary = {
+        "requests_sent": sent,
+        "succeeded": succeeded,
+        "http_errors": http_errors,
+        "timeouts": errors["timeout"],
+        "connection_errors": errors["connection_error"],
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(sent / elapsed, 2) if elapsed > 0 else None,
+        "concurrency": concurrency,
+        "target_rate_per_second": rate_per_second,
+    }
+    latency_ms = {
+        "min": latencies[0] if latencies else None,
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "max": latencies[-1] if latencies else None,
+    }
+    latency_ms = {k: (round(v, 2) if v is not None else None) for k, v in latency_ms.items()}
+    local_logger.info(f"Load run finished: {summary}")
+    failed = sent - succeeded
+    return {
+        "status": "success" if failed == 0 else ("error" if succeeded == 0 else "warning"),
+        "message": f"Sent {sent} requests in {summary['elapsed_seconds']}s ({summary['throughput_rps']} req/s); {failed} failed.",
+        "load_summary": summary,
+        "latency_ms": latency_ms,
+        "status_codes": status_codes,
+        "samples": samples,
+    }
+
+
 @mcp.tool()
 @tool_phases(["Operate", "Verify"])
 async def invoke_nifi_http_endpoint(
@@ -432,7 +1132,12 @@ async def invoke_nifi_http_endpoint(
     method: Literal["GET", "POST", "PUT", "DELETE", "HEAD", "OPTIONS", "PATCH"] = "POST",
     payload: Optional[Union[str, Dict[str, Any]]] = None,
     headers: Optional[Dict[str, str]] = None,
-    timeout_seconds: int = 10
+    timeout_seconds: int = 10,
+    load_requests: Optional[int] = None,
+    load_concurrency: int = 10,
+    load_rate_per_second: Optional[float] = None,
+    load_duration_seconds: Optional[float] = None,
+    sample_responses: int = 0
 ) -> Dict:
     """
     Sends an HTTP request to a specified URL, typically to test a NiFi flow endpoint (e.g., ListenHTTP).
@@ -451,12 +1156,26 @@ async def invoke_nifi_http_endpoint(
     print(default_api.invoke_nifi_http_endpoint(url='http://localhost:9998/status', method='GET'))
     ```
 
+    Call (load test, 500 requests with 20 in flight, templated payload):
+    ```tool_code
+    print(default_api.invoke_nifi_http_endpoint(url='http://localhost:9999/myflow', payload={'id': '${request_index}'}, load_requests=500, load_concurrency=20, sample_responses=3))
+    ```
+
     Args:
         url: The full URL of the target endpoint.
         method: The HTTP method to use (e.g., GET, POST). Defaults to POST.
         payload: The request body. If a dictionary, it will be sent as JSON with 'Content-Type: application/json' unless overridden in headers. If a string, it's sent as is.
         headers: A dictionary of custom request headers.
         timeout_seconds: Maximum time in seconds to wait for a response. Defaults to 10.
+        load_requests: Load mode. Send this many requests (at most 10000) using `load_concurrency` parallel workers.
+        load_concurrency: Maximum number of requests in flight in load mode (1-100). Defaults to 10.
+        load_rate_per_second: Load mode. Launch requests at this rate for `load_duration_seconds` (use instead of
+            `load_requests`; rate x duration may not exceed 10000 requests).
+        load_duration_seconds: Duration of a rate-based load run.
+        sample_responses: In load mode, include up to this many responses (status, latency, truncated body) in the result.
+
+        In load mode the payload may contain ${request_index}, ${request_uuid} and ${request_timestamp} placeholders,
+        substituted per request.
 
     Returns:
         A dictionary describing the outcome:
@@ -473,6 +1192,8 @@ async def invoke_nifi_http_endpoint(
             "payload_type": str # e.g., 'json', 'string', 'none'
           }
         }
+        In load mode the result instead holds "status", "message", "load_summary" (counts, elapsed seconds,
+        throughput), "latency_ms" (min/mean/p50/p95/p99/max), "status_codes", "samples" and "request_details".
     """
     local_logger = current_request_logger.get() or logger
     local_logger = local_logger.bind(target_url=url, http_method=method)
@@ -480,14 +1201,29 @@ async def invoke_nifi_http_endpoint(
 
     request_headers = headers or {}
     content_to_send = None
+    payload_text = None
     payload_type = "none"
+    load_mode = bool(load_requests) or bool(load_rate_per_second)
+    if load_mode:
+        if load_requests and load_rate_per_second:
+            raise ToolError("Use either 'load_requests' or 'load_rate_per_second', not both.")
+        if load_rate_per_second and not load_duration_seconds:
+            raise ToolError("'load_duration_seconds' is required when 'load_rate_per_second' is set.")
+        if load_requests is not None and not 1 <= load_requests <= MAX_LOAD_REQUESTS:
+            raise ToolError(f"'load_requests' must be between 1 and {MAX_LOAD_REQUESTS}.")
+        if load_rate_per_second and (load_rate_per_second < 0 or load_duration_seconds < 0
+                                     or not 1 <= int(load_rate_per_second * load_duration_seconds) <= MAX_LOAD_REQUESTS):
+            raise ToolError(f"'load_rate_per_second' x 'load_duration_seconds' must be positive and plan between 1 and {MAX_LOAD_REQUESTS} requests.")
+        if not 1 <= load_concurrency <= MAX_LOAD_CONCURRENCY:
+            raise ToolError(f"'load_concurrency' must be between 1 and {MAX_LOAD_CONCURRENCY}.")
 
     try:
         if isinstance(payload, dict):
             if 'content-type' not in (h.lower() for h in request_headers):
                 request_headers['Content-Type'] = 'application/json'
             try:
-                content_to_send = json.dumps(payload).encode('utf-8')
+                payload_text = json.dumps(payload)
+                content_to_send = payload_text.encode('utf-8')
                 payload_type = "json"
             except (TypeError, OverflowError) as json_err:
                  local_logger.error(f"Failed to serialize JSON payload: {json_err}", exc_info=True)
@@ -500,6 +1236,7 @@ async def invoke_nifi_http_endpoint(
                      "request_details": {"url": url, "method": method, "headers": request_headers, "payload_type": "dict (serialization failed)"}
                  }
         elif isinstance(payload, str):
+            payload_text = payload
             content_to_send = payload.encode('utf-8') # Assume UTF-8 for strings
             payload_type = "string"
 
@@ -514,6 +1251,24 @@ async def invoke_nifi_http_endpoint(
             "payload_type": payload_type
         }
 
+        if load_mode:
+            local_logger.info(f"Running load mode: requests={load_requests}, rate={load_rate_per_second}/s, duration={load_duration_seconds}s, concurrency={load_concurrency}")
+            load_result = await _run_http_load(
+                url=url,
+                method=method,
+                headers=final_request_headers,
+                payload_text=payload_text,
+                timeout_seconds=timeout_seconds,
+                total_requests=load_requests,
+                concurrency=load_concurrency,
+                rate_per_second=load_rate_per_second,
+                duration_seconds=load_duration_seconds,
+                sample_responses=sample_responses,
+                local_logger=local_logger
+            )
+            load_result["request_details"] = request_details_for_response
+            return load_result
+
         async with httpx.AsyncClient(timeout=timeout_seconds) as client:
             response = await client.request(
                 method=method,
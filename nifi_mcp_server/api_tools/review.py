@@ -1,6 +1,7 @@
 import asyncio
 from typing import List, Dict, Optional, Any, Union, Literal
 from datetime import datetime # Added import
+from collections import Counter
 
 # Import necessary components from parent/utils
 from loguru import logger # Keep global logger for potential module-level logging if needed
@@ -14,7 +15,9 @@ from .utils import (
     _format_connection_summary,
     _format_port_summary,
     filter_processor_data, # Keep if needed by helpers here
-    filter_connection_data # Add missing import
+    filter_connection_data, # Add missing import
+    emit_progress,
+    is_streaming
 )
 # Keep NiFiClient type hint and error imports
 from nifi_mcp_server.nifi_client import NiFiClient, NiFiAuthenticationError
@@ -159,11 +162,16 @@ async def _list_components_recursively(
             current_level_objects = _format_port_summary(input_ports, output_ports)
             
         if current_level_objects:
-            all_results.append({
+            entry = {
                 "process_group_id": pg_id,
                 "process_group_name": current_pg_name,
                 "objects": current_level_objects
-            })
+            }
+            if is_streaming():
+                # The objects went out as a partial event; the final result only counts them
+                await emit_progress("partial", entry)
+                entry = {"process_group_id": pg_id, "process_group_name": current_pg_name, "object_count": len(current_level_objects)}
+            all_results.append(entry)
             
     except (ConnectionError, ValueError, NiFiAuthenticationError) as e:
         local_logger.error(f"Error fetching {object_type} for PG {pg_id} during recursion: {e}")
@@ -262,7 +270,12 @@ async def _get_process_group_hierarchy(
                         "name": child_name,
                         "counts": counts
                     }
-                    
+                    if is_streaming():
+                        # Streamed callers rebuild the tree from the partial events' parent_id; the final
+                        # result only keeps the ids, names and any errors
+                        await emit_progress("partial", {"parent_id": pg_id, **child_data})
+                        child_data = {"id": child_id, "name": child_name}
+
                     if recursive_search:
                         local_logger.debug(f"Recursively fetching hierarchy for child PG: {child_id}")
                         # Call recursively without passing client/logger
@@ -271,6 +284,8 @@ async def _get_process_group_hierarchy(
                             recursive_search=True
                         )
                         child_data["children"] = child_hierarchy.get("child_process_groups", [])
+                        if child_hierarchy.get("error"):
+                            child_data["error"] = child_hierarchy["error"]
                     
                     hierarchy_data["child_process_groups"].append(child_data)
 
@@ -326,6 +341,9 @@ async def list_nifi_objects(
         - For object_type 'process_groups':
             - If search_scope='current_group': A list of child process group summaries (id, name, counts).
             - If search_scope='recursive': A nested dictionary representing the process group hierarchy including names, IDs, component counts, and children.
+        When streamed, each group's objects (or child group summary) arrive as 'partial' events and the final
+        result is a summary: recursive object listings carry an 'object_count' per group instead of 'objects',
+        and the recursive hierarchy keeps only ids, names, children and errors.
     """
     # Get client and logger from context variables
     nifi_client: Optional[NiFiClient] = current_nifi_client.get()
@@ -640,6 +658,7 @@ async def document_nifi_flow(
             "port_count": len(input_ports_resp or []) + len(output_ports_resp or [])
         }
         local_logger.bind(interface="nifi", direction="response", data=nifi_resp_components).debug("Received from NiFi API (multiple calls)")
+        await emit_progress("progress", {"stage": "components_fetched", "process_group_id": target_pg_id, **nifi_resp_components})
 
         processors = {p['id']: p for p in processors_resp if 'id' in p}
         connections = {c['id']: c for c in connections_resp if 'id' in c}
@@ -695,6 +714,7 @@ async def document_nifi_flow(
 
         # Analyze and document the flow
         local_logger.info("Analyzing flow structure...")
+        await emit_progress("progress", {"stage": "analyzing_flow", "node_count": len(nodes_by_id)})
         start_node_id = starting_processor_id # Use provided start if available
         
         # If no specific processor start, try to find source nodes (input ports or processors with no incoming connections)
@@ -1299,6 +1319,7 @@ async def list_flowfiles(
                     request_status = await nifi_client.get_flowfile_listing_request(target_id, request_id)
                     nifi_resp_get = {"finished": request_status.get("finished"), "percentCompleted": request_status.get("percentCompleted")}
                     local_logger.bind(interface="nifi", direction="response", data=nifi_resp_get).debug("Received from NiFi API (polling)")
+                    await emit_progress("progress", {"stage": "queue_listing", **nifi_resp_get})
                     
                     if request_status.get("finished"): 
                         local_logger.info(f"Queue listing request {request_id} finished.")
@@ -1326,7 +1347,7 @@ async def list_flowfiles(
                     try:
                         nifi_req_del = {"operation": "delete_flowfile_listing_request", "connection_id": target_id, "request_id": request_id}
                         local_logger.bind(interface="nifi", direction="request", data=nifi_req_del).debug("Calling NiFi API")
-                        await nifi_client.delete_flowfile_listing_request(target_id, request_id)
+                        await nifi_client.shield_cleanup(nifi_client.delete_flowfile_listing_request(target_id, request_id))
                         local_logger.bind(interface="nifi", direction="response", data={"deleted": True}).debug("Received from NiFi API")
                     except Exception as del_e:
                         local_logger.warning(f"Failed to delete queue listing request {request_id}: {del_e}")
@@ -1369,6 +1390,7 @@ async def list_flowfiles(
                     query_status = await nifi_client.get_provenance_query(query_id)
                     nifi_resp_get = {"finished": query_status.get("query", {}).get("finished"), "percentCompleted": query_status.get("query", {}).get("percentCompleted")}
                     local_logger.bind(interface="nifi", direction="response", data=nifi_resp_get).debug("Received from NiFi API (polling)")
+                    await emit_progress("progress", {"stage": "provenance_query", "finished": query_status.get("finished"), "percentCompleted": query_status.get("percentCompleted")})
 
                     # --- Corrected Finished Check ---
                     # if query_status.get("query", {}).get("finished"): # Old incorrect check
@@ -1435,7 +1457,7 @@ async def list_flowfiles(
                     try:
                         nifi_req_del = {"operation": "delete_provenance_query", "query_id": query_id}
                         local_logger.bind(interface="nifi", direction="request", data=nifi_req_del).debug("Calling NiFi API")
-                        await nifi_client.delete_provenance_query(query_id)
+                        await nifi_client.shield_cleanup(nifi_client.delete_provenance_query(query_id))
                         local_logger.bind(interface="nifi", direction="response", data={"deleted": True}).debug("Received from NiFi API")
                     except Exception as del_e:
                         local_logger.warning(f"Failed to delete provenance query {query_id}: {del_e}")
@@ -1457,6 +1479,170 @@ async def list_flowfiles(
         # Return partial results with error message
         return results
 
+async def _collect_queue_listing(
+    nifi_client: NiFiClient,
+    connection_id: str,
+    local_logger,
+    polling_interval: float,
+    polling_timeout: float
+) -> Dict[str, Any]:
+    """Runs one queue listing request to completion and always deletes it afterwards."""
+    request_id = None
+    try:
+        nifi_req_create = {"operation": "create_flowfile_listing_request", "connection_id": connection_id}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_req_create).debug("Calling NiFi API")
+        listing_request = await nifi_client.create_flowfile_listing_request(connection_id)
+        request_id = listing_request.get("id")
+        local_logger.bind(interface="nifi", direction="response", data={"request_id": request_id}).debug("Received from NiFi API")
+        if not request_id:
+            raise ToolError(f"Failed to get request ID from NiFi for queue listing of connection {connection_id}.")
+
+        start_time = asyncio.get_event_loop().time()
+        while True:
+            if (asyncio.get_event_loop().time() - start_time) > polling_timeout:
+                raise TimeoutError(f"Timed out waiting for queue listing request {request_id} to complete.")
+            request_status = await nifi_client.get_flowfile_listing_request(connection_id, request_id)
+            if request_status.get("finished"):
+                return request_status
+            await asyncio.sleep(polling_interval)
+    finally:
+        if request_id:
+            # Shield the delete so a cancelled or failed sibling listing cannot leave the request behind
+            try:
+                nifi_req_del = {"operation": "delete_flowfile_listing_request", "connection_id": connection_id, "request_id": request_id}
+                local_logger.bind(interface="nifi", direction="request", data=nifi_req_del).debug("Calling NiFi API")
+                await nifi_client.shield_cleanup(nifi_client.delete_flowfile_listing_request(connection_id, request_id))
+                local_logger.bind(interface="nifi", direction="response", data={"deleted": True}).debug("Received from NiFi API")
+            except Exception as del_e:
+                local_logger.warning(f"Failed to delete queue listing request {request_id}: {del_e}")
+
+
+def _summarize_queue_listing(
+    listing: Dict[str, Any],
+    attribute_names: List[str],
+    top_n: int
+) -> Dict[str, Any]:
+    """Reduces a finished listing request to counts, sizes, ages and top attribute values."""
+    summaries = listing.get("flowFileSummaries", []) or []
+    queue_size = listing.get("queueSize", {}) or {}
+    durations = [ff.get("queuedDuration") for ff in summaries if ff.get("queuedDuration") is not None]
+
+    top_values: Dict[str, List[Dict[str, Any]]] = {}
+    for attr in attribute_names:
+        counter = Counter()
+        for ff in summaries:
+            # Listing summaries carry only their own fields (no attribute map), e.g. filename, size, penalized
+            value = ff.get(attr)
+            if value is not None:
+                counter[str(value)] += 1
+        top_values[attr] = [{"value": v, "count": c} for v, c in counter.most_common(top_n)]
+
+    return {
+        "queued_count": queue_size.get("objectCount", len(summaries)),
+        "queued_bytes": queue_size.get("byteCount", sum(ff.get("size") or 0 for ff in summaries)),
+        "listed_count": len(summaries),
+        "listed_bytes": sum(ff.get("size") or 0 for ff in summaries),
+        "oldest_queued_ms": max(durations) if durations else None,
+        "youngest_queued_ms": min(durations) if durations else None,
+        "penalized_count": sum(1 for ff in summaries if ff.get("penalized")),
+        "top_attribute_values": top_values,
+    }
+
+
+@mcp.tool()
+@tool_phases(["Review", "Operate"])
+async def inspect_connection_queues(
+    connection_ids: Optional[List[str]] = None,
+    process_group_id: Optional[str] = None,
+    attribute_names: Optional[List[str]] = None,
+    top_n: int = 5,
+    include_empty: bool = False,
+    max_concurrency: int = 4,
+    polling_interval: float = 0.5,
+    polling_timeout: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Inspects the queues of several connections at once and returns one summary per connection.
+
+    Provide either a list of connection IDs or a process group ID (all connections directly inside
+    that group are inspected). Queue listings run concurrently, bounded by `max_concurrency`, and every
+    NiFi listing request is deleted afterwards even if other listings fail.
+
+    Args:
+        connection_ids: IDs of the connections to inspect.
+        process_group_id: ID of a process group whose connections should be inspected. Used when `connection_ids` is not given.
+        attribute_names: FlowFile summary fields to tally top values for. Defaults to ["filename"]. Queue listings only
+            carry summary fields (filename, size, penalized, clusterNodeId, ...), not the FlowFile attribute map, so other
+            attributes such as mime.type cannot be tallied (get_flowfile_event_details returns them per provenance event).
+        top_n: Number of most common values to report per attribute.
+        include_empty: When inspecting a process group, also list connections whose queue is empty.
+        max_concurrency: Maximum number of listing requests in flight at once.
+        polling_interval: Seconds between polling for listing request completion.
+        polling_timeout: Maximum seconds to wait for each listing request.
+
+    Returns:
+        A dictionary with a `connections` list (in request order) holding, per connection: `connection_id`, `name`,
+        `queued_count`, `queued_bytes`, `listed_count`, `oldest_queued_ms`, `youngest_queued_ms`,
+        `top_attribute_values` and an `error` field (None on success).
+    """
+    nifi_client: Optional[NiFiClient] = current_nifi_client.get()
+    local_logger = current_request_logger.get() or logger
+    if not nifi_client:
+        raise ToolError("NiFi client context is not set. This tool requires the X-Nifi-Server-Id header.")
+    if not connection_ids and not process_group_id:
+        raise ToolError("Either 'connection_ids' or 'process_group_id' must be provided.")
+
+    attribute_names = attribute_names or ["filename"]
+    max_concurrency = max(1, max_concurrency)
+    session_pg_id = current_process_group.get() or None
+    local_logger = local_logger.bind(process_group_id=process_group_id, max_concurrency=max_concurrency)
+
+    # --- Resolve the connections to inspect --- #
+    targets: List[Dict[str, Any]] = []
+    if connection_ids:
+        targets = [{"connection_id": cid, "name": None} for cid in connection_ids]
+    else:
+        if session_pg_id and not await nifi_client.is_descendant(process_group_id, session_pg_id):
+            raise ToolError(f"Process group {process_group_id} is outside the session process group {session_pg_id}.")
+        nifi_req = {"operation": "list_connections", "process_group_id": process_group_id}
+        local_logger.bind(interface="nifi", direction="request", data=nifi_req).debug("Calling NiFi API")
+        connections = await nifi_client.list_connections(process_group_id)
+        local_logger.bind(interface="nifi", direction="response", data={"connection_count": len(connections)}).debug("Received from NiFi API")
+        for conn in connections:
+            queued = conn.get("status", {}).get("aggregateSnapshot", {}).get("flowFilesQueued", 0)
+            if not include_empty and not queued:
+                continue
+            targets.append({"connection_id": conn.get("id"), "name": conn.get("component", {}).get("name")})
+
+    local_logger.info(f"Inspecting {len(targets)} connection queues with concurrency {max_concurrency}")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _inspect(target: Dict[str, Any]) -> Dict[str, Any]:
+        result = {**target, "error": None}
+        async with semaphore:
+            try:
+                listing = await _collect_queue_listing(
+                    nifi_client, target["connection_id"], local_logger, polling_interval, polling_timeout
+                )
+                result.update(_summarize_queue_listing(listing, attribute_names, top_n))
+            except (NiFiAuthenticationError, ConnectionError, ToolError, ValueError, TimeoutError) as e:
+                local_logger.warning(f"Queue inspection failed for connection {target['connection_id']}: {e}")
+                result["error"] = str(e)
+            except Exception as e:
+                local_logger.error(f"Unexpected error inspecting connection {target['connection_id']}: {e}", exc_info=True)
+                result["error"] = f"An unexpected error occurred: {e}"
+        return result
+
+    inspected = await asyncio.gather(*(_inspect(t) for t in targets))
+    failed = sum(1 for r in inspected if r["error"])
+    local_logger.info(f"Inspected {len(inspected)} connection queues ({failed} failed).")
+    return {
+        "process_group_id": process_group_id,
+        "inspected_count": len(inspected),
+        "failed_count": failed,
+        "connections": list(inspected),
+    }
+
 @mcp.tool()
 @tool_phases(["Review", "Operate"])
 async def get_flowfile_event_details( # Renamed function
@@ -4,6 +4,7 @@ from loguru import logger as _logger # Use _logger to avoid potential conflict
 
 # Import mcp from the new core module
 from ..core import mcp # Removed nifi_api_client
+from ..request_context import current_progress_emitter
 # REMOVED from ..server import mcp, nifi_api_client
 
 # Removed imports for NiFi types/exceptions previously needed by ensure_authenticated
@@ -26,6 +27,26 @@ def tool_phases(phases: List[str]):
     return decorator
 # -----------------------------
 
+# --- Progress Events --- #
+def is_streaming() -> bool:
+    """Whether the current execution streams its events. Tools that stream 'partial' results should then
+    leave them out of their final result, which becomes a summary."""
+    return current_progress_emitter.get() is not None
+
+async def emit_progress(event: str, data: Any = None) -> None:
+    """Emits a progress or partial-result event to a streaming caller; a no-op for regular executions.
+
+    'partial' events wait while the caller's stream buffer is full; 'progress' events are dropped instead.
+
+    Args:
+        event: Event name, e.g. 'progress' for status updates or 'partial' for a piece of the result.
+        data: JSON-serializable payload of the event.
+    """
+    emitter = current_progress_emitter.get()
+    if emitter is not None:
+        await emitter(event, data)
+# -----------------------------
+
 # Removed ensure_authenticated function
 # --- Helper Function for Authentication --- 
 # 
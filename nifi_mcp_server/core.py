@@ -1,3 +1,4 @@
+from typing import Optional
 from loguru import logger
 # from dotenv import load_dotenv # Removed
 
@@ -5,7 +6,8 @@ from mcp.server import FastMCP
 from nifi_mcp_server.nifi_client import NiFiClient, NiFiAuthenticationError
 
 # --- Import Config Settings --- #
-from config.settings import get_nifi_server_config, get_nifi_servers # Added
+from config.settings import get_nifi_server_config, get_nifi_servers, get_shared_cache_settings # Added
+from nifi_mcp_server.shared_cache import SharedCache
 
 # Load .env file - REMOVED (Handled by config.settings)
 # load_dotenv()
@@ -27,6 +29,17 @@ logger.info("MCP instance initialized in core.")
 # Simple cache for authenticated clients within a request scope? (Could use contextvars or pass around)
 # For now, create per request/call.
 
+_shared_cache: Optional[SharedCache] = None
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Returns this worker's handle on the shared cache (memory-only when just warm-up is enabled), or None."""
+    global _shared_cache
+    if _shared_cache is None:
+        cache_settings = get_shared_cache_settings()
+        if cache_settings:
+            _shared_cache = SharedCache(cache_settings['path'], local_max_entries=cache_settings['local_max_entries'])
+    return _shared_cache
+
 async def get_nifi_client(server_id: str, bound_logger = logger) -> NiFiClient:
     """Gets or creates an authenticated NiFi client for the specified server ID."""
     bound_logger.info(f"Requesting NiFi client for server ID: {server_id}")
@@ -39,12 +52,15 @@ async def get_nifi_client(server_id: str, bound_logger = logger) -> NiFiClient:
         base_url=server_conf.get('url'),
         username=server_conf.get('username'),
         password=server_conf.get('password'),
-        tls_verify=server_conf.get('tls_verify', True)
+        tls_verify=server_conf.get('tls_verify', True),
+        shared_cache=get_shared_cache()
     )
     bound_logger.debug(f"Instantiated NiFiClient for {server_conf.get('url')}")
 
     try:
         # Ensure client is authenticated
+        if not client.is_authenticated and await client.restore_cached_token():
+            bound_logger.debug(f"Reusing cached NiFi token for {server_conf.get('url')}")
         if not client.is_authenticated:
             bound_logger.info(f"Authenticating NiFi client for {server_conf.get('url')}")
             await client.authenticate()
@@ -63,11 +79,5 @@ async def get_nifi_client(server_id: str, bound_logger = logger) -> NiFiClient:
         raise # Re-raise other exceptions
 
 
-# Ensure at least one NiFi server is configured on startup (Optional check)
-try:
-    if not get_nifi_servers():
-        logger.warning("No NiFi servers defined in config.yaml. NiFi tools will likely fail.")
-    else:
-        logger.info(f"Found {len(get_nifi_servers())} NiFi server configurations.")
-except Exception as e:
-    logger.error(f"Failed to read NiFi server configurations on startup: {e}") 
\ No newline at end of file
+# The configured-servers check runs in the REST bridge's lifespan startup (and in native_server.main),
+# not at import time, so importing core does not load config.yaml.
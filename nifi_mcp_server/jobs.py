@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+# --- Tool Jobs --- #
+# Long tool executions run as background tasks that outlive the HTTP request that submitted them.
+# Finished jobs keep their result for a limited time in a bounded store, so a client that timed out
+# or retried can still collect it instead of starting the work again.
+#
+# A job runs in the worker that accepted it. With several uvicorn workers, the store mirrors job
+# status, idempotency keys and cancel requests into the shared SQLite cache (nifi.shared_cache), so
+# any worker can answer GET/DELETE /jobs/{job_id}; the owning worker polls for remote cancel requests.
+# Without an on-disk shared cache, jobs are only visible to the worker that runs them.
+
+JOB_ACTIVE_STATES = ("running",)
+JOB_NAMESPACE = "jobs"
+RUNNING_JOB_TTL_SECONDS = 86400.0
+REMOTE_POLL_SECONDS = 0.5
+CANCEL_POLL_SECONDS = 1.0
+
+
+class ToolJob:
+    """A single background tool execution and its outcome."""
+
+    def __init__(self, tool_name: str, arguments: Dict[str, Any], job_key: Optional[str] = None):
+        self.job_id = str(uuid.uuid4())
+        self.tool_name = tool_name
+        self.arguments = arguments
+        self.job_key = job_key
+        self.status = "running"
+        self.result: Any = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the job's public status, including its result or error once finished."""
+        data = {
+            "job_id": self.job_id,
+            "tool_name": self.tool_name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "duration_ms": round(((self.finished_at or time.time()) - self.created_at) * 1000, 1),
+        }
+        if self.status == "succeeded":
+            data["result"] = self.result
+        elif self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class ToolJobStore:
+    """Bounded in-memory store of tool jobs; finished jobs expire after a TTL."""
+
+    def __init__(self, max_jobs: int = 200, result_ttl_seconds: float = 900.0, shared_cache: Optional[Any] = None):
+        self.max_jobs = max_jobs
+        self.result_ttl_seconds = result_ttl_seconds
+        self.shared_cache = shared_cache
+        self._jobs: "OrderedDict[str, ToolJob]" = OrderedDict()
+        self._keys: Dict[str, str] = {}
+
+    def attach_shared_cache(self, shared_cache: Optional[Any]) -> None:
+        """Mirrors jobs into a SharedCache backed by a file, making them visible to every worker."""
+        self.shared_cache = shared_cache if shared_cache is not None and shared_cache.path is not None else None
+
+    def _purge(self) -> None:
+        """Drops expired finished jobs, then the oldest finished ones while over capacity."""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl_seconds:
+                self._remove(job_id)
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if job.finished_at is not None:
+                self._remove(job_id)
+
+    def _remove(self, job_id: str) -> None:
+        job = self._jobs.pop(job_id, None)
+        if job and job.job_key and self._keys.get(job.job_key) == job_id:
+            del self._keys[job.job_key]
+
+    def get(self, job_id: str) -> Optional[ToolJob]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def find_by_key(self, job_key: str) -> Optional[ToolJob]:
+        """Returns the stored job submitted with the same idempotency key, if it has not expired."""
+        self._purge()
+        job_id = self._keys.get(job_key)
+        return self._jobs.get(job_id) if job_id else None
+
+    async def find_by_key_anywhere(self, job_key: str) -> Optional[Dict[str, Any]]:
+        """Returns the status of the job submitted with this key in this or (via the shared cache) another worker."""
+        job = self.find_by_key(job_key)
+        if job is not None:
+            return job.to_dict()
+        if self.shared_cache is None:
+            return None
+        job_id = await self.shared_cache.get(JOB_NAMESPACE, f"key|{job_key}", use_local=False)
+        return await self.get_remote(job_id) if job_id else None
+
+    async def get_remote(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Returns the published status of a job run by another worker, long-polling up to `wait` seconds."""
+        if self.shared_cache is None:
+            return None
+        deadline = time.monotonic() + wait
+        while True:
+            job_data = await self.shared_cache.get(JOB_NAMESPACE, job_id, use_local=False)
+            if job_data is None or job_data.get("status") not in JOB_ACTIVE_STATES or time.monotonic() >= deadline:
+                return job_data
+            await asyncio.sleep(min(REMOTE_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+
+    async def request_remote_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Asks the worker running a job to cancel it; returns the job's current status, or None if unknown."""
+        job_data = await self.get_remote(job_id)
+        if job_data is not None and job_data.get("status") in JOB_ACTIVE_STATES:
+            await self.shared_cache.set(JOB_NAMESPACE, f"cancel|{job_id}", True, RUNNING_JOB_TTL_SECONDS)
+        return job_data
+
+    async def publish(self, job: ToolJob) -> None:
+        """Writes a job's status (with its result once finished) and idempotency key to the shared cache."""
+        if self.shared_cache is None:
+            return
+        ttl = self.result_ttl_seconds if job.finished_at is not None else RUNNING_JOB_TTL_SECONDS
+        job_data = job.to_dict()
+        try:
+            json.dumps(job_data)
+        except (TypeError, ValueError):
+            job_data.pop("result", None)
+            job_data["error"] = {"status_code": 500, "detail": "Job result is not JSON serializable."}
+        await self.shared_cache.set(JOB_NAMESPACE, job.job_id, job_data, ttl)
+        if job.job_key:
+            await self.shared_cache.set(JOB_NAMESPACE, f"key|{job.job_key}", job.job_id, ttl)
+
+    async def _watch_remote_cancel(self, job: ToolJob) -> None:
+        """Cancels a job here once another worker has recorded a cancel request for it."""
+        while job.task and not job.task.done():
+            await asyncio.sleep(CANCEL_POLL_SECONDS)
+            if await self.shared_cache.get(JOB_NAMESPACE, f"cancel|{job.job_id}", use_local=False):
+                logger.info(f"Cancelling job {job.job_id} as requested through another worker.")
+                job.task.cancel()
+                return
+
+    async def submit(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        runner: Callable[[ToolJob], Awaitable[None]],
+        job_key: Optional[str] = None
+    ) -> ToolJob:
+        """Starts a job running `runner(job)` in the background, after publishing it to the shared cache.
+
+        Raises:
+            OverflowError: If the store is full of jobs that are still running.
+        """
+        self._purge()
+        if len(self._jobs) >= self.max_jobs:
+            raise OverflowError(f"Too many running jobs ({len(self._jobs)}); try again later.")
+        job = ToolJob(tool_name, arguments, job_key)
+        self._jobs[job.job_id] = job
+        if job_key:
+            self._keys[job_key] = job.job_id
+        await self.publish(job)
+        job.task = asyncio.create_task(self._run(job, runner))
+        return job
+
+    async def _run(self, job: ToolJob, runner: Callable[[ToolJob], Awaitable[None]]) -> None:
+        watcher = asyncio.create_task(self._watch_remote_cancel(job)) if self.shared_cache is not None else None
+        try:
+            await runner(job)
+            if job.error is None:
+                job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            job.error = {"status_code": 499, "detail": "Job was cancelled."}
+        except Exception as e:
+            logger.error(f"Unhandled error in job {job.job_id} ({job.tool_name}): {e}", exc_info=True)
+            job.status = "failed"
+            job.error = {"status_code": 500, "detail": f"Internal server error during tool execution: {e}"}
+        finally:
+            job.finished_at = time.time()
+            job.done.set()
+            if watcher is not None:
+                watcher.cancel()
+            await self.publish(job)
+
+    async def wait(self, job: ToolJob, timeout: float) -> None:
+        """Waits up to `timeout` seconds for a job to finish."""
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def cancel(self, job: ToolJob) -> None:
+        """Cancels a running job and waits briefly for its cleanup to finish."""
+        if job.task and not job.task.done():
+            job.task.cancel()
+            await asyncio.wait({job.task}, timeout=10)
+
+    async def shutdown(self) -> None:
+        """Cancels every running job (used on server shutdown)."""
+        running = [job for job in self._jobs.values() if job.status in JOB_ACTIVE_STATES]
+        await asyncio.gather(*(self.cancel(job) for job in running))
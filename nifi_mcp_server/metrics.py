@@ -0,0 +1,219 @@
+import bisect
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# --- Metrics --- #
+# A minimal in-process metrics registry rendered in the Prometheus text exposition format.
+# Updates are plain dict operations on the event loop thread, cheap enough for every NiFi call.
+# Each uvicorn worker keeps its own values; scrape workers individually or run a single worker.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) - amount
+
+    def render(self) -> List[str]:
+        values = self._collect() if self._collect else self._values
+        lines = self._header()
+        for labelvalues, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        entry = self._values.get(labelvalues)
+        if entry is None:
+            entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labelvalues, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics in registration order and renders them for a scrape."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Tool execution --- #
+TOOL_CALLS = REGISTRY.register(Counter(
+    "nifi_mcp_tool_calls_total", "Tool executions by tool and outcome.", ("tool", "outcome")))
+TOOL_DURATION = REGISTRY.register(Histogram(
+    "nifi_mcp_tool_duration_seconds", "Tool execution latency.", ("tool",)))
+TOOLS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "nifi_mcp_tools_in_flight", "Tool executions currently running.", ("tool",)))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "nifi_mcp_http_requests_in_flight", "HTTP requests currently being handled by the bridge."))
+
+# --- NiFi API --- #
+NIFI_REQUESTS = REGISTRY.register(Counter(
+    "nifi_mcp_nifi_requests_total", "NiFi API calls by server, method, endpoint template and status code.",
+    ("server", "method", "endpoint", "status")))
+NIFI_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "nifi_mcp_nifi_request_duration_seconds", "NiFi API call latency by server, method and endpoint template.",
+    ("server", "method", "endpoint")))
+NIFI_LOGINS = REGISTRY.register(Counter(
+    "nifi_mcp_nifi_logins_total", "NiFi token requests by server and outcome.", ("server", "outcome")))
+
+# --- Scheduler --- #
+SCHEDULER_WAIT = REGISTRY.register(Histogram(
+    "nifi_mcp_scheduler_wait_seconds", "Time tool executions spent queued for a slot, per NiFi server.", ("server",)))
+SCHEDULER_REJECTED = REGISTRY.register(Counter(
+    "nifi_mcp_scheduler_rejected_total", "Tool executions rejected with 429 by the scheduler.", ("server", "reason")))
+
+# --- Caches --- #
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "nifi_mcp_cache_lookups_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")))
+
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    caches = {labels[0] for labels in CACHE_LOOKUPS._values}
+    ratios = {}
+    for cache in caches:
+        hits = CACHE_LOOKUPS.value(cache, "hit")
+        total = hits + CACHE_LOOKUPS.value(cache, "miss")
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "nifi_mcp_cache_hit_ratio", "Hit ratio per cache since start.", ("cache",), collect=_cache_hit_ratios))
+
+# --- Event loop --- #
+EVENT_LOOP_LAG = REGISTRY.register(Gauge(
+    "nifi_mcp_event_loop_lag_seconds", "Most recent event loop scheduling delay."))
+EVENT_LOOP_LAG_HISTOGRAM = REGISTRY.register(Histogram(
+    "nifi_mcp_event_loop_lag_seconds_distribution", "Event loop scheduling delay samples.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)))
+
+
+# --- Endpoint templates --- #
+_ID_SEGMENT = re.compile(r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|root|\d+)$")
+_endpoint_templates: Dict[str, str] = {}
+ENDPOINT_TEMPLATE_CACHE_MAX = 5000
+
+
+def endpoint_template(path: str) -> str:
+    """Collapses ids in a NiFi API path so metrics group by endpoint: /processors/<uuid> -> /processors/{id}."""
+    template = _endpoint_templates.get(path)
+    if template is None:
+        template = "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+        if len(_endpoint_templates) < ENDPOINT_TEMPLATE_CACHE_MAX:
+            _endpoint_templates[path] = template
+    return template
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Samples how late the event loop wakes up from a sleep; runs until cancelled."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        EVENT_LOOP_LAG.set(lag)
+        EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
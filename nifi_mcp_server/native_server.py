@@ -0,0 +1,78 @@
+"""Serves the shared FastMCP instance over the native MCP transports.
+
+The REST bridge in server.py re-parses every TextContent and re-encodes the result before FastAPI
+serializes it again. MCP-capable clients can instead talk to the same tools directly over stdio,
+SSE or (with mcp>=1.8) streamable HTTP. One NiFi server, and optionally one process group, is bound
+per serving process; a fresh authenticated NiFi client is created for every tool call, exactly as
+the REST bridge does.
+
+Usage:
+    python -m nifi_mcp_server.native_server --transport stdio --nifi-server-id nifi-local-example
+    python -m nifi_mcp_server.native_server --transport sse --port 8001
+"""
+import argparse
+import contextlib
+import sys
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+TRANSPORTS = ["stdio", "sse", "streamable-http"]
+
+
+def _install_context_handler(mcp, get_nifi_client, server_id: str, process_group_id: Optional[str], transport: str):
+    """Replaces the MCP call_tool handler with one that sets the request context the tools expect."""
+    from .request_context import current_nifi_client, current_request_logger, current_process_group
+
+    async def call_tool_with_context(name: str, arguments: Dict[str, Any]):
+        bound_logger = logger.bind(tool_name=name, nifi_server_id=server_id, transport=transport)
+        bound_logger.info(f"Executing tool '{name}' via native MCP transport")
+        nifi_client = await get_nifi_client(server_id, bound_logger=bound_logger)
+        client_token = current_nifi_client.set(nifi_client)
+        logger_token = current_request_logger.set(bound_logger)
+        pg_token = current_process_group.set(process_group_id)
+        try:
+            return await mcp.call_tool(name, arguments)
+        finally:
+            current_nifi_client.reset(client_token)
+            current_request_logger.reset(logger_token)
+            current_process_group.reset(pg_token)
+            await nifi_client.close()
+
+    # FastMCP registers its own call_tool handler on the low-level server; registering again replaces it
+    mcp._mcp_server.call_tool()(call_tool_with_context)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Serve the NiFi MCP tools over a native MCP transport.")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="stdio")
+    parser.add_argument("--nifi-server-id", help="ID of the NiFi server from config.yaml (defaults to the first one).")
+    parser.add_argument("--process-group-id", help="Restrict tools to this process group and its descendants.")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address for the sse/streamable-http transports.")
+    parser.add_argument("--port", type=int, default=8001, help="Port for the sse/streamable-http transports.")
+    args = parser.parse_args(argv)
+
+    # With stdio, stdout carries the protocol; config loading prints to stdout, so divert it while importing
+    with contextlib.redirect_stdout(sys.stderr):
+        from config.logging_setup import setup_logging
+        setup_logging(context='server')
+        from config.settings import get_nifi_servers
+        from .core import mcp, get_nifi_client
+        from .api_tools import review, creation, modification, operation, lookup  # noqa: F401 - registers tools
+
+    servers = get_nifi_servers()
+    server_id = args.nifi_server_id or (servers[0].get("id") if servers else None)
+    if not server_id:
+        parser.error("No NiFi servers configured in config.yaml; cannot serve tools.")
+    if args.transport == "streamable-http" and not hasattr(mcp, "streamable_http_app"):
+        parser.error("The installed mcp package does not support streamable-http (requires mcp>=1.8). Use --transport sse.")
+
+    _install_context_handler(mcp, get_nifi_client, server_id, args.process_group_id, args.transport)
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    logger.info(f"Serving NiFi MCP tools over {args.transport} for NiFi server '{server_id}'")
+    mcp.run(transport=args.transport)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,18 @@ import os
 # import logging # Remove standard logging
 from loguru import logger # Import Loguru logger
 import httpx
+import asyncio
+import json
+import time
+import base64
 # from dotenv import load_dotenv # Removed dotenv
 import uuid # Import uuid for client ID generation
-from typing import Optional, Dict, Any, Union, List, Literal # Add Union and List
+from typing import Optional, Dict, Any, Union, List, Literal, Callable, Awaitable, Tuple # Add Union and List
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp.exceptions import ToolError # Import ToolError
-from functools import lru_cache
+from . import metrics
+from .tracing import current_trace
 # Load environment variables from .env file - REMOVED
 # load_dotenv()
 
@@ -18,10 +25,153 @@ class NiFiAuthenticationError(Exception):
     """Raised when there is an error authenticating with NiFi."""
     pass
 
+# --- Revision Cache --- #
+# Last revision seen per component id, shared by every NiFiClient talking to the same base URL so a
+# revision observed in one request can seed an optimistic write in the next. A stale entry only
+# costs one 409 followed by a refreshing GET.
+REVISION_CACHE_MAX_ENTRIES = 10000
+_revision_caches: Dict[str, "OrderedDict[str, dict]"] = {}
+# The response hook only decodes bodies of single-entity endpoints; listing methods feed the cache
+# from the entities they already parsed, so large listing and flow bodies are decoded once.
+_REVISIONED_KINDS = ("processors", "connections", "input-ports", "output-ports", "funnels", "process-groups", "controller-services", "labels")
+_SINGLE_ENTITY_TEMPLATES = frozenset(
+    [f"/{kind}/{{id}}" for kind in _REVISIONED_KINDS] + [f"/{kind}/{{id}}/run-status" for kind in _REVISIONED_KINDS]
+)
+# POSTs to these create one entity (a GET to the same path lists them)
+_CREATE_ENTITY_TEMPLATES = frozenset(
+    [f"/process-groups/{{id}}/{kind}" for kind in _REVISIONED_KINDS] + ["/process-groups/{id}/process-groups/upload"]
+)
+
+def _extract_revisions(data: Any, found: Dict[str, dict], depth: int = 0) -> None:
+    """Collects {component_id: revision} pairs from any NiFi entity or entity list in a response body."""
+    if depth > 8:
+        return
+    if isinstance(data, dict):
+        revision = data.get("revision")
+        component_id = data.get("id")
+        if isinstance(revision, dict) and "version" in revision and isinstance(component_id, str):
+            found[component_id] = revision
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                _extract_revisions(value, found, depth + 1)
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, (dict, list)):
+                _extract_revisions(item, found, depth + 1)
+
+# --- Component Write Locks --- #
+# Writes to the same component are serialized per NiFi server so concurrent requests queue up behind
+# each other instead of racing on the same revision. Writes to other components and all reads are
+# not affected. Locks are dropped as soon as nobody holds or waits for them.
+
+class ComponentLockManager:
+    """Per-component async write locks for one NiFi server, with queue-wait statistics."""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+        self.acquisitions = 0
+        self.contended = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def hold(self, component_id: str):
+        """Holds the write lock of a component, yielding the seconds spent waiting for it."""
+        lock = self._locks.setdefault(component_id, asyncio.Lock())
+        self._users[component_id] = self._users.get(component_id, 0) + 1
+        start = time.perf_counter()
+        try:
+            if lock.locked():
+                self.contended += 1
+                self.waiting += 1
+                try:
+                    await lock.acquire()
+                finally:
+                    self.waiting -= 1
+            else:
+                await lock.acquire()
+            waited = time.perf_counter() - start
+            self.acquisitions += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            if waited > 0.5:
+                logger.debug(f"Waited {waited:.2f}s for the write lock of component {component_id}")
+            try:
+                yield waited
+            finally:
+                lock.release()
+        finally:
+            self._users[component_id] -= 1
+            if not self._users[component_id]:
+                del self._users[component_id]
+                self._locks.pop(component_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue-wait statistics for this server's component locks."""
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "waiting": self.waiting,
+            "locked_components": len(self._locks),
+            "total_wait_seconds": round(self.total_wait_seconds, 6),
+            "avg_wait_seconds": round(self.total_wait_seconds / self.acquisitions, 6) if self.acquisitions else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 6),
+        }
+
+_component_locks: Dict[str, ComponentLockManager] = {}
+# Duplicate-check locks for source→target connection pairs; kept apart so they do not count as component write contention
+_connection_pair_locks: Dict[str, ComponentLockManager] = {}
+
+def get_component_lock_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns component lock statistics keyed by NiFi base URL."""
+    return {base_url: manager.stats() for base_url, manager in _component_locks.items()}
+
+# --- Shared Cache Entries --- #
+# With a SharedCache (see shared_cache.py) passed in, tokens, the processor type catalog, root group
+# ids and process group parents are shared across requests and uvicorn workers. A 401 invalidates the
+# cached tokens (and the request is retried once after a fresh login); creating, uploading, moving or
+# deleting process groups invalidates the "flow" namespace.
+TOKEN_DEFAULT_TTL_SECONDS = 3600
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+PROCESSOR_TYPES_TTL_SECONDS = 3600
+ROOT_PG_TTL_SECONDS = 86400
+FLOW_TTL_SECONDS = 300
+# close() waits this long for shielded cleanup calls (listing/drop/provenance deletes) still in flight
+CLEANUP_WAIT_SECONDS = 10.0
+_FLOW_STRUCTURE_PREFIXES = ("/process-groups/{id}/process-groups", "/process-groups/{id}/template-instance", "/snippets")
+
+def _token_ttl(token: str) -> float:
+    """Seconds until a NiFi JWT expires (minus a margin), read from its `exp` claim when present."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) - time.time() - TOKEN_EXPIRY_MARGIN_SECONDS
+    except (IndexError, KeyError, TypeError, ValueError):
+        return TOKEN_DEFAULT_TTL_SECONDS
+
+class _BearerAuth(httpx.Auth):
+    """Sends the client's current token. A 401 for a token restored from the shared cache (revoked, or
+    issued by a restarted NiFi) triggers one fresh login and a retry of the request."""
+
+    def __init__(self, nifi_client: "NiFiClient"):
+        self._nifi_client = nifi_client
+
+    async def async_auth_flow(self, request: httpx.Request):
+        token = self._nifi_client._token
+        if token:
+            request.headers["Authorization"] = f"Bearer {token}"
+        response = yield request
+        if response.status_code == 401 and token and self._nifi_client._token_from_cache:
+            await self._nifi_client._refresh_token(token)
+            request.headers["Authorization"] = f"Bearer {self._nifi_client._token}"
+            yield request
+
 class NiFiClient:
     """A simple asynchronous client for the NiFi REST API."""
 
-    def __init__(self, base_url: str, username: Optional[str] = None, password: Optional[str] = None, tls_verify: bool = True):
+    def __init__(self, base_url: str, username: Optional[str] = None, password: Optional[str] = None, tls_verify: bool = True, shared_cache: Optional[Any] = None):
         """Initializes the NiFiClient.
 
         Args:
@@ -29,6 +179,7 @@ class NiFiClient:
             username: The username for NiFi authentication. Required if password is provided.
             password: The password for NiFi authentication. Required if username is provided.
             tls_verify: Whether to verify the server's TLS certificate. Defaults to True.
+            shared_cache: Optional SharedCache for tokens, catalogs and flow structure shared across workers.
         """
         if not base_url:
             raise ValueError("base_url is required for NiFiClient")
@@ -38,9 +189,22 @@ class NiFiClient:
         self.tls_verify = tls_verify
         self._client = None
         self._token = None
+        self._token_from_cache = False
+        self._auth_lock = asyncio.Lock()
         # Generate a unique client ID for this instance, used for revisions
         self._client_id = str(uuid.uuid4())
         self.pg_id= "root"
+        self._descendant_cache: Dict[tuple, bool] = {}
+        self._revisions = _revision_caches.setdefault(base_url, OrderedDict())
+        self._write_locks = _component_locks.setdefault(base_url, ComponentLockManager())
+        self._pair_locks = _connection_pair_locks.setdefault(base_url, ComponentLockManager())
+        # Per-instance connection index: pg_id -> (source_id, destination_id) -> relationships tuple -> connection entity
+        self._connection_index: Dict[str, Dict[tuple, Dict[tuple, dict]]] = {}
+        self._connection_index_lock = asyncio.Lock()
+        # Path prefix of the base URL (e.g. /nifi-api), stripped from metric endpoint templates
+        self._base_path = httpx.URL(base_url).path.rstrip("/")
+        self._shared_cache = shared_cache
+        self._cleanup_tasks: set = set()
         logger.info(f"NiFiClient initialized for {self.base_url} with client ID: {self._client_id}")
 
     @property
@@ -50,31 +214,219 @@ class NiFiClient:
 
     async def _get_client(self):
         """Returns an httpx client instance, configuring auth if token exists."""
-        # Always create a new client instance to ensure headers are fresh,
-        # especially after authentication. If performance becomes an issue,
-        # we could optimize, but this ensures correctness.
-        if self._client:
-             await self._client.aclose() # Ensure old connection is closed if recreating
-             self._client = None
-
-        headers = {}
-        if self._token:
-            headers["Authorization"] = f"Bearer {self._token}"
-            # NiFi often requires client ID for state changes, let's check if we need it here
-            # Might need to parse initial response or call another endpoint if needed.
+        # Reuse the pooled client so concurrent calls on this instance share one
+        # connection pool. The bearer token is added per request by _BearerAuth.
+        if self._client is not None and not self._client.is_closed:
+            return self._client
 
         self._client = httpx.AsyncClient(
             base_url=self.base_url,
             verify=self.tls_verify,
-            headers=headers,
-            timeout=30.0 # Keep timeout
+            auth=_BearerAuth(self),
+            timeout=30.0, # Keep timeout
+            event_hooks={"request": [self._mark_request_start], "response": [self._record_request_metrics, self._record_revisions, self._invalidate_shared_cache]}
         )
         return self._client
 
+    # --- Metrics Hooks ---
+
+    async def _mark_request_start(self, request: httpx.Request):
+        """Request hook: stamps the send time so the response hook can observe the call latency."""
+        request.extensions["nifi_mcp_start"] = time.perf_counter()
+
+    async def _record_request_metrics(self, response: httpx.Response):
+        """Response hook: counts the call and observes its latency per endpoint template and server.
+
+        The body is read here (the client never streams), so the latency and the span recorded into
+        the request's trace include the download.
+        """
+        request = response.request
+        start = request.extensions.get("nifi_mcp_start")
+        trace = current_trace.get()
+        if trace is not None:
+            try:
+                await response.aread()
+            except httpx.HTTPError:
+                pass
+        endpoint = self._endpoint_of(request)
+        metrics.NIFI_REQUESTS.inc(self.base_url, request.method, endpoint, str(response.status_code))
+        if start is not None:
+            duration = time.perf_counter() - start
+            metrics.NIFI_REQUEST_DURATION.observe(duration, self.base_url, request.method, endpoint)
+            if trace is not None:
+                size = len(response.content) if response.is_stream_consumed else int(response.headers.get("content-length") or 0)
+                trace.record_call(request.method, endpoint, response.status_code, start, duration, size)
+
+    # --- Revision Cache Helpers ---
+
+    async def _record_revisions(self, response: httpx.Response):
+        """Response hook: feeds the revision cache from successful single-entity responses."""
+        if not response.is_success or "json" not in response.headers.get("content-type", ""):
+            return
+        method = response.request.method
+        endpoint = self._endpoint_of(response.request)
+        if endpoint not in _SINGLE_ENTITY_TEMPLATES and not (method == "POST" and endpoint in _CREATE_ENTITY_TEMPLATES):
+            return
+        try:
+            await response.aread()
+            found: Dict[str, dict] = {}
+            _extract_revisions(response.json(), found)
+        except Exception as e:
+            logger.debug(f"Could not extract revisions from response to {response.request.url}: {e}")
+            return
+        if method == "DELETE":
+            for component_id in found:
+                self._revisions.pop(component_id, None)
+            return
+        self._store_revisions(found)
+
+    def _remember_revisions(self, entities: Any) -> None:
+        """Feeds the revision cache from entities a client method has already parsed."""
+        found: Dict[str, dict] = {}
+        _extract_revisions(entities, found)
+        self._store_revisions(found)
+
+    def _store_revisions(self, found: Dict[str, dict]) -> None:
+        for component_id, revision in found.items():
+            self._revisions[component_id] = revision
+            self._revisions.move_to_end(component_id)
+        while len(self._revisions) > REVISION_CACHE_MAX_ENTRIES:
+            self._revisions.popitem(last=False)
+
+    # --- Shared Cache Helpers ---
+
+    def _endpoint_of(self, request: httpx.Request) -> str:
+        path = request.url.path
+        if self._base_path and path.startswith(self._base_path):
+            path = path[len(self._base_path):]
+        return metrics.endpoint_template(path)
+
+    async def _invalidate_shared_cache(self, response: httpx.Response):
+        """Response hook: drops shared entries a response proves stale (rejected token, changed group structure)."""
+        if self._shared_cache is None:
+            return
+        if response.status_code == 401:
+            logger.info("NiFi rejected the token; invalidating cached tokens.")
+            await self._shared_cache.invalidate("token")
+            return
+        method = response.request.method
+        if not response.is_success or method == "GET":
+            return
+        endpoint = self._endpoint_of(response.request)
+        if endpoint.startswith(_FLOW_STRUCTURE_PREFIXES) or (method == "DELETE" and endpoint == "/process-groups/{id}"):
+            await self._shared_cache.invalidate("flow")
+
+    async def restore_cached_token(self) -> bool:
+        """Adopts a still-valid token from the shared cache; returns False if authenticate() is needed.
+
+        If NiFi rejects the restored token, the first 401 triggers a fresh login (see _BearerAuth).
+        """
+        if self._shared_cache is None:
+            return False
+        token = await self._shared_cache.get("token", f"{self.base_url}|{self.username}")
+        if not token:
+            return False
+        self._token = token
+        self._token_from_cache = True
+        self._client = None
+        return True
+
+    async def _refresh_token(self, rejected_token: str) -> None:
+        """Logs in again after NiFi rejected `rejected_token`, unless a concurrent request already did."""
+        async with self._auth_lock:
+            if self._token == rejected_token:
+                logger.info("Cached NiFi token was rejected; logging in again.")
+                await self._request_token()
+
+    def get_cached_revision(self, component_id: str) -> Optional[dict]:
+        """Returns a copy of the last revision seen for a component, or None."""
+        revision = self._revisions.get(component_id)
+        return dict(revision) if revision is not None else None
+
+    async def _resolve_revision(self, component_id: str, fetch_entity: Callable[[str], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """Returns (revision, from_cache), fetching the entity only when no revision is cached."""
+        cached = self.get_cached_revision(component_id)
+        metrics.record_cache_lookup("revision", cached is not None)
+        if cached is not None:
+            return cached, True
+        logger.info(f"No cached revision for {component_id}; fetching current entity.")
+        entity = await fetch_entity(component_id)
+        return entity["revision"], False
+
+    async def _put_revisioned(
+        self,
+        endpoint: str,
+        component_id: str,
+        revision: dict,
+        from_cache: bool,
+        build_payload: Callable[[dict], dict],
+        fetch_entity: Callable[[str], Awaitable[dict]]
+    ) -> httpx.Response:
+        """PUTs a payload built around a revision; a 409 on a cached revision triggers one fresh GET and retry.
+
+        The write holds the component's lock. A writer that queued behind another picks up the revision
+        the previous write produced (recorded by the response hook) instead of its own, now stale, one.
+        """
+        client = await self._get_client()
+        async with self._write_locks.hold(component_id):
+            cached = self.get_cached_revision(component_id)
+            if cached is not None and cached.get("version", -1) > revision.get("version", -1):
+                revision, from_cache = cached, True
+            response = await client.put(endpoint, json=build_payload(revision))
+            if response.status_code == 409 and from_cache:
+                logger.warning(f"Cached revision {revision.get('version')} for {component_id} was rejected; retrying with a fresh revision.")
+                revision = (await fetch_entity(component_id))["revision"]
+                response = await client.put(endpoint, json=build_payload(revision))
+        response.raise_for_status()
+        return response
+
+    async def _delete_revisioned(
+        self,
+        path: str,
+        component_id: str,
+        version: Optional[int],
+        fetch_entity: Callable[[str], Awaitable[dict]]
+    ) -> httpx.Response:
+        """DELETEs a component at a revision version (cached if not given); a 409 triggers one fresh GET and retry if the version moved.
+
+        If fetching the revision finds the component gone (fetch_entity raises ValueError), the result
+        is a 404, so callers treat it like NiFi's own not-found answer.
+        """
+        client = await self._get_client()
+        async with self._write_locks.hold(component_id):
+            try:
+                cached = self.get_cached_revision(component_id)
+                if version is None or (cached is not None and cached.get("version", -1) > version):
+                    revision, _ = await self._resolve_revision(component_id, fetch_entity)
+                    version = revision.get("version")
+                response = await client.delete(f"{path}?version={version}&clientId={self._client_id}")
+                if response.status_code == 409:
+                    fresh_version = (await fetch_entity(component_id)).get("revision", {}).get("version")
+                    if fresh_version is not None and fresh_version != version:
+                        logger.warning(f"Revision {version} for {component_id} was stale (now {fresh_version}); retrying delete.")
+                        response = await client.delete(f"{path}?version={fresh_version}&clientId={self._client_id}")
+            except ValueError:
+                self._revisions.pop(component_id, None)
+                response = httpx.Response(404, request=client.build_request("DELETE", path))
+        response.raise_for_status()
+        return response
+
     async def authenticate(self):
         """Authenticates with NiFi and stores the token."""
+        await self._request_token()
+        # Force recreation of the main client on next call to _get_client
+        if self._client:
+            await self._client.aclose()
+        self._client = None
+
+    async def _request_token(self):
+        """Requests a new token from NiFi and stores it (and in the shared cache), keeping the pooled client."""
         # Use a temporary client for the auth request itself, as it doesn't need the token header
-        async with httpx.AsyncClient(base_url=self.base_url, verify=self.tls_verify) as auth_client:
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            verify=self.tls_verify,
+            event_hooks={"request": [self._mark_request_start], "response": [self._record_request_metrics]}
+        ) as auth_client:
             endpoint = "/access/token"
             try:
                 logger.info(f"Authenticating with NiFi at {self.base_url}{endpoint}")
@@ -85,25 +437,46 @@ class NiFiClient:
                 )
                 response.raise_for_status()
                 self._token = response.text # Store the token
+                self._token_from_cache = False
+                metrics.NIFI_LOGINS.inc(self.base_url, "success")
+                if self._shared_cache is not None:
+                    await self._shared_cache.set("token", f"{self.base_url}|{self.username}", self._token, _token_ttl(self._token))
                 logger.info("Authentication successful.")
 
-                # Force recreation of the main client with the token on next call to _get_client
-                if self._client:
-                    await self._client.aclose()
-                self._client = None
-
             except httpx.HTTPStatusError as e:
+                metrics.NIFI_LOGINS.inc(self.base_url, "rejected")
                 logger.error(f"Authentication failed: {e.response.status_code} - {e.response.text}")
                 raise NiFiAuthenticationError(f"Authentication failed: {e.response.status_code}") from e
             except httpx.RequestError as e:
+                metrics.NIFI_LOGINS.inc(self.base_url, "error")
                 logger.error(f"An error occurred during authentication: {e}")
                 raise NiFiAuthenticationError(f"An error occurred during authentication: {e}") from e
             except Exception as e:
                 logger.error(f"An unexpected error occurred during authentication: {e}", exc_info=True)
                 raise NiFiAuthenticationError(f"An unexpected error occurred during authentication: {e}")
 
+    def shield_cleanup(self, cleanup: Awaitable) -> Awaitable:
+        """Runs a cleanup call (e.g. deleting a listing request) so that cancelling the caller cannot abort it.
+
+        The caller awaits the returned shield as usual; if the caller is cancelled meanwhile, the call keeps
+        running and close() waits for it before closing the connection pool.
+        """
+        task = asyncio.ensure_future(cleanup)
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_finished)
+        return asyncio.shield(task)
+
+    def _cleanup_finished(self, task: asyncio.Task) -> None:
+        self._cleanup_tasks.discard(task)
+        # Nobody may be awaiting the result any more once the caller was cancelled
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cleanup call failed: {task.exception()}")
+
     async def close(self):
-        """Closes the underlying httpx client."""
+        """Closes the underlying httpx client, after waiting for shielded cleanup calls still in flight."""
+        if self._cleanup_tasks:
+            logger.info(f"Waiting for {len(self._cleanup_tasks)} cleanup call(s) before closing the NiFi client.")
+            await asyncio.wait(set(self._cleanup_tasks), timeout=CLEANUP_WAIT_SECONDS)
         if self._client:
             await self._client.aclose()
             self._client = None
@@ -171,6 +544,11 @@ class NiFiClient:
             local_logger.error("Authentication required before getting root process group ID.")
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
+        if self._shared_cache is not None:
+            cached_root_id = await self._shared_cache.get("root_pg", self.base_url)
+            if cached_root_id:
+                return cached_root_id
+
         client = await self._get_client()
         endpoint = "/flow/process-groups/root"
         try:
@@ -187,6 +565,8 @@ class NiFiClient:
                  local_logger.error(f"Root process group ID not found in response structure: {data}") # Log structure on error
                  raise ConnectionError("Could not extract root process group ID from response.")
             local_logger.info(f"Retrieved root process group ID: {root_id}")
+            if self._shared_cache is not None:
+                await self._shared_cache.set("root_pg", self.base_url, root_id, ROOT_PG_TTL_SECONDS)
             return root_id
         except httpx.HTTPStatusError as e:
             local_logger.error(f"Failed to get root process group ID: {e.response.status_code} - {e.response.text}")
@@ -215,6 +595,7 @@ class NiFiClient:
             data = response.json()
             # The response is typically a ProcessorsEntity which has a 'processors' key containing a list
             processors = data.get("processors", [])
+            self._remember_revisions(processors)
             local_logger.info(f"Found {len(processors)} processors in group {process_group_id}.")
             return processors
 
@@ -323,6 +704,7 @@ class NiFiClient:
             response.raise_for_status()
             created_connection_data = response.json()
             logger.info(f"Successfully created connection with ID: {created_connection_data.get('id')}")
+            self._index_connection(created_connection_data, process_group_id)
             return created_connection_data
 
         except httpx.HTTPStatusError as e:
@@ -365,18 +747,46 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred getting processor details for {processor_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred getting processor details: {e}") from e
 
-    async def delete_processor(self, processor_id: str, version: int) -> bool:
-        """Deletes a processor given its ID and current revision version."""
+    async def get_processor_status(self, processor_id: str) -> dict:
+        """Fetches the status snapshot of a processor (run status, active threads, task and I/O counters).
+
+        Returns:
+            The 'aggregateSnapshot' part of the processor status.
+        """
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
         client = await self._get_client()
-        # The version must be passed as a query parameter, along with the client ID
-        endpoint = f"/processors/{processor_id}?version={version}&clientId={self._client_id}"
+        endpoint = f"/flow/processors/{processor_id}/status"
+        try:
+            logger.debug(f"Fetching status for processor {processor_id} from {self.base_url}{endpoint}")
+            response = await client.get(endpoint)
+            response.raise_for_status()
+            status_data = response.json()
+            return status_data.get("processorStatus", {}).get("aggregateSnapshot", {})
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Processor with ID {processor_id} not found when fetching status.")
+                raise ValueError(f"Processor with ID {processor_id} not found.") from e
+            else:
+                logger.error(f"Failed to get status for processor {processor_id}: {e.response.status_code} - {e.response.text}")
+                raise ConnectionError(f"Failed to get processor status: {e.response.status_code}, {e.response.text}") from e
+        except (httpx.RequestError, ValueError) as e:
+            logger.error(f"Error getting status for processor {processor_id}: {e}")
+            raise ConnectionError(f"Error getting processor status: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred getting status for processor {processor_id}: {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred getting processor status: {e}") from e
+
+    async def delete_processor(self, processor_id: str, version: Optional[int] = None) -> bool:
+        """Deletes a processor given its ID and current revision version (cached revision if omitted)."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
         try:
-            logger.info(f"Attempting to delete processor {processor_id} (version {version}) using {self.base_url}{endpoint}")
-            response = await client.delete(endpoint)
+            logger.info(f"Attempting to delete processor {processor_id} (version {version})")
+            response = await self._delete_revisioned(f"/processors/{processor_id}", processor_id, version, self.get_processor_details)
             response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx
 
             # Check if deletion was successful (usually returns 200 OK with the entity deleted)
@@ -452,6 +862,7 @@ class NiFiClient:
             response.raise_for_status()
             data = response.json()
             connections = data.get("connections", [])
+            self._remember_revisions(connections)
             local_logger.info(f"Found {len(connections)} connections in group {process_group_id}.")
             return connections
 
@@ -465,22 +876,19 @@ class NiFiClient:
             local_logger.error(f"An unexpected error occurred listing connections: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred listing connections: {e}") from e
 
-    async def delete_connection(self, connection_id: str, version_number: int) -> bool:
-        """Deletes a connection given its ID and current revision version number."""
+    async def delete_connection(self, connection_id: str, version_number: Optional[int] = None) -> bool:
+        """Deletes a connection given its ID and current revision version number (cached revision if omitted)."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
-        client = await self._get_client()
-        # Use the integer version number in the query parameter
-        endpoint = f"/connections/{connection_id}?version={version_number}&clientId={self._client_id}"
-
         try:
-            logger.info(f"Attempting to delete connection {connection_id} (version {version_number}) using {self.base_url}{endpoint}")
-            response = await client.delete(endpoint)
+            logger.info(f"Attempting to delete connection {connection_id} (version {version_number})")
+            response = await self._delete_revisioned(f"/connections/{connection_id}", connection_id, version_number, self.get_connection)
             response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx
 
             if response.status_code == 200:
                  logger.info(f"Successfully deleted connection {connection_id}.")
+                 self._unindex_connection(connection_id)
                  return True
             else:
                  logger.warning(f"Connection deletion for {connection_id} returned status {response.status_code}, but expected 200.")
@@ -503,12 +911,68 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred deleting connection {connection_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred deleting connection: {e}") from e
 
+    # --- Connection Index ---
+
+    @staticmethod
+    def _connection_key(connection_entity: dict) -> tuple:
+        """Returns the ((source_id, destination_id), relationships) key of a connection entity."""
+        component = connection_entity.get("component", {})
+        endpoints = (component.get("source", {}).get("id"), component.get("destination", {}).get("id"))
+        relationships = tuple(sorted(component.get("selectedRelationships") or []))
+        return endpoints, relationships
+
+    def _index_connection(self, connection_entity: dict, process_group_id: Optional[str]) -> None:
+        """Adds a connection to the index of its process group, if that group has been loaded."""
+        group_index = self._connection_index.get(process_group_id)
+        if group_index is None:
+            return
+        endpoints, relationships = self._connection_key(connection_entity)
+        group_index.setdefault(endpoints, {})[relationships] = connection_entity
+
+    def _unindex_connection(self, connection_id: str) -> None:
+        """Removes a connection from every loaded process group index."""
+        for group_index in self._connection_index.values():
+            for endpoints in list(group_index.keys()):
+                by_relationships = group_index[endpoints]
+                for relationships, entity in list(by_relationships.items()):
+                    if entity.get("id") == connection_id:
+                        del by_relationships[relationships]
+                if not by_relationships:
+                    del group_index[endpoints]
+
+    async def get_connection_index(self, process_group_id: str, user_request_id: str = "-", action_id: str = "-") -> Dict[tuple, Dict[tuple, dict]]:
+        """Returns the connections of a process group keyed by (source_id, destination_id) and then by relationships.
+
+        The group is listed from NiFi only on first use; connections created, updated or deleted
+        through this client afterwards keep the index current.
+        """
+        if process_group_id in self._connection_index:
+            metrics.record_cache_lookup("connection_index", True)
+            return self._connection_index[process_group_id]
+        metrics.record_cache_lookup("connection_index", False)
+        async with self._connection_index_lock:
+            if process_group_id not in self._connection_index:
+                connections = await self.list_connections(process_group_id, user_request_id=user_request_id, action_id=action_id)
+                self._connection_index[process_group_id] = {}
+                for connection_entity in connections:
+                    self._index_connection(connection_entity, process_group_id)
+                logger.debug(f"Loaded connection index for group {process_group_id} with {len(connections)} connections.")
+        return self._connection_index[process_group_id]
+
+    def hold_connection_pair(self, process_group_id: str, source_id: str, target_id: str):
+        """Async context manager serializing "check for a duplicate, then create" of one source→target pair per NiFi server."""
+        return self._pair_locks.hold(f"{process_group_id}|{source_id}|{target_id}")
+
+    async def find_connections(self, process_group_id: str, source_id: str, target_id: str, user_request_id: str = "-", action_id: str = "-") -> List[dict]:
+        """Returns the connection entities from source_id to target_id in a process group, using the connection index."""
+        group_index = await self.get_connection_index(process_group_id, user_request_id=user_request_id, action_id=action_id)
+        return list(group_index.get((source_id, target_id), {}).values())
+
     async def update_connection(self, connection_id: str, update_payload: Dict[str, Any]) -> Dict:
         """Updates a specific connection using the provided payload (including revision and component)."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
-        client = await self._get_client()
         endpoint = f"/connections/{connection_id}"
         revision = update_payload.get("revision", {})
         version = revision.get("version", "UNKNOWN")
@@ -520,10 +984,15 @@ class NiFiClient:
             if selected_relationships is not None:
                 logger.debug(f"Setting selectedRelationships to: {selected_relationships}")
                 
-            response = await client.put(endpoint, json=update_payload)
-            response.raise_for_status()
+            response = await self._put_revisioned(
+                endpoint, connection_id, revision, True,
+                lambda fresh_revision: {**update_payload, "revision": fresh_revision},
+                self.get_connection
+            )
             updated_entity = response.json()
             logger.info(f"Successfully updated connection {connection_id}. New revision: {updated_entity.get('revision', {}).get('version')}")
+            self._unindex_connection(connection_id)
+            self._index_connection(updated_entity, updated_entity.get("component", {}).get("parentGroupId"))
             return updated_entity
 
         except httpx.HTTPStatusError as e:
@@ -547,9 +1016,15 @@ class NiFiClient:
         self,
         processor_id: str,
         update_type: str,
-        update_data: Union[Dict[str, Any], List[str]]
+        update_data: Union[Dict[str, Any], List[str]],
+        current_entity: Optional[Dict[str, Any]] = None
     ) -> dict:
-        """Updates specific parts of a processor's component configuration (properties or auto-terminated relationships)."""
+        """Updates specific parts of a processor's component configuration (properties or auto-terminated relationships).
+
+        The revision comes from current_entity when the caller already holds one (e.g. from a listing),
+        otherwise from the revision cache, otherwise from a GET. A 409 on a revision that was not just
+        fetched is retried once with a fresh GET.
+        """
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
@@ -558,10 +1033,18 @@ class NiFiClient:
         if update_type not in valid_update_types:
             raise ValueError(f"Invalid update_type '{update_type}'. Must be one of {valid_update_types}")
 
-        # 1. Get current processor entity to obtain the latest revision
-        logger.info(f"Fetching current details for processor {processor_id} before update.")
+        # 1. Obtain a revision: from the caller's entity, the revision cache, or a fresh GET
+        from_cache = current_entity is not None
         try:
-            current_entity = await self.get_processor_details(processor_id)
+            if current_entity is None:
+                cached_revision = self.get_cached_revision(processor_id)
+                if cached_revision is not None:
+                    # Optimistic write: NiFi leaves fields absent from the component untouched
+                    current_entity = {"revision": cached_revision, "component": {"id": processor_id, "config": {}}}
+                    from_cache = True
+                else:
+                    logger.info(f"Fetching current details for processor {processor_id} before update.")
+                    current_entity = await self.get_processor_details(processor_id)
             current_revision = current_entity["revision"]
             current_component = current_entity["component"]
         except (ValueError, ConnectionError) as e:
@@ -578,6 +1061,8 @@ class NiFiClient:
             # Copy existing config first, then overwrite specific part
             "config": current_component.get("config", {}).copy(),
         }
+        if from_cache:
+            update_component = {"id": processor_id, "config": {}}
 
         # Apply the specific update based on update_type
         log_message_part = "unknown configuration part"
@@ -603,19 +1088,15 @@ class NiFiClient:
             update_component["config"]["autoTerminatedRelationships"] = update_data
             log_message_part = f"config.autoTerminatedRelationships: {update_data}"
 
-        # Construct final payload
-        update_payload = {
-            "revision": current_revision,
-            "component": update_component
-        }
-
         # 3. Make the PUT request
-        client = await self._get_client()
         endpoint = f"/processors/{processor_id}"
         try:
             logger.info(f"Updating processor {processor_id} (Version: {current_revision.get('version')}). Updating {log_message_part}")
-            response = await client.put(endpoint, json=update_payload)
-            response.raise_for_status()
+            response = await self._put_revisioned(
+                endpoint, processor_id, current_revision, from_cache,
+                lambda revision: {"revision": revision, "component": update_component},
+                self.get_processor_details
+            )
             updated_entity = response.json()
             logger.info(f"Successfully updated processor {processor_id}. New revision: {updated_entity.get('revision', {}).get('version')}")
             return updated_entity
@@ -636,39 +1117,35 @@ class NiFiClient:
             raise ConnectionError(f"An unexpected error occurred updating processor: {e}") from e
 
     async def update_processor_state(self, processor_id: str, state: str) -> dict:
-        """Starts or stops a specific processor."""
+        """Starts or stops a specific processor, or triggers a single run with 'RUN_ONCE'."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
         normalized_state = state.upper()
-        if normalized_state not in ["RUNNING", "STOPPED"]:
-            raise ValueError("Invalid state specified. Must be 'RUNNING' or 'STOPPED'.")
+        if normalized_state not in ["RUNNING", "STOPPED", "RUN_ONCE"]:
+            raise ValueError("Invalid state specified. Must be 'RUNNING', 'STOPPED' or 'RUN_ONCE'.")
 
-        # 1. Get current processor entity to obtain the latest revision
+        # 1. Get the revision (cached if seen before, otherwise fetched)
         # We need the revision even just to change the state.
-        logger.info(f"Fetching current revision for processor {processor_id} before changing state to {normalized_state}.")
         try:
-            # Use get_processor_details as it already handles fetching the entity
-            current_entity = await self.get_processor_details(processor_id)
-            current_revision = current_entity["revision"]
+            current_revision, from_cache = await self._resolve_revision(processor_id, self.get_processor_details)
         except (ValueError, ConnectionError) as e:
             logger.error(f"Failed to fetch processor {processor_id} to update state: {e}")
             raise
 
         # 2. Prepare the update payload for the run-status endpoint
-        update_payload = {
-            "revision": current_revision,
-            "state": normalized_state,
-            "disconnectedNodeAcknowledged": False # Usually required, defaults to false
-        }
+        def build_payload(revision: dict) -> dict:
+            return {
+                "revision": revision,
+                "state": normalized_state,
+                "disconnectedNodeAcknowledged": False # Usually required, defaults to false
+            }
 
         # 3. Make the PUT request to the run-status endpoint
-        client = await self._get_client()
         endpoint = f"/processors/{processor_id}/run-status"
         try:
             logger.info(f"Setting processor {processor_id} state to {normalized_state} (Version: {current_revision.get('version')}).")
-            response = await client.put(endpoint, json=update_payload)
-            response.raise_for_status()
+            response = await self._put_revisioned(endpoint, processor_id, current_revision, from_cache, build_payload, self.get_processor_details)
             updated_entity = response.json() # The response contains the processor entity with updated status
             logger.info(f"Successfully set processor {processor_id} state to {updated_entity.get('component',{}).get('state', 'UNKNOWN')}. New revision: {updated_entity.get('revision', {}).get('version')}")
             return updated_entity
@@ -687,43 +1164,6 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred changing state for processor {processor_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred changing processor state: {e}") from e
 
-    async def get_process_group_status_snapshot(self, process_group_id: str) -> dict:
-        """Fetches the status snapshot for a specific process group, including component states and queue sizes.
-
-        Args:
-            process_group_id: The ID of the target process group.
-
-        Returns:
-            A dictionary containing the process group status snapshot, typically under the 'processGroupStatus' key.
-        """
-        if not self._token:
-            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
-
-        client = await self._get_client()
-        endpoint = f"/flow/process-groups/{process_group_id}/status"
-        try:
-            logger.info(f"Fetching status snapshot for process group {process_group_id} from {self.base_url}{endpoint}")
-            response = await client.get(endpoint)
-            response.raise_for_status()
-            status_data = response.json()
-            # The core data is usually within processGroupStatus
-            logger.info(f"Successfully fetched status snapshot for process group {process_group_id}")
-            return status_data.get("processGroupStatus", {}) # Return the main status part
-
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                logger.warning(f"Process group {process_group_id} not found when fetching status snapshot.")
-                raise ValueError(f"Process group with ID {process_group_id} not found.") from e
-            else:
-                logger.error(f"Failed to get status snapshot for process group {process_group_id}: {e.response.status_code} - {e.response.text}")
-                raise ConnectionError(f"Failed to get process group status snapshot: {e.response.status_code}, {e.response.text}") from e
-        except (httpx.RequestError, ValueError) as e:
-            logger.error(f"Error getting status snapshot for process group {process_group_id}: {e}")
-            raise ConnectionError(f"Error getting process group status snapshot: {e}") from e
-        except Exception as e:
-            logger.error(f"An unexpected error occurred getting status snapshot for {process_group_id}: {e}", exc_info=True)
-            raise ConnectionError(f"An unexpected error occurred getting process group status snapshot: {e}") from e
-
     async def get_bulletin_board(self, group_id: Optional[str] = None, source_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
         """Fetches bulletins from the NiFi bulletin board, optionally filtered.
 
@@ -817,6 +1257,7 @@ class NiFiClient:
             data = response.json()
             # Response is InputPortsEntity with 'inputPorts' key
             ports = data.get("inputPorts", [])
+            self._remember_revisions(ports)
             logger.info(f"Found {len(ports)} input ports in group {process_group_id}.")
             return ports
         except httpx.HTTPStatusError as e:
@@ -843,6 +1284,7 @@ class NiFiClient:
             data = response.json()
             # Response is OutputPortsEntity with 'outputPorts' key
             ports = data.get("outputPorts", [])
+            self._remember_revisions(ports)
             logger.info(f"Found {len(ports)} output ports in group {process_group_id}.")
             return ports
         except httpx.HTTPStatusError as e:
@@ -869,6 +1311,7 @@ class NiFiClient:
             data = response.json()
             # Response is ProcessGroupsEntity with 'processGroups' key
             groups = data.get("processGroups", [])
+            self._remember_revisions(groups)
             logger.info(f"Found {len(groups)} child process groups in group {process_group_id}.")
             return [{'id': x['id'], 'name': x['component']['name']} for x in groups]
         except httpx.HTTPStatusError as e:
@@ -880,7 +1323,6 @@ class NiFiClient:
         except Exception as e:
             logger.error(f"An unexpected error occurred listing process groups: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred listing process groups: {e}") from e
-    @lru_cache
     async def is_descendant(self,process_group_id: str, parent_process_group_id:str)->bool:
         """Recursively gets details of process group to check if a process group is a descendant of another."""
         if not self._token:
@@ -891,17 +1333,68 @@ class NiFiClient:
                 return False
             if process_group_id == parent_process_group_id:
                 return True
+            # Results are cached per client instance (lru_cache cannot be used on coroutines)
+            cache_key = (process_group_id, parent_process_group_id)
+            if cache_key in self._descendant_cache:
+                metrics.record_cache_lookup("descendant", True)
+                return self._descendant_cache[cache_key]
+            metrics.record_cache_lookup("descendant", False)
             logger.info(f"Checking if {process_group_id} is a descendant of {parent_process_group_id}")
-            data = await self.get_process_group_details(process_group_id)
+            parent_pg_id = await self._get_parent_group_id(process_group_id)
             # Check the parent process group ID and check recursively
-            parent_pg_id = data.get('component', {}).get('parentGroupId')
             if not parent_pg_id:
-                return False
-            return await self.is_descendant(parent_pg_id, parent_process_group_id)
+                result = False
+            else:
+                result = await self.is_descendant(parent_pg_id, parent_process_group_id)
+            self._descendant_cache[cache_key] = result
+            return result
 
         except Exception as e:
             logger.error(f"An unexpected error occurred checking descendant status: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred checking descendant status: {e}") from e
+    async def _get_parent_group_id(self, process_group_id: str) -> Optional[str]:
+        """Returns a process group's parent id (None for the root), via the shared "flow" cache when available."""
+        cache_key = f"{self.base_url}|parent|{process_group_id}"
+        if self._shared_cache is not None:
+            cached = await self._shared_cache.get("flow", cache_key)
+            if cached is not None:
+                return cached or None
+        data = await self.get_process_group_details(process_group_id)
+        parent_pg_id = data.get('component', {}).get('parentGroupId')
+        if self._shared_cache is not None:
+            await self._shared_cache.set("flow", cache_key, parent_pg_id or "", FLOW_TTL_SECONDS)
+        return parent_pg_id
+
+    async def crawl_process_group_hierarchy(self, root_id: str, max_groups: int = 500, concurrency: int = 8) -> int:
+        """Walks the process group tree breadth-first from `root_id`, caching every group's parent id.
+
+        Pre-populates the "flow" entries used by _get_parent_group_id (and so is_descendant) without a
+        per-group details request. Stops after `max_groups` groups; returns the number of groups visited.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def list_children(pg_id: str) -> list[dict]:
+            async with semaphore:
+                return await self.get_process_groups(pg_id)
+
+        if self._shared_cache is not None:
+            await self._shared_cache.set("flow", f"{self.base_url}|parent|{root_id}", "", FLOW_TTL_SECONDS)
+        visited = 1
+        level = [root_id]
+        while level and visited < max_groups:
+            children_per_group = await asyncio.gather(*(list_children(pg_id) for pg_id in level))
+            next_level = []
+            for parent_id, children in zip(level, children_per_group):
+                for child in children:
+                    if visited >= max_groups:
+                        break
+                    visited += 1
+                    next_level.append(child['id'])
+                    if self._shared_cache is not None:
+                        await self._shared_cache.set("flow", f"{self.base_url}|parent|{child['id']}", parent_id, FLOW_TTL_SECONDS)
+            level = next_level
+        return visited
+
     async def get_process_group_details(self, process_group_id: str) -> dict:
         """Fetches the flow details for a specific process group, often including counts."""
         if not self._token:
@@ -941,6 +1434,7 @@ class NiFiClient:
             response = await client.get(endpoint)
             response.raise_for_status()
             flow_details = response.json()
+            self._remember_revisions(flow_details.get("processGroupFlow", {}).get("flow", {}))
             logger.info(f"Successfully fetched flow details for process group {process_group_id}")
             return flow_details
 
@@ -1016,17 +1510,14 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred getting output port details for {port_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred getting output port details: {e}") from e
 
-    async def delete_input_port(self, port_id: str, version: int) -> bool:
-        """Deletes an input port given its ID and current revision version."""
+    async def delete_input_port(self, port_id: str, version: Optional[int] = None) -> bool:
+        """Deletes an input port given its ID and current revision version (cached revision if omitted)."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
-        client = await self._get_client()
-        endpoint = f"/input-ports/{port_id}?version={version}&clientId={self._client_id}"
-
         try:
-            logger.info(f"Attempting to delete input port {port_id} (version {version}) using {self.base_url}{endpoint}")
-            response = await client.delete(endpoint)
+            logger.info(f"Attempting to delete input port {port_id} (version {version})")
+            response = await self._delete_revisioned(f"/input-ports/{port_id}", port_id, version, self.get_input_port_details)
             response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx
 
             if response.status_code == 200:
@@ -1053,17 +1544,14 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred deleting input port {port_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred deleting input port: {e}") from e
 
-    async def delete_output_port(self, port_id: str, version: int) -> bool:
-        """Deletes an output port given its ID and current revision version."""
+    async def delete_output_port(self, port_id: str, version: Optional[int] = None) -> bool:
+        """Deletes an output port given its ID and current revision version (cached revision if omitted)."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
-        client = await self._get_client()
-        endpoint = f"/output-ports/{port_id}?version={version}&clientId={self._client_id}"
-
         try:
-            logger.info(f"Attempting to delete output port {port_id} (version {version}) using {self.base_url}{endpoint}")
-            response = await client.delete(endpoint)
+            logger.info(f"Attempting to delete output port {port_id} (version {version})")
+            response = await self._delete_revisioned(f"/output-ports/{port_id}", port_id, version, self.get_output_port_details)
             response.raise_for_status()
 
             if response.status_code == 200:
@@ -1090,18 +1578,150 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred deleting output port {port_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred deleting output port: {e}") from e
 
-    async def delete_process_group(self, pg_id: str, version: int) -> bool:
-        """Deletes a process group given its ID and current revision version. Fails if not empty."""
+    async def get_funnels(self, process_group_id: str) -> list[dict]:
+        """Lists funnels within a specified process group."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
         client = await self._get_client()
-        # Recursive deletion isn't standard; this deletes only if empty
-        endpoint = f"/process-groups/{pg_id}?version={version}&clientId={self._client_id}"
+        endpoint = f"/process-groups/{process_group_id}/funnels"
+        try:
+            logger.info(f"Fetching funnels for group {process_group_id} from {self.base_url}{endpoint}")
+            response = await client.get(endpoint)
+            response.raise_for_status()
+            data = response.json()
+            # Response is FunnelsEntity with 'funnels' key
+            funnels = data.get("funnels", [])
+            self._remember_revisions(funnels)
+            logger.info(f"Found {len(funnels)} funnels in group {process_group_id}.")
+            return funnels
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Failed to list funnels for group {process_group_id}: {e.response.status_code} - {e.response.text}")
+            raise ConnectionError(f"Failed to list funnels: {e.response.status_code}") from e
+        except (httpx.RequestError, ValueError) as e:
+            logger.error(f"Error listing funnels for group {process_group_id}: {e}")
+            raise ConnectionError(f"Error listing funnels: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred listing funnels: {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred listing funnels: {e}") from e
 
+    async def get_funnel_details(self, funnel_id: str) -> dict:
+        """Fetches the details of a specific funnel."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/funnels/{funnel_id}"
         try:
-            logger.info(f"Attempting to delete process group {pg_id} (version {version}) using {self.base_url}{endpoint}")
-            response = await client.delete(endpoint)
+            logger.info(f"Fetching details for funnel {funnel_id} from {self.base_url}{endpoint}")
+            response = await client.get(endpoint)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Funnel with ID {funnel_id} not found.")
+                raise ValueError(f"Funnel with ID {funnel_id} not found.") from e
+            logger.error(f"Failed to get details for funnel {funnel_id}: {e.response.status_code} - {e.response.text}")
+            raise ConnectionError(f"Failed to get funnel details: {e.response.status_code}, {e.response.text}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Error getting details for funnel {funnel_id}: {e}")
+            raise ConnectionError(f"Error getting funnel details: {e}") from e
+
+    async def delete_funnel(self, funnel_id: str, version: Optional[int] = None) -> bool:
+        """Deletes a funnel given its ID and current revision version (cached revision if omitted)."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        try:
+            logger.info(f"Attempting to delete funnel {funnel_id} (version {version})")
+            response = await self._delete_revisioned(f"/funnels/{funnel_id}", funnel_id, version, self.get_funnel_details)
+            response.raise_for_status()
+            logger.info(f"Successfully deleted funnel {funnel_id}.")
+            return True
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                 logger.warning(f"Funnel {funnel_id} not found for deletion.")
+                 return False
+            elif e.response.status_code == 409:
+                 logger.error(f"Conflict deleting funnel {funnel_id}. Check revision version ({version}) or ensure it has no connections. Response: {e.response.text}")
+                 raise ValueError(f"Conflict deleting funnel {funnel_id}. Ensure correct version ({version}) and that it has no connections.") from e
+            else:
+                 logger.error(f"Failed to delete funnel {funnel_id}: {e.response.status_code} - {e.response.text}")
+                 raise ConnectionError(f"Failed to delete funnel: {e.response.status_code}, {e.response.text}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Error deleting funnel {funnel_id}: {e}")
+            raise ConnectionError(f"Error deleting funnel: {e}") from e
+
+    async def list_controller_services(self, process_group_id: str, include_descendants: bool = True) -> list[dict]:
+        """Lists the controller services defined in a process group (and its descendants), without ancestor-scoped ones."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/flow/process-groups/{process_group_id}/controller-services"
+        params = {"includeAncestorGroups": "false", "includeDescendantGroups": str(include_descendants).lower()}
+        try:
+            logger.info(f"Fetching controller services for group {process_group_id} from {self.base_url}{endpoint}")
+            response = await client.get(endpoint, params=params)
+            response.raise_for_status()
+            data = response.json()
+            # Response is ControllerServicesEntity with 'controllerServices' key
+            services = data.get("controllerServices", [])
+            self._remember_revisions(services)
+            logger.info(f"Found {len(services)} controller services in group {process_group_id}.")
+            return services
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Process group {process_group_id} not found when listing controller services.")
+                raise ValueError(f"Process group with ID {process_group_id} not found.") from e
+            logger.error(f"Failed to list controller services for group {process_group_id}: {e.response.status_code} - {e.response.text}")
+            raise ConnectionError(f"Failed to list controller services: {e.response.status_code}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Error listing controller services for group {process_group_id}: {e}")
+            raise ConnectionError(f"Error listing controller services: {e}") from e
+
+    async def update_controller_services_state(self, pg_id: str, state: str) -> dict:
+        """Enables or disables all controller services in a process group and its descendants (bulk, no revisions).
+
+        NiFi orders the transitions by service references. The change is asynchronous, so poll
+        list_controller_services until every service has reached the requested state.
+        """
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        normalized_state = state.upper()
+        if normalized_state not in ["ENABLED", "DISABLED"]:
+            raise ValueError("Invalid state specified. Must be 'ENABLED' or 'DISABLED'.")
+
+        client = await self._get_client()
+        endpoint = f"/flow/process-groups/{pg_id}/controller-services"
+        try:
+            logger.info(f"Setting all controller services in process group {pg_id} to {normalized_state} via {self.base_url}{endpoint}")
+            response = await client.put(endpoint, json={"id": pg_id, "state": normalized_state})
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Process group {pg_id} not found for controller service state update.")
+                raise ValueError(f"Process group with ID {pg_id} not found.") from e
+            elif e.response.status_code == 409:
+                logger.error(f"Conflict updating controller services of process group {pg_id}. Response: {e.response.text}")
+                raise ValueError(f"Conflict updating controller services of process group {pg_id}: {e.response.text}") from e
+            logger.error(f"Failed to update controller services of process group {pg_id}: {e.response.status_code} - {e.response.text}")
+            raise ConnectionError(f"Failed to update controller services state: {e.response.status_code}, {e.response.text}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Error updating controller services of process group {pg_id}: {e}")
+            raise ConnectionError(f"Error updating controller services state: {e}") from e
+
+    async def delete_process_group(self, pg_id: str, version: Optional[int] = None) -> bool:
+        """Deletes a process group given its ID and current revision version (cached revision if omitted). Fails if not empty."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        # Recursive deletion isn't standard; this deletes only if empty
+        try:
+            logger.info(f"Attempting to delete process group {pg_id} (version {version})")
+            response = await self._delete_revisioned(f"/process-groups/{pg_id}", pg_id, version, self.get_process_group_details)
             response.raise_for_status()
 
             if response.status_code == 200:
@@ -1138,29 +1758,26 @@ class NiFiClient:
         if normalized_state not in ["RUNNING", "STOPPED", "DISABLED"]:
             raise ValueError("Invalid state specified. Must be 'RUNNING' or 'STOPPED' or 'DISABLED'.")
 
-        # 1. Get current details for revision
-        logger.info(f"Fetching current revision for input port {port_id} before changing state to {normalized_state}.")
+        # 1. Get the revision (cached if seen before, otherwise fetched)
         try:
-            current_entity = await self.get_input_port_details(port_id)
-            current_revision = current_entity["revision"]
+            current_revision, from_cache = await self._resolve_revision(port_id, self.get_input_port_details)
         except (ValueError, ConnectionError) as e:
             logger.error(f"Failed to fetch input port {port_id} to update state: {e}")
             raise
 
         # 2. Prepare payload
-        update_payload = {
-            "revision": current_revision,
-            "state": normalized_state,
-            "disconnectedNodeAcknowledged": False
-        }
+        def build_payload(revision: dict) -> dict:
+            return {
+                "revision": revision,
+                "state": normalized_state,
+                "disconnectedNodeAcknowledged": False
+            }
 
         # 3. Make PUT request
-        client = await self._get_client()
         endpoint = f"/input-ports/{port_id}/run-status"
         try:
             logger.info(f"Setting input port {port_id} state to {normalized_state} (Version: {current_revision.get('version')}).")
-            response = await client.put(endpoint, json=update_payload)
-            response.raise_for_status()
+            response = await self._put_revisioned(endpoint, port_id, current_revision, from_cache, build_payload, self.get_input_port_details)
             updated_entity = response.json()
             logger.info(f"Successfully set input port {port_id} state to {updated_entity.get('component',{}).get('state', 'UNKNOWN')}.")
             return updated_entity
@@ -1187,29 +1804,26 @@ class NiFiClient:
         if normalized_state not in ["RUNNING", "STOPPED", "DISABLED"]:
             raise ValueError("Invalid state specified. Must be 'RUNNING' or 'STOPPED' or 'DISABLED'.")
 
-        # 1. Get current details for revision
-        logger.info(f"Fetching current revision for output port {port_id} before changing state to {normalized_state}.")
+        # 1. Get the revision (cached if seen before, otherwise fetched)
         try:
-            current_entity = await self.get_output_port_details(port_id)
-            current_revision = current_entity["revision"]
+            current_revision, from_cache = await self._resolve_revision(port_id, self.get_output_port_details)
         except (ValueError, ConnectionError) as e:
             logger.error(f"Failed to fetch output port {port_id} to update state: {e}")
             raise
 
         # 2. Prepare payload
-        update_payload = {
-            "revision": current_revision,
-            "state": normalized_state,
-            "disconnectedNodeAcknowledged": False
-        }
+        def build_payload(revision: dict) -> dict:
+            return {
+                "revision": revision,
+                "state": normalized_state,
+                "disconnectedNodeAcknowledged": False
+            }
 
         # 3. Make PUT request
-        client = await self._get_client()
         endpoint = f"/output-ports/{port_id}/run-status"
         try:
             logger.info(f"Setting output port {port_id} state to {normalized_state} (Version: {current_revision.get('version')}).")
-            response = await client.put(endpoint, json=update_payload)
-            response.raise_for_status()
+            response = await self._put_revisioned(endpoint, port_id, current_revision, from_cache, build_payload, self.get_output_port_details)
             updated_entity = response.json()
             logger.info(f"Successfully set output port {port_id} state to {updated_entity.get('component',{}).get('state', 'UNKNOWN')}.")
             return updated_entity
@@ -1328,11 +1942,77 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred creating process group '{name}': {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred creating process group: {e}") from e
 
+    async def download_flow_definition(self, pg_id: str) -> dict:
+        """Downloads the versioned flow definition (process group contents as JSON) of a process group."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/process-groups/{pg_id}/download"
+        try:
+            logger.info(f"Downloading flow definition of process group {pg_id}")
+            response = await client.get(endpoint)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Process group {pg_id} not found.")
+                raise ValueError(f"Process group with ID {pg_id} not found.") from e
+            logger.error(f"Failed to download flow definition of {pg_id}: {e.response.status_code} - {e.response.text}")
+            raise ConnectionError(f"Failed to download flow definition: {e.response.status_code}, {e.response.text}") from e
+        except (httpx.RequestError, ValueError) as e:
+            logger.error(f"Error downloading flow definition of {pg_id}: {e}")
+            raise ConnectionError(f"Error downloading flow definition: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred downloading flow definition of {pg_id}: {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred downloading flow definition: {e}") from e
+
+    async def upload_flow_definition(
+        self, parent_pg_id: str, group_name: str, flow_definition: dict, position: Dict[str, float]
+    ) -> dict:
+        """Creates a new process group from a flow definition in a single upload request."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/process-groups/{parent_pg_id}/process-groups/upload"
+        form = {
+            "groupName": group_name,
+            "positionX": str(position.get("x", 0.0)),
+            "positionY": str(position.get("y", 0.0)),
+            "clientId": self._client_id,
+        }
+        files = {"file": (f"{group_name}.json", json.dumps(flow_definition).encode("utf-8"), "application/json")}
+        try:
+            logger.info(f"Uploading flow definition as process group '{group_name}' into {parent_pg_id}")
+            response = await client.post(endpoint, data=form, files=files, timeout=120.0)
+            response.raise_for_status()
+            created_pg_data = response.json()
+            logger.info(f"Successfully uploaded process group '{group_name}' with ID: {created_pg_data.get('id')}")
+            return created_pg_data
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Parent process group {parent_pg_id} not found.")
+                raise ValueError(f"Process group with ID {parent_pg_id} not found.") from e
+            logger.error(f"Failed to upload flow definition '{group_name}': {e.response.status_code} - {e.response.text}")
+            raise ConnectionError(f"Failed to upload flow definition: {e.response.status_code}, {e.response.text}") from e
+        except (httpx.RequestError, ValueError) as e:
+            logger.error(f"Error uploading flow definition '{group_name}': {e}")
+            raise ConnectionError(f"Error uploading flow definition: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred uploading flow definition '{group_name}': {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred uploading flow definition: {e}") from e
+
     async def get_processor_types(self) -> List[Dict]:
         """Fetches the list of available processor types from the NiFi instance."""
         if not self._token:
             raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
 
+        if self._shared_cache is not None:
+            cached_types = await self._shared_cache.get("processor_types", self.base_url)
+            if cached_types is not None:
+                return cached_types
+
         client = await self._get_client()
         endpoint = "/flow/processor-types"
 
@@ -1344,6 +2024,8 @@ class NiFiClient:
             # The response is ProcessorTypesEntity, containing 'processorTypes' list
             processor_types = data.get("processorTypes", [])
             logger.info(f"Successfully fetched {len(processor_types)} available processor types.")
+            if self._shared_cache is not None:
+                await self._shared_cache.set("processor_types", self.base_url, processor_types, PROCESSOR_TYPES_TTL_SECONDS)
             return processor_types
 
         except httpx.HTTPStatusError as e:
@@ -1433,11 +2115,12 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred updating state for process group {pg_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred updating process group state: {e}") from e
 
-    async def get_process_group_status_snapshot(self, process_group_id: str) -> dict:
+    async def get_process_group_status_snapshot(self, process_group_id: str, recursive: bool = False) -> dict:
         """Fetches the status snapshot for a specific process group, including component states and queue sizes.
 
         Args:
             process_group_id: The ID of the target process group.
+            recursive: Whether to include status snapshots of all nested process groups.
 
         Returns:
             A dictionary containing the process group status snapshot, typically under the 'processGroupStatus' key.
@@ -1449,7 +2132,7 @@ class NiFiClient:
         endpoint = f"/flow/process-groups/{process_group_id}/status"
         try:
             logger.info(f"Fetching status snapshot for process group {process_group_id} from {self.base_url}{endpoint}")
-            response = await client.get(endpoint)
+            response = await client.get(endpoint, params={"recursive": "true"} if recursive else None)
             response.raise_for_status()
             status_data = response.json()
             # The core data is usually within processGroupStatus
@@ -1611,6 +2294,95 @@ class NiFiClient:
             logger.error(f"An unexpected error occurred deleting FlowFile listing request {request_id}: {e}", exc_info=True)
             raise ConnectionError(f"An unexpected error occurred deleting FlowFile listing request: {e}") from e
 
+    # --- FlowFile Queue Drop Methods ---
+
+    async def create_drop_request(self, connection_id: str) -> dict:
+        """Submits a request to drop (empty) all FlowFiles queued in a connection."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/flowfile-queues/{connection_id}/drop-requests"
+        try:
+            logger.info(f"Submitting drop request for connection {connection_id}")
+            response = await client.post(endpoint, json={})
+            response.raise_for_status()
+            request_data = response.json()
+            logger.info(f"Successfully submitted drop request {request_data.get('dropRequest',{}).get('id')} for connection {connection_id}")
+            return request_data.get("dropRequest", {})
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Connection {connection_id} not found for drop request.")
+                raise ValueError(f"Connection with ID {connection_id} not found.") from e
+            else:
+                logger.error(f"Failed to create drop request for connection {connection_id}: {e.response.status_code} - {e.response.text}")
+                raise ConnectionError(f"Failed to create drop request: {e.response.status_code}, {e.response.text}") from e
+        except (httpx.RequestError, ValueError) as e:
+            logger.error(f"Error creating drop request for connection {connection_id}: {e}")
+            raise ConnectionError(f"Error creating drop request: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred creating drop request for {connection_id}: {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred creating drop request: {e}") from e
+
+    async def get_drop_request(self, connection_id: str, request_id: str) -> dict:
+        """Retrieves the progress of a specific drop request."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/flowfile-queues/{connection_id}/drop-requests/{request_id}"
+        try:
+            logger.debug(f"Fetching status for drop request {request_id} on connection {connection_id}")
+            response = await client.get(endpoint)
+            response.raise_for_status()
+            request_data = response.json()
+            logger.debug(f"Successfully fetched status for drop request {request_id}. Finished: {request_data.get('dropRequest',{}).get('finished')}")
+            return request_data.get("dropRequest", {})
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.warning(f"Drop request {request_id} or connection {connection_id} not found.")
+                raise ValueError(f"Drop request {request_id} or connection {connection_id} not found.") from e
+            else:
+                logger.error(f"Failed to get drop request {request_id}: {e.response.status_code} - {e.response.text}")
+                raise ConnectionError(f"Failed to get drop request: {e.response.status_code}, {e.response.text}") from e
+        except (httpx.RequestError, ValueError) as e:
+            logger.error(f"Error getting drop request {request_id}: {e}")
+            raise ConnectionError(f"Error getting drop request: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred getting drop request {request_id}: {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred getting drop request: {e}") from e
+
+    async def delete_drop_request(self, connection_id: str, request_id: str) -> bool:
+        """Deletes a drop request (cancelling it if still running)."""
+        if not self._token:
+            raise NiFiAuthenticationError("Client is not authenticated. Call authenticate() first.")
+
+        client = await self._get_client()
+        endpoint = f"/flowfile-queues/{connection_id}/drop-requests/{request_id}"
+        try:
+            logger.info(f"Deleting drop request {request_id} on connection {connection_id}")
+            response = await client.delete(endpoint)
+            response.raise_for_status()
+            logger.info(f"Successfully deleted drop request {request_id}.")
+            return True
+
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                 # If it's already gone, consider it success for cleanup purposes
+                 logger.warning(f"Drop request {request_id} not found for deletion (already deleted?).")
+                 return True
+            else:
+                 logger.error(f"Failed to delete drop request {request_id}: {e.response.status_code} - {e.response.text}")
+                 raise ConnectionError(f"Failed to delete drop request: {e.response.status_code}, {e.response.text}") from e
+        except httpx.RequestError as e:
+            logger.error(f"Error deleting drop request {request_id}: {e}")
+            raise ConnectionError(f"Error deleting drop request: {e}") from e
+        except Exception as e:
+            logger.error(f"An unexpected error occurred deleting drop request {request_id}: {e}", exc_info=True)
+            raise ConnectionError(f"An unexpected error occurred deleting drop request: {e}") from e
+
     # --- Provenance Methods ---
 
     async def update_process_group_state(self, pg_id: str, state: str) -> dict:
@@ -1,5 +1,5 @@
 from contextvars import ContextVar
-from typing import Optional
+from typing import Optional, Callable, Any, Awaitable
 
 # Import types carefully to avoid circular dependencies if types are complex
 # For now, assume basic types or forward references if needed
@@ -12,6 +12,8 @@ current_request_logger: ContextVar[Optional[Logger]] = ContextVar("current_reque
 current_user_request_id: ContextVar[Optional[str]] = ContextVar("current_user_request_id", default=None)
 current_action_id: ContextVar[Optional[str]] = ContextVar("current_action_id", default=None)
 current_process_group : ContextVar[Optional[str]] = ContextVar("current_process_group", default=None)
+# Set only by streaming executions: receives (event, data) progress events emitted by tools
+current_progress_emitter: ContextVar[Optional[Callable[[str, Any], Awaitable[None]]]] = ContextVar("current_progress_emitter", default=None)
 # Usage example (in tool functions):
 # from .request_context import current_nifi_client, current_request_logger, current_user_request_id, current_action_id
 #
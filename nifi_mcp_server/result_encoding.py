@@ -0,0 +1,131 @@
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import brotli  # Optional: enables 'br' response encoding when installed
+except ImportError:
+    brotli = None
+
+# --- Tool Result Shaping --- #
+# Applied by the REST bridge after a tool returns and before the result is serialized, so the
+# tools themselves keep returning their full, readable structures.
+
+COMPRESSION_MIN_BYTES = 1024
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parses a comma-separated `fields` parameter ('id,name,component.state') into a list of paths."""
+    return [field.strip() for field in (fields or "").split(",") if field.strip()]
+
+
+def _group_paths(paths: List[str]) -> Dict[str, List[str]]:
+    """Groups dotted paths by their first segment: ['a.b', 'a.c', 'd'] -> {'a': ['b', 'c'], 'd': []}."""
+    grouped: Dict[str, List[str]] = {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        grouped.setdefault(head, [])
+        if rest:
+            grouped[head].append(rest)
+    return grouped
+
+
+def project_fields(value: Any, fields: List[str]) -> Any:
+    """Keeps only the requested (dotted) fields of every record in a tool result.
+
+    A dict containing at least one requested top-level field is treated as a record and reduced to
+    those fields; any other dict (e.g. a {'status', 'message', 'results'} envelope) keeps its scalar
+    values and is searched recursively. Lists are projected item by item.
+    """
+    if not fields:
+        return value
+    grouped = _group_paths(fields)
+    if isinstance(value, list):
+        return [project_fields(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if any(key in value for key in grouped):
+        projected = {}
+        for key, sub_paths in grouped.items():
+            if key in value:
+                projected[key] = project_fields(value[key], sub_paths) if sub_paths else value[key]
+        return projected
+    return {key: project_fields(item, fields) if isinstance(item, (dict, list)) else item for key, item in value.items()}
+
+
+def to_table(value: Any) -> Any:
+    """Encodes every list of dicts in a result as {'columns': [...], 'rows': [[...], ...]}.
+
+    Columns are the union of the records' keys in first-seen order; missing values become None.
+    Nested lists of dicts inside cells are encoded the same way.
+    """
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            columns: List[str] = []
+            seen = set()
+            for item in value:
+                for key in item:
+                    if key not in seen:
+                        seen.add(key)
+                        columns.append(key)
+            return {"columns": columns, "rows": [[to_table(item.get(column)) for column in columns] for item in value]}
+        return [to_table(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_table(item) for key, item in value.items()}
+    return value
+
+
+def shape_result(result: Any, fields: Optional[str] = None, encoding: str = "json") -> Any:
+    """Applies the `fields` projection and then the requested encoding ('json' or 'table')."""
+    shaped = project_fields(result, parse_fields(fields))
+    if encoding == "table":
+        shaped = to_table(shaped)
+    return shaped
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into {coding: q}; codings with an unparsable q are ignored."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [piece.strip() for piece in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, raw = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(raw)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def _is_accepted(coding: str, accepted: Dict[str, float]) -> bool:
+    """Whether a coding is acceptable: listed with q > 0, or covered by '*' with q > 0 and not listed."""
+    if coding in accepted:
+        return accepted[coding] > 0
+    return accepted.get("*", 0.0) > 0
+
+
+def encode_json_body(data: Any, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Serializes data once as compact JSON and compresses it when the client accepts br or gzip.
+
+    Codings refused with `q=0` are never used.
+
+    Returns:
+        The body bytes and the Content-Encoding to send (None when uncompressed).
+
+    Raises:
+        TypeError: If the data is not JSON serializable.
+    """
+    body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    if len(body) < COMPRESSION_MIN_BYTES or not accept_encoding:
+        return body, None
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and _is_accepted("br", accepted):
+        return brotli.compress(body, quality=4), "br"
+    if _is_accepted("gzip", accepted):
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
@@ -0,0 +1,197 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from loguru import logger
+
+from . import metrics
+
+# --- Fair Scheduling --- #
+# Tool executions against one NiFi server get a bounded number of concurrent slots. Waiting
+# executions are queued per user and dispatched by start-time fair queueing: every execution gets a
+# virtual finish tag of max(server virtual time, the user's last finish tag) + cost / weight, and the
+# smallest tag runs next. A user submitting many (or heavy, higher cost) executions therefore only
+# delays their own queue. Heavy tools additionally share a smaller cap, and queues are bounded so an
+# overloaded server answers immediately with a retry hint instead of piling up requests.
+
+SERVICE_TIME_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 60
+MAX_TRACKED_USERS = 1000
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a NiFi server's (or a user's) queue is full; `retry_after` is a suggested delay in seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("user_id", "heavy", "start_tag", "finish_tag", "future")
+
+    def __init__(self, user_id: str, heavy: bool, start_tag: float, finish_tag: float):
+        self.user_id = user_id
+        self.heavy = heavy
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class _ServerQueue:
+    def __init__(self):
+        self.running = 0
+        self.heavy_running = 0
+        self.queued = 0
+        self.virtual_time = 0.0
+        self.user_finish: Dict[str, float] = {}
+        self.queues: Dict[str, Deque[_Waiter]] = {}
+        self.avg_service_seconds = 1.0
+
+
+class FairScheduler:
+    """Per-NiFi-server weighted fair queueing of tool executions across users."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_heavy: int = 4,
+        max_queue: int = 100,
+        max_queue_per_user: int = 20,
+        heavy_tools: Iterable[str] = (),
+        heavy_cost: float = 4.0,
+        user_weights: Optional[Dict[str, float]] = None
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_heavy = min(max_heavy, max_concurrent)
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.heavy_tools = frozenset(heavy_tools)
+        self.heavy_cost = heavy_cost
+        self.user_weights = user_weights or {}
+        self._servers: Dict[str, _ServerQueue] = {}
+
+    def is_heavy(self, tool_name: str) -> bool:
+        return tool_name in self.heavy_tools
+
+    def _server(self, server_id: str) -> _ServerQueue:
+        queue = self._servers.get(server_id)
+        if queue is None:
+            queue = self._servers[server_id] = _ServerQueue()
+        return queue
+
+    def _retry_after(self, server: _ServerQueue) -> int:
+        estimate = (server.queued + 1) * server.avg_service_seconds / self.max_concurrent
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+    def _must_queue(self, server: _ServerQueue, heavy: bool) -> bool:
+        return server.queued > 0 or server.running >= self.max_concurrent or (heavy and server.heavy_running >= self.max_heavy)
+
+    def check_capacity(self, server_id: str, user_id: str, tool_name: str) -> None:
+        """Raises SchedulerOverloaded if an execution submitted now would be rejected."""
+        server = self._server(server_id)
+        if not self._must_queue(server, self.is_heavy(tool_name)):
+            return
+        if server.queued >= self.max_queue:
+            metrics.SCHEDULER_REJECTED.inc(server_id, "server_queue_full")
+            raise SchedulerOverloaded(f"Too many queued tool executions for NiFi server '{server_id}'.", self._retry_after(server))
+        if len(server.queues.get(user_id, ())) >= self.max_queue_per_user:
+            metrics.SCHEDULER_REJECTED.inc(server_id, "user_queue_full")
+            raise SchedulerOverloaded(f"Too many queued tool executions for user '{user_id}' on NiFi server '{server_id}'.", self._retry_after(server))
+
+    def _tag(self, server: _ServerQueue, user_id: str, heavy: bool) -> tuple:
+        if len(server.user_finish) > MAX_TRACKED_USERS:
+            server.user_finish = {user: tag for user, tag in server.user_finish.items() if tag > server.virtual_time}
+        start_tag = max(server.virtual_time, server.user_finish.get(user_id, 0.0))
+        finish_tag = start_tag + (self.heavy_cost if heavy else 1.0) / self.user_weights.get(user_id, 1.0)
+        server.user_finish[user_id] = finish_tag
+        return start_tag, finish_tag
+
+    def _dispatch(self, server: _ServerQueue) -> None:
+        """Starts queued executions with the smallest finish tags while slots are free."""
+        while server.running < self.max_concurrent and server.queued:
+            best: Optional[_Waiter] = None
+            for queue in server.queues.values():
+                head = queue[0]
+                if head.heavy and server.heavy_running >= self.max_heavy:
+                    continue
+                if best is None or head.finish_tag < best.finish_tag:
+                    best = head
+            if best is None:
+                return
+            self._unqueue(server, best)
+            server.virtual_time = max(server.virtual_time, best.start_tag)
+            server.running += 1
+            server.heavy_running += best.heavy
+            best.future.set_result(None)
+
+    def _unqueue(self, server: _ServerQueue, waiter: _Waiter) -> None:
+        queue = server.queues[waiter.user_id]
+        queue.remove(waiter)
+        if not queue:
+            del server.queues[waiter.user_id]
+        server.queued -= 1
+
+    def _release(self, server: _ServerQueue, heavy: bool, service_seconds: Optional[float]) -> None:
+        server.running -= 1
+        server.heavy_running -= heavy
+        if service_seconds is not None:
+            server.avg_service_seconds += SERVICE_TIME_SMOOTHING * (service_seconds - server.avg_service_seconds)
+        self._dispatch(server)
+
+    @asynccontextmanager
+    async def slot(self, server_id: str, user_id: str, tool_name: str):
+        """Holds an execution slot on a NiFi server, yielding the seconds spent queued.
+
+        Raises:
+            SchedulerOverloaded: If the server's or the user's queue is full.
+        """
+        server = self._server(server_id)
+        heavy = self.is_heavy(tool_name)
+        queued_at = time.perf_counter()
+        if self._must_queue(server, heavy):
+            self.check_capacity(server_id, user_id, tool_name)
+            waiter = _Waiter(user_id, heavy, *self._tag(server, user_id, heavy))
+            server.queues.setdefault(user_id, deque()).append(waiter)
+            server.queued += 1
+            # Another user's head may be runnable even while heavy executions wait for the heavy cap
+            self._dispatch(server)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release(server, heavy, None)
+                else:
+                    self._unqueue(server, waiter)
+                    self._dispatch(server)
+                raise
+        else:
+            start_tag, _ = self._tag(server, user_id, heavy)
+            server.virtual_time = max(server.virtual_time, start_tag)
+            server.running += 1
+            server.heavy_running += heavy
+        waited = time.perf_counter() - queued_at
+        metrics.SCHEDULER_WAIT.observe(waited, server_id)
+        if waited > 1.0:
+            logger.debug(f"Tool '{tool_name}' for user '{user_id}' waited {waited:.2f}s for a slot on NiFi server '{server_id}'")
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self._release(server, heavy, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns running and queued executions per NiFi server."""
+        return {
+            server_id: {
+                "running": server.running,
+                "heavy_running": server.heavy_running,
+                "queued": server.queued,
+                "queued_users": len(server.queues),
+                "avg_service_seconds": round(server.avg_service_seconds, 3),
+            }
+            for server_id, server in self._servers.items()
+        }
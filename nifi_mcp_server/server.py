@@ -1,15 +1,19 @@
+# Imported first so --profile-startup / NIFI_MCP_PROFILE_STARTUP=1 times every import below
+from nifi_mcp_server.startup_profile import startup_profiler
 import asyncio
 import signal
-from typing import List, Dict, Optional, Any, Union, Literal
+from typing import List, Dict, Optional, Any, Union, Literal, Awaitable, Set
 import json
+import hashlib
+import random
+import time
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Body, Request, Query, Header
-from fastapi.responses import JSONResponse 
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import sys
 from loguru import logger 
-from docstring_parser import parse 
-from contextlib import asynccontextmanager # Added import
+from contextlib import asynccontextmanager, AsyncExitStack # Added import
 from textwrap import dedent # <-- IMPORT ADDED
 
 # --- Setup Logging --- 
@@ -26,20 +30,27 @@ except ImportError as e:
 # ---------------------
 
 # Import our NiFi API client and exception (Absolute Import)
-from nifi_mcp_server.nifi_client import NiFiAuthenticationError # Keep Error import
+from nifi_mcp_server.nifi_client import NiFiAuthenticationError, get_component_lock_stats # Keep Error import
 # REMOVED from nifi_mcp_server.nifi_client import NiFiClient
 
 # Import MCP server components (Corrected for v1.6.0)
 # REMOVED from mcp.server import FastMCP
 
 # Import core components AFTER logging is setup, but BEFORE tools
-from .core import mcp, get_nifi_client
+with startup_profiler.step("import core (FastMCP)"):
+    from .core import mcp, get_nifi_client, get_shared_cache
+from .jobs import ToolJob, ToolJobStore
+from .result_encoding import shape_result, encode_json_body
+from . import metrics
+from .tracing import RequestTrace, current_trace, export_trace
+from .scheduler import FairScheduler, SchedulerOverloaded
+from .warmup import Warmup
 
 # Import the context var from logging_setup
 from config.logging_setup import request_context # Adjust import path if needed
 
 # --- Import ContextVars --- #
-from .request_context import current_process_group, current_nifi_client, current_request_logger, current_user_request_id, current_action_id # Added
+from .request_context import current_process_group, current_nifi_client, current_request_logger, current_user_request_id, current_action_id, current_progress_emitter # Added
 
 from mcp.shared.exceptions import McpError # Base error
 from mcp.server.fastmcp.exceptions import ToolError # Tool-specific errors
@@ -63,18 +74,40 @@ from .api_tools.utils import (
 )
 # ---------------------------------------------------------------------
 
-# --- Import Tool Modules AFTER mcp is defined to allow registration ---
-from .api_tools import review # Imports list_*, get_*, document_*
-from .api_tools import creation
-from .api_tools import modification
-from .api_tools import operation
-from .api_tools import lookup
-# Add other tool module imports here as they are created
-# from .api_tools import lookup
+# --- Register Tool Modules AFTER mcp is defined ---
+# With a current tool manifest, tool modules are imported on first use (and in the background after
+# startup) and /tools is served from the manifest; otherwise all of them are imported here.
+# New tool modules must be added to tool_manifest.TOOL_MODULES.
+from .tool_manifest import TOOL_MODULES, load_manifest, import_tool_module, import_all_tool_modules
+with startup_profiler.step("tool registration"):
+    tool_manifest = load_manifest()
+    if tool_manifest is None:
+        import_all_tool_modules()
+        _tool_modules_by_name: Dict[str, str] = {}
+    else:
+        _tool_modules_by_name = {tool["name"]: tool["module"] for tool in tool_manifest["tools"]}
+_pending_tool_modules = set(_tool_modules_by_name.values())
+
+def _ensure_tool_loaded(tool_name: str) -> None:
+    """Imports the module of a manifest tool that has not been registered yet."""
+    module_name = _tool_modules_by_name.get(tool_name)
+    if module_name in _pending_tool_modules:
+        logger.info(f"Loading tool module '{module_name}' for tool '{tool_name}'")
+        import_tool_module(module_name)
+        _pending_tool_modules.discard(module_name)
+
+async def _load_pending_tool_modules(delay_seconds: float = 1.0) -> None:
+    """Registers the tool modules not loaded yet, one per event loop turn, shortly after startup."""
+    await asyncio.sleep(delay_seconds)
+    for module_name in [name for name in TOOL_MODULES if name in _pending_tool_modules]:
+        import_tool_module(module_name)
+        _pending_tool_modules.discard(module_name)
+        await asyncio.sleep(0)
+    logger.debug("All tool modules are loaded.")
 # ---------------------------------------------------------------------
 
 # --- Import Config Settings --- #
-from config.settings import get_nifi_servers # Added
+from config.settings import get_nifi_servers, get_trace_export_settings, get_scheduler_settings, get_warmup_settings, get_tool_deadline # Added
 
 
 # === FastAPI Application Setup === #
@@ -84,18 +117,53 @@ from config.settings import get_nifi_servers # Added
 async def lifespan(app: FastAPI):
     # Startup logic
     logger.info("FastAPI server starting up...")
-    if not get_nifi_servers():
+    global tool_scheduler, server_warmup
+    with startup_profiler.step("config load"):
+        servers_configured = bool(get_nifi_servers())
+        scheduler_settings = get_scheduler_settings()
+        warmup_settings = get_warmup_settings()
+    tool_scheduler = FairScheduler(**scheduler_settings) if scheduler_settings else None
+    # Jobs become visible to every uvicorn worker when the shared cache is backed by a file
+    tool_jobs.attach_shared_cache(get_shared_cache())
+    if not servers_configured:
         logger.warning("*******************************************************")
         logger.warning("*** No NiFi servers configured in config.yaml!      ***")
         logger.warning("*** The /tools/{tool_name} endpoint will not work! ***")
         logger.warning("*******************************************************")
     else:
         logger.info(f"Found {len(get_nifi_servers())} NiFi server configurations.")
+
+    # Precompute the tool catalog for every phase so /tools never formats tools on the request path
+    with startup_profiler.step("tool catalog"):
+        if tool_manifest is not None:
+            catalog_phases = {p for tool in tool_manifest["tools"] for p in tool["definition"]["phases"]}
+        else:
+            catalog_phases = {p for phases in _tool_phase_registry.values() for p in phases}
+        for phase in [None] + sorted(catalog_phases):
+            _get_tool_catalog(phase, logger)
+
+    loop_lag_task = asyncio.create_task(metrics.monitor_event_loop_lag())
+    preload_task = asyncio.create_task(_load_pending_tool_modules()) if _pending_tool_modules else None
+    warmup_task = None
+    if warmup_settings and servers_configured:
+        server_warmup = Warmup([server["id"] for server in get_nifi_servers() if server.get("id")], **warmup_settings)
+        warmup_task = asyncio.create_task(server_warmup.run(get_nifi_client))
+    if startup_profiler.enabled:
+        startup_profiler.stop()
+        logger.info("\n" + startup_profiler.report())
     
     yield # Application runs here
     
     # Shutdown logic (moved from shutdown_event and cleanup)
     logger.info("FastAPI server shutting down...")
+    loop_lag_task.cancel()
+    if preload_task:
+        preload_task.cancel()
+    if warmup_task:
+        warmup_task.cancel()
+    await tool_jobs.shutdown()
+    if _trace_export_tasks:
+        await asyncio.wait(set(_trace_export_tasks), timeout=5)
     # Call cleanup logic directly here if needed in the future
     # await cleanup() 
     logger.info("Cleanup finished.")
@@ -197,13 +265,297 @@ async def list_processor_groups(request: Request,nifi_server_id: Optional[str] =
             bound_logger.debug(f"Closing NiFi client connection for server ID: {nifi_server_id}")
             await nifi_client.close()
 
+@app.get("/stats/component-locks", response_model=Dict[str, Dict[str, Any]], tags=["Diagnostics"])
+async def component_lock_stats():
+    """Returns per-server queue-wait statistics of the component write locks, keyed by NiFi server ID."""
+    url_to_id = {server.get("url"): server.get("id") for server in get_nifi_servers()}
+    return {url_to_id.get(base_url, base_url): stats for base_url, stats in get_component_lock_stats().items()}
+
+# --- Metrics --- #
+def _component_lock_waiting() -> Dict[tuple, float]:
+    return {(base_url,): stats["waiting"] for base_url, stats in get_component_lock_stats().items()}
+
+def _tool_jobs_by_status() -> Dict[tuple, float]:
+    counts: Dict[tuple, float] = {}
+    for job in list(tool_jobs._jobs.values()):
+        counts[(job.status,)] = counts.get((job.status,), 0) + 1
+    return counts
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "nifi_mcp_component_lock_waiters", "Writers queued behind a component write lock, per NiFi server.", ("server",),
+    collect=_component_lock_waiting))
+metrics.REGISTRY.register(metrics.Gauge(
+    "nifi_mcp_tool_jobs", "Tool jobs held in the job store by status.", ("status",), collect=_tool_jobs_by_status))
+
+# --- Tool Scheduler --- #
+# Tool executions are queued per NiFi server and user (X-User-Id header, else the client address)
+# with weighted fair queueing, so one user's crawl cannot starve everyone else on that server.
+# Created from config.yaml in the lifespan startup.
+tool_scheduler: Optional[FairScheduler] = None
+
+def _scheduling_user(request: Request) -> str:
+    return request.headers.get("X-User-Id") or (request.client.host if request.client else "-")
+
+def _check_scheduler_capacity(nifi_server_id: str, user_id: str, tool_name: str) -> None:
+    """Answers 429 with Retry-After right away if the execution would be rejected by the scheduler."""
+    if tool_scheduler is None:
+        return
+    try:
+        tool_scheduler.check_capacity(nifi_server_id, user_id, tool_name)
+    except SchedulerOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@asynccontextmanager
+async def _tool_slot(nifi_server_id: str, user_id: str, tool_name: str):
+    """Holds a scheduler slot for a tool execution (a no-op when scheduling is disabled)."""
+    if tool_scheduler is None:
+        yield 0.0
+        return
+    async with tool_scheduler.slot(nifi_server_id, user_id, tool_name) as waited:
+        yield waited
+
+def _scheduler_gauge(key: str) -> Dict[tuple, float]:
+    if tool_scheduler is None:
+        return {}
+    return {(server_id,): stats[key] for server_id, stats in tool_scheduler.stats().items()}
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "nifi_mcp_scheduler_queue_depth", "Tool executions queued for a slot, per NiFi server.", ("server",),
+    collect=lambda: _scheduler_gauge("queued")))
+metrics.REGISTRY.register(metrics.Gauge(
+    "nifi_mcp_scheduler_running", "Tool executions holding a slot, per NiFi server.", ("server",),
+    collect=lambda: _scheduler_gauge("running")))
+metrics.REGISTRY.register(metrics.Gauge(
+    "nifi_mcp_scheduler_heavy_running", "Heavy tool executions holding a slot, per NiFi server.", ("server",),
+    collect=lambda: _scheduler_gauge("heavy_running")))
+
+@app.get("/stats/scheduler", response_model=Dict[str, Dict[str, Any]], tags=["Diagnostics"])
+async def scheduler_stats():
+    """Returns running and queued tool executions per NiFi server ID."""
+    return tool_scheduler.stats() if tool_scheduler else {}
+
+# --- Health --- #
+# "live" means the process serves requests; "warm" means the optional start-up warm-up has finished
+# (servers that failed or timed out are listed but do not keep the bridge cold, since requests to them
+# simply take the cold path). Without warm-up configured the bridge is warm as soon as it is live.
+server_warmup: Optional[Warmup] = None
+
+def _warmup_status() -> Dict[str, Any]:
+    if server_warmup is None:
+        return {"enabled": False, "done": True, "all_warm": True, "status": "warm", "servers": {}}
+    return {"enabled": True, **server_warmup.status()}
+
+def _server_warm_gauge() -> Dict[tuple, float]:
+    if server_warmup is None:
+        return {}
+    return {(server_id,): float(status["state"] == "warm") for server_id, status in server_warmup.servers.items()}
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "nifi_mcp_server_warm", "1 if the start-up warm-up of a NiFi server succeeded.", ("server",), collect=_server_warm_gauge))
+
+@app.get("/health/live", tags=["Diagnostics"])
+async def health_live():
+    """Liveness: answers 200 as long as the bridge is running."""
+    return {"status": "live"}
+
+@app.get("/health/warm", tags=["Diagnostics"])
+async def health_warm():
+    """Readiness: 200 once every NiFi server is warm (or warm-up is disabled), else 503 with the progress.
+
+    The status is 'warming' while warm-up runs, then 'warm', 'partial' (some servers failed) or 'cold' (all failed).
+    """
+    warmup = _warmup_status()
+    return JSONResponse(status_code=200 if warmup["status"] == "warm" else 503, content={"status": warmup["status"], "warmup": warmup})
+
+@app.get("/health", tags=["Diagnostics"])
+async def health():
+    """Returns liveness, warm-up progress per NiFi server and the scheduler state."""
+    warmup = _warmup_status()
+    return {"live": True, "warm": warmup["status"] == "warm", "warm_status": warmup["status"], "warmup": warmup, "scheduler": tool_scheduler.stats() if tool_scheduler else {}}
+
+@app.get("/metrics", tags=["Diagnostics"])
+async def prometheus_metrics():
+    """Returns tool, NiFi API, cache and event loop metrics of this worker in the Prometheus text format."""
+    return Response(content=metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- Tool Catalog Cache --- #
+# Formatting a tool (docstring parsing, example extraction, schema cleanup) only depends on the
+# registered tools, so the catalog is built once per phase and served as pre-encoded JSON with a
+# strong ETag. It is rebuilt automatically if the set of registered tools changes.
+_tool_catalog_cache: Dict[str, Dict[str, Any]] = {}
+
+def _format_tool_definition(tool_info: Any, tool_phases_list: List[str], bound_logger) -> Dict[str, Any]:
+    """Formats one registered MCP tool as an OpenAI-style function definition with its phases."""
+    from docstring_parser import parse # Only needed when the catalog is not served from the tool manifest
+    tool_name = getattr(tool_info, 'name', 'unknown')
+    raw_docstring = getattr(tool_info, 'description', '')
+    parsed_docstring = parse(raw_docstring)
+    returns_description = ""
+    if parsed_docstring.returns and parsed_docstring.returns.description:
+        returns_description = f"\n\n**Returns:**\n{parsed_docstring.returns.description}"
+
+    base_description_parts = []
+    if parsed_docstring.short_description:
+        base_description_parts.append(parsed_docstring.short_description)
+
+    if parsed_docstring.long_description:
+        base_description_parts.append("\n\n" + parsed_docstring.long_description) # Add separation
+
+    if base_description_parts:
+        base_description = "".join(base_description_parts)
+        bound_logger.trace(f"Using parsed short/long description for tool '{tool_name}'")
+    else:
+        base_description = raw_docstring.split('\n\n')[0] # Original fallback
+        bound_logger.trace(f"Falling back to basic description for tool '{tool_name}' (parsing empty?)")
+
+    # --- BEGIN ADDITION: Extract Example section ---
+    example_section = ""
+    example_markers = ["Example:\n", "Examples:\n"] # Check for both singular and plural
+    normalized_docstring = "\n" + raw_docstring # Ensure leading newline for marker check at start
+
+    marker_found = None
+    marker_start_index = -1
+    for marker in example_markers:
+        found_index = normalized_docstring.find(marker)
+        if found_index != -1:
+            marker_found = marker
+            marker_start_index = found_index
+            break
+
+    if marker_found:
+        # Start content search *after* the marker
+        content_start_index = marker_start_index + len(marker_found)
+        potential_example_content = normalized_docstring[content_start_index:]
+
+        # Find the end of the example block by looking for the next common section marker
+        next_section_markers = ["Args:\n", "Returns:\n", "Raises:\n", "Attributes:\n", "Yields:\n"] # Add others if needed
+        end_index = len(potential_example_content) # Default to end of string
+
+        for next_marker in next_section_markers:
+             found_index = potential_example_content.find(next_marker)
+             if found_index != -1:
+                end_index = min(end_index, found_index)
+
+        # Dedent the extracted block before stripping
+        raw_example_content = potential_example_content[:end_index]
+        dedented_content = dedent(raw_example_content)
+        example_content = dedented_content.strip() # Strip after dedenting
+
+        if example_content:
+             # Re-add the marker itself (stripped) and format with bold markdown around it
+             example_section = f"\n\n**{marker_found.strip()}**\n{example_content}\n\n"
+             bound_logger.trace(f"Extracted Example section for tool '{tool_name}'")
+    # --- END ADDITION ---
+
+    tool_description = f"{base_description}{example_section}{returns_description}"
+
+    param_descriptions = {p.arg_name: p.description for p in parsed_docstring.params}
+    raw_params_schema = getattr(tool_info, 'parameters', {})
+    parameters_schema = {"type": "object", "properties": {}}
+    raw_properties = raw_params_schema.get('properties', {})
+    cleaned_properties = {}
+    if isinstance(raw_properties, dict):
+        for prop_name, prop_schema in raw_properties.items():
+            if isinstance(prop_schema, dict):
+                cleaned_schema = prop_schema.copy()
+                cleaned_schema.pop('anyOf', None)
+                cleaned_schema.pop('title', None)
+                cleaned_schema.pop('default', None)
+                cleaned_schema['description'] = param_descriptions.get(prop_name, '')
+                cleaned_properties[prop_name] = cleaned_schema
+            else:
+                logger.warning(f"Property '{prop_name}' in tool '{tool_name}' has non-dict schema: {prop_schema}. Skipping property.")
+    parameters_schema["properties"] = cleaned_properties
+    required_list = raw_params_schema.get('required', [])
+    if required_list and cleaned_properties:
+         parameters_schema["required"] = required_list
+    elif "required" in parameters_schema:
+         del parameters_schema["required"]
+    if not parameters_schema["properties"]:
+         del parameters_schema["properties"]
+         if "required" in parameters_schema: del parameters_schema["required"]
+    if 'required' in raw_params_schema:
+        parameters_schema["required"] = list(raw_params_schema['required'])
+    if 'properties' in parameters_schema:
+        for prop_name, prop_data in parameters_schema['properties'].items():
+            if isinstance(prop_data, dict) and 'enum' in prop_data:
+                prop_data['enum'] = [str(val) for val in prop_data['enum']]
+
+    return {
+        "type": "function",
+        "function": {
+            "name": tool_name,
+            "description": tool_description,
+            "parameters": parameters_schema
+        },
+        "phases": tool_phases_list # Include phases in the response
+    }
+
+def _get_tool_catalog(phase: Optional[str], bound_logger) -> Optional[Dict[str, Any]]:
+    """Returns the cached catalog for a phase ({'tools', 'body', 'etag'}), building it if needed."""
+    if tool_manifest is not None:
+        # The manifest holds the formatted definitions of the current tool sources
+        fingerprint = (tool_manifest["fingerprint"],)
+        if "all" not in _tool_catalog_cache:
+            _tool_catalog_cache["all"] = _encode_tool_catalog([tool["definition"] for tool in tool_manifest["tools"]], fingerprint)
+            bound_logger.info(f"Loaded tool catalog with {len(tool_manifest['tools'])} tool definitions from the tool manifest.")
+        full_catalog = _tool_catalog_cache["all"]
+        tools_info = []
+    else:
+        tool_manager = getattr(mcp, '_tool_manager', None)
+        if not tool_manager:
+            return None
+        tools_info = tool_manager.list_tools()
+        fingerprint = tuple(getattr(tool_info, 'name', 'unknown') for tool_info in tools_info)
+        full_catalog = _tool_catalog_cache.get("all")
+
+    if full_catalog is None or full_catalog["fingerprint"] != fingerprint:
+        _tool_catalog_cache.clear()
+        formatted_tools = []
+        for tool_info in tools_info:
+            tool_name = getattr(tool_info, 'name', 'unknown')
+            tool_phases_list = _tool_phase_registry.get(tool_name, [])
+            if not tool_phases_list:
+                bound_logger.warning(f"Could not find phase tags in registry for tool '{tool_name}'. Assuming it belongs to all phases for safety.")
+            formatted_tools.append(_format_tool_definition(tool_info, tool_phases_list, bound_logger))
+        full_catalog = _encode_tool_catalog(formatted_tools, fingerprint)
+        _tool_catalog_cache["all"] = full_catalog
+        bound_logger.info(f"Built tool catalog with {len(formatted_tools)} tool definitions.")
+
+    phase_key = phase.lower() if phase else "all"
+    catalog = _tool_catalog_cache.get(phase_key)
+    if catalog is None:
+        phase_tools = [
+            tool for tool in full_catalog["tools"]
+            if phase_key in [p.lower() for p in tool["phases"]]
+        ]
+        catalog = _encode_tool_catalog(phase_tools, fingerprint)
+        _tool_catalog_cache[phase_key] = catalog
+    return catalog
+
+def _encode_tool_catalog(tools: List[Dict[str, Any]], fingerprint: tuple) -> Dict[str, Any]:
+    """Serializes a catalog once and derives its strong ETag from the encoded bytes."""
+    body = json.dumps(tools).encode("utf-8")
+    return {"tools": tools, "body": body, "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"', "fingerprint": fingerprint}
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks an If-None-Match header (single, list or '*') against a strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
 @app.get("/tools", response_model=List[Dict[str, Any]], tags=["Tools"])
 async def get_tools(
     request: Request, 
-    phase: str | None = Query(None) # Add phase query parameter
+    phase: str | None = Query(None), # Add phase query parameter
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ):
-    """Retrieve the list of available MCP tools, optionally filtered by phase."""
+    """Retrieve the list of available MCP tools, optionally filtered by phase.
+
+    The catalog is precomputed per phase and carries a strong ETag; a matching If-None-Match returns 304.
+    """
     user_request_id = request.state.user_request_id
     action_id = request.state.action_id
     bound_logger = logger.bind(user_request_id=user_request_id, action_id=action_id, requested_phase=phase)
@@ -211,132 +563,18 @@ async def get_tools(
     bound_logger.debug(f"/tools endpoint received phase parameter: {phase!r}") # Log the raw value
     
     try:
-        bound_logger.debug(f"Fetching tools, requested phase: '{phase}'")
-        formatted_tools = []
-        tool_manager = getattr(mcp, '_tool_manager', None)
-        if tool_manager:
-            tools_info = tool_manager.list_tools()
-            
-            for tool_info in tools_info: 
-                tool_name = getattr(tool_info, 'name', 'unknown')
-                tool_phases_list = _tool_phase_registry.get(tool_name, [])
-                if not tool_phases_list:
-                     bound_logger.warning(f"Could not find phase tags in registry for tool '{tool_name}'. Assuming it belongs to all phases for safety.")
-
-                requested_phase_lower = phase.lower() if phase else None
-                tool_phases_lower = [p.lower() for p in tool_phases_list]
-                
-                if requested_phase_lower and requested_phase_lower != "all" and requested_phase_lower not in tool_phases_lower:
-                    bound_logger.trace(f"Skipping tool '{tool_name}' due to phase mismatch (requested: {phase}, tool phases: {tool_phases_list})")
-                    continue # Skip this tool if phase doesn't match
-
-                raw_docstring = getattr(tool_info, 'description', '')
-                parsed_docstring = parse(raw_docstring)
-                returns_description = ""
-                if parsed_docstring.returns and parsed_docstring.returns.description:
-                    returns_description = f"\n\n**Returns:**\n{parsed_docstring.returns.description}"
-
-                base_description_parts = []
-                if parsed_docstring.short_description:
-                    base_description_parts.append(parsed_docstring.short_description)
-                
-                if parsed_docstring.long_description:
-                    base_description_parts.append("\n\n" + parsed_docstring.long_description) # Add separation
-
-                if base_description_parts:
-                    base_description = "".join(base_description_parts)
-                    bound_logger.trace(f"Using parsed short/long description for tool '{tool_name}'")
-                else:
-                    base_description = raw_docstring.split('\n\n')[0] # Original fallback
-                    bound_logger.trace(f"Falling back to basic description for tool '{tool_name}' (parsing empty?)")
-
-                # --- BEGIN ADDITION: Extract Example section ---
-                example_section = ""
-                example_markers = ["Example:\n", "Examples:\n"] # Check for both singular and plural
-                normalized_docstring = "\n" + raw_docstring # Ensure leading newline for marker check at start
-
-                marker_found = None
-                marker_start_index = -1
-                for marker in example_markers:
-                    found_index = normalized_docstring.find(marker)
-                    if found_index != -1:
-                        marker_found = marker
-                        marker_start_index = found_index
-                        break
-                
-                if marker_found:
-                    # Start content search *after* the marker
-                    content_start_index = marker_start_index + len(marker_found)
-                    potential_example_content = normalized_docstring[content_start_index:]
-
-                    # Find the end of the example block by looking for the next common section marker
-                    next_section_markers = ["Args:\n", "Returns:\n", "Raises:\n", "Attributes:\n", "Yields:\n"] # Add others if needed
-                    end_index = len(potential_example_content) # Default to end of string
-
-                    for next_marker in next_section_markers:
-                         found_index = potential_example_content.find(next_marker)
-                         if found_index != -1:
-                            end_index = min(end_index, found_index)
-
-                    # Dedent the extracted block before stripping
-                    raw_example_content = potential_example_content[:end_index]
-                    dedented_content = dedent(raw_example_content)
-                    example_content = dedented_content.strip() # Strip after dedenting
-                    
-                    if example_content:
-                         # Re-add the marker itself (stripped) and format with bold markdown around it
-                         example_section = f"\n\n**{marker_found.strip()}**\n{example_content}\n\n"
-                         bound_logger.trace(f"Extracted Example section for tool '{tool_name}'")
-                # --- END ADDITION ---
-
-                tool_description = f"{base_description}{example_section}{returns_description}"
-
-                param_descriptions = {p.arg_name: p.description for p in parsed_docstring.params}
-                raw_params_schema = getattr(tool_info, 'parameters', {})
-                parameters_schema = {"type": "object", "properties": {}}
-                raw_properties = raw_params_schema.get('properties', {})
-                cleaned_properties = {}
-                if isinstance(raw_properties, dict):
-                    for prop_name, prop_schema in raw_properties.items():
-                        if isinstance(prop_schema, dict):
-                            cleaned_schema = prop_schema.copy()
-                            cleaned_schema.pop('anyOf', None)
-                            cleaned_schema.pop('title', None)
-                            cleaned_schema.pop('default', None)
-                            cleaned_schema['description'] = param_descriptions.get(prop_name, '')
-                            cleaned_properties[prop_name] = cleaned_schema
-                        else:
-                            logger.warning(f"Property '{prop_name}' in tool '{tool_name}' has non-dict schema: {prop_schema}. Skipping property.")
-                parameters_schema["properties"] = cleaned_properties
-                required_list = raw_params_schema.get('required', [])
-                if required_list and cleaned_properties:
-                     parameters_schema["required"] = required_list
-                elif "required" in parameters_schema:
-                     del parameters_schema["required"]
-                if not parameters_schema["properties"]:
-                     del parameters_schema["properties"]
-                     if "required" in parameters_schema: del parameters_schema["required"]
-                if 'required' in raw_params_schema:
-                    parameters_schema["required"] = list(raw_params_schema['required'])
-                if 'properties' in parameters_schema:
-                    for prop_name, prop_data in parameters_schema['properties'].items():
-                        if isinstance(prop_data, dict) and 'enum' in prop_data:
-                            prop_data['enum'] = [str(val) for val in prop_data['enum']]
-                
-                formatted_tools.append({
-                    "type": "function",
-                    "function": {
-                        "name": tool_name,
-                        "description": tool_description,
-                        "parameters": parameters_schema
-                    },
-                    "phases": tool_phases_list # Include phases in the response
-                })
-            bound_logger.info(f"Returning {len(formatted_tools)} tool definitions (Phase: {phase or 'All'}).")
-            return formatted_tools
-        else:
+        catalog = _get_tool_catalog(phase, bound_logger)
+        if catalog is None:
             bound_logger.warning("Could not find ToolManager (_tool_manager) on MCP instance.")
             return []
+        headers = {"ETag": catalog["etag"], "Cache-Control": "no-cache"}
+        etag_matched = _etag_matches(if_none_match, catalog["etag"])
+        metrics.record_cache_lookup("tool_catalog_etag", etag_matched)
+        if etag_matched:
+            bound_logger.debug(f"Tool catalog unchanged (Phase: {phase or 'All'}); returning 304.")
+            return Response(status_code=304, headers=headers)
+        bound_logger.info(f"Returning {len(catalog['tools'])} tool definitions (Phase: {phase or 'All'}).")
+        return Response(content=catalog["body"], media_type="application/json", headers=headers)
     except Exception as e:
         bound_logger.error(f"Error retrieving tool definitions: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error retrieving tools.")
@@ -354,6 +592,19 @@ class ToolExecutionPayload(BaseModel):
     arguments: Dict[str, Any]
     context: Optional[ContextModel] = None
 
+class BatchToolInvocation(BaseModel):
+    tool_name: str
+    arguments: Dict[str, Any] = {}
+    parallel: bool = False # Run concurrently with the adjacent parallel items instead of on its own
+    fields: Optional[str] = None # Same as the `fields` query parameter of /tools/{tool_name}
+    encoding: Literal["json", "table"] = "json"
+
+class BatchToolExecutionPayload(BaseModel):
+    invocations: List[BatchToolInvocation]
+    stop_on_error: bool = False
+
+MAX_BATCH_INVOCATIONS = 50
+
 # Middleware for binding context IDs to logger
 @app.middleware("http")
 async def add_context_to_logger(request: Request, call_next):
@@ -378,9 +629,11 @@ async def add_context_to_logger(request: Request, call_next):
         # Use logger directly here, it will be patched
         logger.debug(f"Received request with context IDs: user_request_id={user_request_id}, action_id={action_id}")
     
+    metrics.HTTP_IN_FLIGHT.inc()
     try:
         response = await call_next(request)
     finally:
+        metrics.HTTP_IN_FLIGHT.dec()
         # --- Reset ContextVar --- 
         request_context.reset(loguru_context_token) # Reset Loguru context
         # ------------------------
@@ -390,16 +643,290 @@ async def add_context_to_logger(request: Request, call_next):
         # ---------------------------------- #
     return response
 
+def _extract_tool_result(tool_result_mcp_format: Any, tool_name: str, bound_logger) -> Any:
+    """Converts the MCP content returned by mcp.call_tool back into the tool's JSON result."""
+    final_result_to_serialize = None
+    # Check if the result is a list (potentially multiple TextContent objects)
+    if isinstance(tool_result_mcp_format, list):
+        parsed_list = []
+        for item in tool_result_mcp_format:
+            if hasattr(item, 'type') and item.type == 'text' and hasattr(item, 'text'):
+                try:
+                    parsed_item = json.loads(item.text)
+                    parsed_list.append(parsed_item)
+                except json.JSONDecodeError:
+                    # If text isn't JSON, append the raw text
+                    parsed_list.append(item.text)
+                    bound_logger.warning(f"List item TextContent for tool '{tool_name}' was not valid JSON. Appending as plain text.")
+            # Handle other potential list item types if necessary (e.g., ImageContent raw data?)
+            else:
+                parsed_list.append(item) # Append raw item if not TextContent
+                bound_logger.warning(f"Unexpected item type {type(item)} in MCP result list for tool '{tool_name}'. Appending raw item.")
+        final_result_to_serialize = parsed_list
+        bound_logger.debug(f"Parsed list from MCP TextContent objects: {final_result_to_serialize}")
+    # Handle case where result is a single object (e.g., single TextContent)
+    elif hasattr(tool_result_mcp_format, 'type') and tool_result_mcp_format.type == 'text' and hasattr(tool_result_mcp_format, 'text'):
+         try:
+             # Assume the text content is the JSON representation of the actual result
+             final_result_to_serialize = json.loads(tool_result_mcp_format.text)
+             bound_logger.debug(f"Extracted and parsed JSON from single TextContent: {final_result_to_serialize}")
+         except json.JSONDecodeError as json_err:
+             # If it's not JSON, maybe it's just plain text?
+             final_result_to_serialize = tool_result_mcp_format.text
+             bound_logger.warning(f"Single TextContent for tool '{tool_name}' was not valid JSON ({json_err}). Returning as plain text.")
+    # Handle other potential single result types (ImageContent, etc.) if needed
+    else:
+        # If the result wasn't a list or known single content type, assign it directly
+        final_result_to_serialize = tool_result_mcp_format
+        bound_logger.debug(f"Tool '{tool_name}' did not return standard MCP list/TextContent format. Using raw result: {final_result_to_serialize}")
+    return final_result_to_serialize
+
+# --- Cancellation --- #
+# A tool execution is cancelled when it runs past its deadline (nifi.tool_deadlines) or when the HTTP
+# client of execute_tool goes away. Cancelling the tool's task interrupts its in-flight NiFi request
+# or poller sleep; cleanup calls (listing, drop and provenance deletes) run through
+# NiFiClient.shield_cleanup, so they still complete and the client is only closed afterwards.
+DISCONNECT_POLL_SECONDS = 0.5
+
+class ToolDeadlineExceeded(Exception):
+    """Raised when a tool execution runs past its configured deadline and has been cancelled."""
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client went away before the tool finished and the tool has been cancelled."""
+
+def _is_registered_tool(tool_name: str) -> bool:
+    """Whether FastMCP knows the tool (assumed True if its tool manager cannot be inspected)."""
+    tool_manager = getattr(mcp, '_tool_manager', None)
+    return tool_manager is None or tool_manager.get_tool(tool_name) is not None
+
+async def _call_tool(tool_name: str, arguments: Dict[str, Any]) -> Any:
+    """Runs mcp.call_tool within the tool's deadline while recording its in-flight count, outcome and latency.
+
+    Calls of unregistered tools are recorded under the tool label 'unknown', so arbitrary names in
+    request paths cannot grow the metric label sets.
+
+    Raises:
+        ToolDeadlineExceeded: If the tool ran past its deadline (it has been cancelled and has cleaned up).
+    """
+    _ensure_tool_loaded(tool_name)
+    metric_name = tool_name if _is_registered_tool(tool_name) else "unknown"
+    outcome = "error"
+    started = time.perf_counter()
+    deadline = get_tool_deadline(tool_name)
+    metrics.TOOLS_IN_FLIGHT.inc(metric_name)
+    try:
+        try:
+            # wait_for only returns once the cancelled tool has finished its cleanup
+            result = await asyncio.wait_for(mcp.call_tool(tool_name, arguments), deadline)
+        except asyncio.TimeoutError:
+            outcome = "deadline"
+            raise ToolDeadlineExceeded(f"Tool '{tool_name}' exceeded its deadline of {deadline:g}s and was cancelled.")
+        outcome = "success"
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.TOOLS_IN_FLIGHT.dec(metric_name)
+        metrics.TOOL_CALLS.inc(metric_name, outcome)
+        metrics.TOOL_DURATION.observe(time.perf_counter() - started, metric_name)
+
+async def _cancel_on_disconnect(request: Request, awaitable: Awaitable, bound_logger) -> Any:
+    """Awaits `awaitable` in its own task, cancelling it if the HTTP client disconnects first.
+
+    Raises:
+        ClientDisconnected: If the client went away (the task has been cancelled and has cleaned up).
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                bound_logger.info("Client disconnected; cancelling the tool execution.")
+                task.cancel()
+                await asyncio.wait({task})
+                raise ClientDisconnected("Client disconnected before the tool finished.")
+    finally:
+        if not task.done():
+            task.cancel()
+
+def _json_response(data: Any, request: Request) -> Response:
+    """Serializes data once into a JSON Response, compressed when the client accepts it."""
+    body, content_encoding = encode_json_body(data, request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _classify_tool_exception(e: Exception) -> tuple:
+    """Maps a tool execution exception to the (status_code, detail) execute_tool would respond with."""
+    if isinstance(e, SchedulerOverloaded):
+        return 429, str(e)
+    if isinstance(e, ToolDeadlineExceeded):
+        return 504, str(e)
+    if isinstance(e, (ValueError, ToolError)):
+        return 400, str(e)
+    if isinstance(e, NiFiAuthenticationError):
+        return 503, f"Failed to authenticate with NiFi server: {e}"
+    if isinstance(e, McpError):
+        return (404 if "not found" in str(e).lower() else 500), str(e)
+    return 500, f"Internal server error during tool execution: {e}"
+
+@app.post("/tools/batch", tags=["Tools"])
+async def execute_tool_batch(
+    payload: BatchToolExecutionPayload,
+    request: Request,
+    nifi_server_id: Optional[str] = Header(None, alias="X-Nifi-Server-Id"),
+    pg_id: Optional[str] = Header(None, alias="X-Nifi-Pg-Id")
+) -> Dict[str, Any]:
+    """Execute an ordered list of MCP tool invocations with one authenticated NiFi client.
+
+    Adjacent invocations flagged `parallel` run concurrently; any other invocation waits for everything
+    before it and runs on its own. Every item gets its own result or error and its timing. With
+    `stop_on_error`, the items after the first failure are reported as skipped. If the client
+    disconnects, the running items are cancelled and the remaining ones are not started.
+
+    Requires the `X-Nifi-Server-Id` header to specify which configured NiFi server to target.
+    """
+    user_request_id = request.state.user_request_id
+    action_id = request.state.action_id
+    bound_logger = logger.bind(user_request_id=user_request_id, action_id=action_id, nifi_server_id=nifi_server_id)
+    invocations = payload.invocations
+    bound_logger.info(f"Received batch of {len(invocations)} tool invocations")
+
+    if not get_nifi_servers():
+        bound_logger.error("Cannot execute tools: No NiFi servers are configured in config.yaml.")
+        raise HTTPException(status_code=503, detail="No NiFi servers configured on the server.")
+    if not nifi_server_id:
+        bound_logger.warning("Missing X-Nifi-Server-Id header.")
+        raise HTTPException(status_code=400, detail="Missing required header: X-Nifi-Server-Id")
+    if len(invocations) > MAX_BATCH_INVOCATIONS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {MAX_BATCH_INVOCATIONS} invocations.")
+
+    # The batch shares one scheduler slot; it is treated as heavy if any of its tools is
+    user_id = _scheduling_user(request)
+    slot_tool = next((i.tool_name for i in invocations if tool_scheduler and tool_scheduler.is_heavy(i.tool_name)), "batch")
+    _check_scheduler_capacity(nifi_server_id, user_id, slot_tool)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(invocations)
+    batch_start = time.perf_counter()
+    failed = False
+
+    async def _run_item(index: int, invocation: BatchToolInvocation):
+        nonlocal failed
+        item_logger = bound_logger.bind(tool_name=invocation.tool_name, batch_index=index)
+        logger_token = current_request_logger.set(item_logger)
+        started = time.perf_counter()
+        try:
+            item_logger.info(f"Executing batch item {index}: '{invocation.tool_name}'")
+            tool_result = await _call_tool(invocation.tool_name, invocation.arguments)
+            result = shape_result(_extract_tool_result(tool_result, invocation.tool_name, item_logger), invocation.fields, invocation.encoding)
+            outcome = {"status": "success", "result": result}
+        except Exception as e:
+            status_code, detail = _classify_tool_exception(e)
+            item_logger.warning(f"Batch item {index} ('{invocation.tool_name}') failed: {e}")
+            outcome = {"status": "error", "status_code": status_code, "detail": detail}
+            failed = True
+        finally:
+            current_request_logger.reset(logger_token)
+        results[index] = {
+            "index": index,
+            "tool_name": invocation.tool_name,
+            **outcome,
+            "started_ms": round((started - batch_start) * 1000, 1),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    nifi_client = None
+    client_token = None
+    pg_token = None
+    slot_stack = AsyncExitStack()
+    try:
+        await slot_stack.enter_async_context(_tool_slot(nifi_server_id, user_id, slot_tool))
+        nifi_client = await get_nifi_client(nifi_server_id, bound_logger=bound_logger)
+        client_token = current_nifi_client.set(nifi_client)
+        pg_token = current_process_group.set(pg_id)
+
+        # Group adjacent parallel items; a sequential item is a group of its own
+        groups: List[List[int]] = []
+        for index, invocation in enumerate(invocations):
+            if invocation.parallel and groups and invocations[groups[-1][-1]].parallel:
+                groups[-1].append(index)
+            else:
+                groups.append([index])
+
+        async def _run_groups():
+            for group in groups:
+                if failed and payload.stop_on_error:
+                    for index in group:
+                        results[index] = {"index": index, "tool_name": invocations[index].tool_name, "status": "skipped",
+                                          "detail": "Skipped after an earlier invocation failed.", "started_ms": None, "duration_ms": 0.0}
+                    continue
+                await asyncio.gather(*(_run_item(index, invocations[index]) for index in group))
+
+        # A disconnected client cancels the running items and skips the rest
+        await _cancel_on_disconnect(request, _run_groups(), bound_logger)
+    except SchedulerOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ClientDisconnected as e:
+        bound_logger.info(f"Tool batch abandoned by the client: {e}")
+        raise HTTPException(status_code=499, detail=str(e))
+    except ValueError as e:
+        bound_logger.error(f"Value error preparing tool batch: {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except NiFiAuthenticationError as e:
+        bound_logger.error(f"NiFi authentication failed for server {nifi_server_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=503, detail=f"Failed to authenticate with NiFi server: {nifi_server_id}")
+    finally:
+        if client_token:
+            current_nifi_client.reset(client_token)
+        if pg_token:
+            current_process_group.reset(pg_token)
+        if nifi_client:
+            await nifi_client.close()
+        await slot_stack.aclose()
+
+    counts: Dict[str, int] = {}
+    for item in results:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    total_ms = round((time.perf_counter() - batch_start) * 1000, 1)
+    bound_logger.info(f"Tool batch finished in {total_ms}ms: {counts}")
+    try:
+        return _json_response({"counts": counts, "duration_ms": total_ms, "results": results}, request)
+    except TypeError as json_err:
+        bound_logger.error(f"Tool batch result is not JSON serializable: {json_err}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Tool batch succeeded but a result is not serializable.")
+
 @app.post("/tools/{tool_name}", tags=["Tools"])
 async def execute_tool(
     tool_name: str,
     payload: ToolExecutionPayload,
     request: Request,
     nifi_server_id: Optional[str] = Header(None, alias="X-Nifi-Server-Id"),
-    pg_id:Optional[str] = Header(None, alias="X-Nifi-Pg-Id")
+    pg_id:Optional[str] = Header(None, alias="X-Nifi-Pg-Id"),
+    fields: Optional[str] = Query(None, description="Comma-separated (dotted) fields to keep in each result record."),
+    encoding: Literal["json", "table"] = Query("json", description="'table' encodes lists of records as columns + rows."),
+    timing: bool = Query(False, description="Add a `_timing` section with the NiFi call breakdown to the result.")
 ) -> Any:
     """Execute a specific MCP tool by name.
 
+    The result can be reduced with `fields` and encoded as tables with `encoding=table`. Responses are
+    compressed (br if available, else gzip) when the client's Accept-Encoding allows it.
+
+    Every NiFi API call made for the request is traced. The response carries a `Server-Timing` header
+    (login, tool, serialize and summed NiFi time); with `timing=true` the result also gets a `_timing`
+    section with the call count, NiFi wait time and slowest calls (a non-dict result is wrapped as
+    `{"result": ..., "_timing": ...}`). Traces are written to `nifi.trace_export_directory` when configured,
+    in a background task, sampled and capped by `nifi.trace_export_sample_rate` / `trace_export_max_files`.
+
+    Executions are queued per NiFi server and per user (`X-User-Id` header) with fair queueing; when the
+    queues are full the call is rejected with 429 and a `Retry-After` header.
+
+    The tool is cancelled, including its in-flight NiFi calls and polling, when the client disconnects or
+    when it runs past its deadline from `nifi.tool_deadlines` (answered with 504).
+
     Requires the `X-Nifi-Server-Id` header to specify which configured NiFi server to target.
     """
     user_request_id = request.state.user_request_id
@@ -425,10 +952,18 @@ async def execute_tool(
     client_token = None # Token for contextvar reset
     logger_token = None # Token for contextvar reset
     pg_token=None
+    trace = RequestTrace(tool_name)
+    trace_token = current_trace.set(trace)
+    slot_stack = AsyncExitStack()
     try:
+        # --- Wait for a scheduler slot on this NiFi server --- #
+        with trace.phase("queue"):
+            await slot_stack.enter_async_context(_tool_slot(nifi_server_id, _scheduling_user(request), tool_name))
+
         # --- Get NiFi Client for this request --- #
         bound_logger.debug(f"Attempting to get NiFi client for server ID: {nifi_server_id}")
-        nifi_client = await get_nifi_client(nifi_server_id, bound_logger=bound_logger)
+        with trace.phase("login"):
+            nifi_client = await get_nifi_client(nifi_server_id, bound_logger=bound_logger)
         bound_logger.debug(f"Successfully obtained authenticated NiFi client for {nifi_server_id}")
         # -------------------------------------- #
         
@@ -444,59 +979,39 @@ async def execute_tool(
         
         # Call the tool using the correct method on the FastMCP instance
         # ContextVars provide client/logger implicitly via the context mechanism within call_tool
-        tool_result_mcp_format = await mcp.call_tool(tool_name, tool_input)
+        with trace.phase("tool"):
+            tool_result_mcp_format = await _cancel_on_disconnect(request, _call_tool(tool_name, tool_input), bound_logger)
                 
-        bound_logger.info(f"Tool '{tool_name}' execution successful.")
+        bound_logger.info(f"Tool '{tool_name}' execution successful ({trace.call_count} NiFi calls).")
         bound_logger.debug(f"Raw MCP Tool result: {tool_result_mcp_format}") 
         
-        # --- Extract serializable result from MCP format --- 
-        final_result_to_serialize = None
-        # Check if the result is a list (potentially multiple TextContent objects)
-        if isinstance(tool_result_mcp_format, list):
-            parsed_list = []
-            for item in tool_result_mcp_format:
-                if hasattr(item, 'type') and item.type == 'text' and hasattr(item, 'text'):
-                    try:
-                        parsed_item = json.loads(item.text)
-                        parsed_list.append(parsed_item)
-                    except json.JSONDecodeError:
-                        # If text isn't JSON, append the raw text
-                        parsed_list.append(item.text)
-                        bound_logger.warning(f"List item TextContent for tool '{tool_name}' was not valid JSON. Appending as plain text.")
-                # Handle other potential list item types if necessary (e.g., ImageContent raw data?)
-                else:
-                    parsed_list.append(item) # Append raw item if not TextContent
-                    bound_logger.warning(f"Unexpected item type {type(item)} in MCP result list for tool '{tool_name}'. Appending raw item.")
-            final_result_to_serialize = parsed_list
-            bound_logger.debug(f"Parsed list from MCP TextContent objects: {final_result_to_serialize}")
-        # Handle case where result is a single object (e.g., single TextContent)
-        elif hasattr(tool_result_mcp_format, 'type') and tool_result_mcp_format.type == 'text' and hasattr(tool_result_mcp_format, 'text'):
-             try:
-                 # Assume the text content is the JSON representation of the actual result
-                 final_result_to_serialize = json.loads(tool_result_mcp_format.text)
-                 bound_logger.debug(f"Extracted and parsed JSON from single TextContent: {final_result_to_serialize}")
-             except json.JSONDecodeError as json_err:
-                 # If it's not JSON, maybe it's just plain text?
-                 final_result_to_serialize = tool_result_mcp_format.text
-                 bound_logger.warning(f"Single TextContent for tool '{tool_name}' was not valid JSON ({json_err}). Returning as plain text.")
-        # Handle other potential single result types (ImageContent, etc.) if needed
-        else:
-            # If the result wasn't a list or known single content type, assign it directly
-            final_result_to_serialize = tool_result_mcp_format
-            bound_logger.debug(f"Tool '{tool_name}' did not return standard MCP list/TextContent format. Using raw result: {final_result_to_serialize}")
-        # -----------------------------------------------------
+        final_result_to_serialize = _extract_tool_result(tool_result_mcp_format, tool_name, bound_logger)
         
-        # Ensure the extracted result is JSON serializable
+        # Shape and serialize once; FastAPI does not re-encode a ready Response
         try:
-            # Attempt to serialize to catch issues early
-            json.dumps(final_result_to_serialize)
-            # Return the extracted and potentially parsed result
-            return final_result_to_serialize 
+            with trace.phase("serialize"):
+                shaped_result = shape_result(final_result_to_serialize, fields, encoding)
+                if timing:
+                    if not isinstance(shaped_result, dict):
+                        shaped_result = {"result": shaped_result}
+                    shaped_result["_timing"] = trace.summary()
+                response = _json_response(shaped_result, request)
+            response.headers["Server-Timing"] = trace.server_timing()
+            return response
         except TypeError as json_err:
             bound_logger.error(f"Final tool '{tool_name}' result is not JSON serializable: {json_err}", exc_info=True)
             bound_logger.error(f"Problematic final result data structure: {final_result_to_serialize}")
             raise HTTPException(status_code=500, detail=f"Tool execution succeeded but result is not serializable.")
 
+    except SchedulerOverloaded as e:
+        bound_logger.warning(f"Rejected tool '{tool_name}': {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ToolDeadlineExceeded as e:
+        bound_logger.warning(str(e))
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected as e:
+        # Nobody receives this response; 499 (client closed request) only shows up in access logs
+        raise HTTPException(status_code=499, detail=str(e))
     except ValueError as e:
         # Catch specific errors like invalid server ID from get_nifi_client
         bound_logger.error(f"Value error during tool execution: {e}", exc_info=True)
@@ -529,12 +1044,272 @@ async def execute_tool(
             bound_logger.trace("Reset request logger context variable.")
         if pg_token:
             current_process_group.reset(pg_token)
+        current_trace.reset(trace_token)
         # ------------------------ #
         # --- Clean up NiFi Client --- #
         if nifi_client:
             bound_logger.debug(f"Closing NiFi client connection for server ID: {nifi_server_id}")
             await nifi_client.close() # Ensure connection is closed after request
         # -------------------------- #
+        await slot_stack.aclose()
+        _schedule_trace_export(trace, bound_logger)
+
+# Trace exports run after the response, in tasks referenced here until they finish
+_trace_export_tasks: Set[asyncio.Task] = set()
+
+def _schedule_trace_export(trace: RequestTrace, bound_logger) -> None:
+    """Exports a sampled share of request traces in the background when trace export is configured."""
+    settings = get_trace_export_settings()
+    if settings is None or random.random() >= settings["sample_rate"]:
+        return
+    task = asyncio.create_task(_export_request_trace(trace, settings, bound_logger))
+    _trace_export_tasks.add(task)
+    task.add_done_callback(_trace_export_tasks.discard)
+
+async def _export_request_trace(trace: RequestTrace, settings: Dict[str, Any], bound_logger) -> None:
+    """Writes the request trace to the trace directory, pruning old traces, without failing the request."""
+    try:
+        path = await asyncio.to_thread(export_trace, trace, settings["directory"], settings["max_files"])
+        bound_logger.debug(f"Exported request trace {trace.trace_id} to {path}")
+    except OSError as e:
+        bound_logger.warning(f"Could not export request trace {trace.trace_id}: {e}")
+
+def _encode_stream_event(event: str, data: Any, stream_format: str) -> bytes:
+    """Encodes one streaming event as an NDJSON line or a Server-Sent Event."""
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+    return (json.dumps({"event": event, "data": data}, default=str) + "\n").encode("utf-8")
+
+STREAM_QUEUE_MAX_EVENTS = 100
+
+@app.post("/tools/{tool_name}/stream", tags=["Tools"])
+async def execute_tool_stream(
+    tool_name: str,
+    payload: ToolExecutionPayload,
+    request: Request,
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", alias="format"),
+    nifi_server_id: Optional[str] = Header(None, alias="X-Nifi-Server-Id"),
+    pg_id: Optional[str] = Header(None, alias="X-Nifi-Pg-Id")
+):
+    """Execute a specific MCP tool and stream its progress as NDJSON (default) or Server-Sent Events.
+
+    Emits `started`, then any `progress` / `partial` events the tool produces while it runs, and finally
+    either `result` (with the duration) or `error` (with the status code execute_tool would have returned).
+    Tools that stream `partial` results end with a summary rather than repeating them in `result`.
+    At most STREAM_QUEUE_MAX_EVENTS events are buffered: a tool emitting `partial` events waits for the
+    client to read, and `progress` events are dropped while the buffer is full. If the client
+    disconnects, the tool is cancelled.
+
+    Requires the `X-Nifi-Server-Id` header to specify which configured NiFi server to target.
+    """
+    user_request_id = request.state.user_request_id
+    action_id = request.state.action_id
+    bound_logger = logger.bind(user_request_id=user_request_id, action_id=action_id, tool_name=tool_name, nifi_server_id=nifi_server_id)
+    bound_logger.info(f"Received request to stream tool: {tool_name}")
+
+    if not get_nifi_servers():
+        bound_logger.error("Cannot execute tool: No NiFi servers are configured in config.yaml.")
+        raise HTTPException(status_code=503, detail="No NiFi servers configured on the server.")
+    if not nifi_server_id:
+        bound_logger.warning("Missing X-Nifi-Server-Id header.")
+        raise HTTPException(status_code=400, detail="Missing required header: X-Nifi-Server-Id")
+    user_id = _scheduling_user(request)
+    _check_scheduler_capacity(nifi_server_id, user_id, tool_name)
+
+    async def event_stream():
+        started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_MAX_EVENTS)
+        dropped_progress = 0
+
+        async def emit(event: str, data: Any) -> None:
+            nonlocal dropped_progress
+            if event == "partial":
+                await queue.put((event, data))
+                return
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                dropped_progress += 1
+
+        nifi_client = None
+        tool_task = None
+        slot_stack = AsyncExitStack()
+        try:
+            yield _encode_stream_event("started", {"tool_name": tool_name}, stream_format)
+            await slot_stack.enter_async_context(_tool_slot(nifi_server_id, user_id, tool_name))
+            nifi_client = await get_nifi_client(nifi_server_id, bound_logger=bound_logger)
+
+            # The tool task copies the context at creation, so the vars are reset right after spawning it
+            tokens = [
+                (current_nifi_client, current_nifi_client.set(nifi_client)),
+                (current_request_logger, current_request_logger.set(bound_logger)),
+                (current_process_group, current_process_group.set(pg_id)),
+                (current_progress_emitter, current_progress_emitter.set(emit)),
+            ]
+            try:
+                tool_task = asyncio.create_task(_call_tool(tool_name, payload.arguments))
+            finally:
+                for var, token in reversed(tokens):
+                    var.reset(token)
+
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, tool_task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                event, data = getter.result()
+                yield _encode_stream_event(event, data, stream_format)
+            while not queue.empty():
+                event, data = queue.get_nowait()
+                yield _encode_stream_event(event, data, stream_format)
+
+            result = _extract_tool_result(tool_task.result(), tool_name, bound_logger)
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            bound_logger.info(f"Streamed tool '{tool_name}' finished in {duration_ms}ms ({dropped_progress} progress events dropped).")
+            yield _encode_stream_event("result", {"result": result, "duration_ms": duration_ms}, stream_format)
+        except Exception as e:
+            status_code, detail = _classify_tool_exception(e)
+            bound_logger.warning(f"Streamed tool '{tool_name}' failed: {e}")
+            yield _encode_stream_event("error", {"status_code": status_code, "detail": detail}, stream_format)
+        finally:
+            if tool_task and not tool_task.done():
+                bound_logger.info(f"Client went away; cancelling tool '{tool_name}'.")
+                tool_task.cancel()
+                # Let the tool run its cleanup (e.g. deleting NiFi listing requests) before the client closes
+                await asyncio.wait({tool_task}, timeout=10)
+            if nifi_client:
+                await nifi_client.close()
+            await slot_stack.aclose()
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(event_stream(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Tool Jobs --- #
+JOB_STORE_MAX_JOBS = 200
+JOB_RESULT_TTL_SECONDS = 900.0
+MAX_JOB_WAIT_SECONDS = 60.0
+tool_jobs = ToolJobStore(max_jobs=JOB_STORE_MAX_JOBS, result_ttl_seconds=JOB_RESULT_TTL_SECONDS)
+
+async def _run_tool_job(job: ToolJob, nifi_server_id: str, pg_id: Optional[str], user_id: str, bound_logger) -> None:
+    """Runs a submitted tool job with its own NiFi client and request context, recording the outcome."""
+    # Runs in its own task, so the context vars set here never leak into other requests
+    nifi_client = None
+    slot_stack = AsyncExitStack()
+    try:
+        await slot_stack.enter_async_context(_tool_slot(nifi_server_id, user_id, job.tool_name))
+        nifi_client = await get_nifi_client(nifi_server_id, bound_logger=bound_logger)
+        current_nifi_client.set(nifi_client)
+        current_request_logger.set(bound_logger)
+        current_process_group.set(pg_id)
+        bound_logger.info(f"Job {job.job_id}: executing tool '{job.tool_name}'")
+        tool_result = await _call_tool(job.tool_name, job.arguments)
+        job.result = _extract_tool_result(tool_result, job.tool_name, bound_logger)
+        bound_logger.info(f"Job {job.job_id}: tool '{job.tool_name}' finished.")
+    except Exception as e:
+        status_code, detail = _classify_tool_exception(e)
+        bound_logger.warning(f"Job {job.job_id}: tool '{job.tool_name}' failed: {e}")
+        job.status = "failed"
+        job.error = {"status_code": status_code, "detail": detail}
+    finally:
+        if nifi_client:
+            await nifi_client.close()
+        await slot_stack.aclose()
+
+@app.post("/jobs/tools/{tool_name}", status_code=202, tags=["Jobs"])
+async def submit_tool_job(
+    tool_name: str,
+    payload: ToolExecutionPayload,
+    request: Request,
+    nifi_server_id: Optional[str] = Header(None, alias="X-Nifi-Server-Id"),
+    pg_id: Optional[str] = Header(None, alias="X-Nifi-Pg-Id"),
+    job_key: Optional[str] = Header(None, alias="X-Job-Key")
+) -> Dict[str, Any]:
+    """Submit a tool execution as a background job and return its job id immediately.
+
+    Poll or long-poll `GET /jobs/{job_id}` for the outcome and `DELETE /jobs/{job_id}` to cancel. Finished
+    results are kept for a limited time. Resubmitting with the same `X-Job-Key` header returns the
+    existing job instead of starting the work again.
+
+    Requires the `X-Nifi-Server-Id` header to specify which configured NiFi server to target.
+    """
+    user_request_id = request.state.user_request_id
+    action_id = request.state.action_id
+    bound_logger = logger.bind(user_request_id=user_request_id, action_id=action_id, tool_name=tool_name, nifi_server_id=nifi_server_id)
+
+    if not get_nifi_servers():
+        bound_logger.error("Cannot execute tool: No NiFi servers are configured in config.yaml.")
+        raise HTTPException(status_code=503, detail="No NiFi servers configured on the server.")
+    if not nifi_server_id:
+        bound_logger.warning("Missing X-Nifi-Server-Id header.")
+        raise HTTPException(status_code=400, detail="Missing required header: X-Nifi-Server-Id")
+    _ensure_tool_loaded(tool_name)
+    if not _is_registered_tool(tool_name):
+        raise HTTPException(status_code=404, detail=f"Unknown tool: {tool_name}")
+
+    if job_key:
+        existing = await tool_jobs.find_by_key_anywhere(job_key)
+        if existing is not None:
+            bound_logger.info(f"Returning existing job {existing['job_id']} for job key '{job_key}'")
+            return existing
+    user_id = _scheduling_user(request)
+    _check_scheduler_capacity(nifi_server_id, user_id, tool_name)
+    try:
+        job = await tool_jobs.submit(
+            tool_name, payload.arguments,
+            lambda job: _run_tool_job(job, nifi_server_id, pg_id, user_id, bound_logger.bind(job_id=job.job_id)),
+            job_key=job_key
+        )
+    except OverflowError as e:
+        bound_logger.warning(f"Rejected job submission: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    bound_logger.info(f"Submitted job {job.job_id} for tool '{tool_name}'")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}", tags=["Jobs"])
+async def get_tool_job(
+    job_id: str,
+    request: Request,
+    wait: float = Query(0.0, ge=0.0, description="Seconds to wait for the job to finish before answering."),
+    fields: Optional[str] = Query(None, description="Comma-separated (dotted) fields to keep in each result record."),
+    encoding: Literal["json", "table"] = Query("json", description="'table' encodes lists of records as columns + rows.")
+) -> Dict[str, Any]:
+    """Return a job's status, with its result or error once finished; optionally long-poll with `wait`.
+
+    Jobs run by another uvicorn worker are answered from the shared cache when it is enabled.
+    """
+    job = tool_jobs.get(job_id)
+    if job is not None:
+        await tool_jobs.wait(job, min(wait, MAX_JOB_WAIT_SECONDS))
+        job_data = job.to_dict()
+    else:
+        job_data = await tool_jobs.get_remote(job_id, min(wait, MAX_JOB_WAIT_SECONDS))
+        if job_data is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired.")
+    if "result" in job_data:
+        job_data["result"] = shape_result(job_data["result"], fields, encoding)
+    try:
+        return _json_response(job_data, request)
+    except TypeError as json_err:
+        logger.error(f"Result of job {job_id} is not JSON serializable: {json_err}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Job succeeded but its result is not serializable.")
+
+@app.delete("/jobs/{job_id}", tags=["Jobs"])
+async def cancel_tool_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a running job. Cancelling a finished job leaves it unchanged.
+
+    A job run by another uvicorn worker is cancelled by that worker within about a second.
+    """
+    job = tool_jobs.get(job_id)
+    if job is None:
+        job_data = await tool_jobs.request_remote_cancel(job_id)
+        if job_data is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired.")
+        logger.info(f"Cancel requested for job {job_id} run by another worker")
+        return job_data
+    await tool_jobs.cancel(job)
+    logger.info(f"Cancel requested for job {job_id}; status is now '{job.status}'")
+    return job.to_dict()
 
 # --- Cleanup Function (REMOVED - Logic moved to lifespan) --- #
 # async def cleanup():
@@ -545,6 +1320,7 @@ async def execute_tool(
 #     logger.info("Cleanup finished.")
 
 # Run with uvicorn if this module is run directly
+# (`--profile-startup` logs import and initialization timings once startup completes)
 if __name__ == "__main__":
     import uvicorn
     # Disable default access logs to potentially reduce noise/interleaving
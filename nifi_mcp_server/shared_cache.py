@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from . import metrics
+
+# --- Shared Cache --- #
+# A cache tier shared by every uvicorn worker on the host, backed by one SQLite file in WAL mode, with
+# a small per-worker LRU in front of it. Each namespace ("token", "processor_types", "root_pg",
+# "flow") has a generation number stored in SQLite; invalidating a namespace bumps it, and workers
+# notice through PRAGMA data_version (a cheap, in-memory check) and drop their now-stale LRU entries.
+# SQLite errors never fail a request: the cache then behaves as a miss. Without a path the cache is
+# memory-only (per worker), which is what start-up warm-up uses when the shared tier is disabled.
+#
+# All SQLite calls run on one dedicated thread, so lock contention between workers never blocks the
+# event loop; local LRU hits are answered without leaving the loop. The database holds NiFi tokens,
+# so its directory and file are created readable by the owner only.
+
+SQLITE_BUSY_TIMEOUT_SECONDS = 0.2
+DATA_VERSION_CHECK_INTERVAL_SECONDS = 0.25
+PURGE_EVERY_WRITES = 200
+
+
+class SharedCache:
+    """Cross-process key/value cache with TTLs and namespace invalidation."""
+
+    def __init__(self, path: Optional[Path], local_max_entries: int = 1024):
+        self.path = Path(path) if path is not None else None
+        self.local_max_entries = local_max_entries
+        # (namespace, key) -> (value, expires_at, generation)
+        self._local: "OrderedDict[Tuple[str, str], Tuple[Any, float, int]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._data_version: Optional[int] = None
+        self._last_version_check = 0.0
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # --- SQLite (runs on the cache thread) --- #
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Create the file (and hence its -wal/-shm companions, which SQLite gives the same mode) as 0600
+            os.close(os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(self.path, 0o600)
+            conn = sqlite3.connect(str(self.path), timeout=SQLITE_BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, value TEXT, expires_at REAL, generation INTEGER, PRIMARY KEY (namespace, key))")
+            conn.execute("CREATE TABLE IF NOT EXISTS generations (namespace TEXT PRIMARY KEY, generation INTEGER)")
+            self._conn = conn
+            logger.info(f"Shared cache opened at {self.path}")
+        return self._conn
+
+    def _db_generations(self, force: bool) -> Optional[Dict[str, int]]:
+        """Returns the namespace generations if another connection has written since the last check, else None."""
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version and not force:
+            return None
+        self._data_version = data_version
+        return dict(conn.execute("SELECT namespace, generation FROM generations").fetchall())
+
+    def _db_get(self, namespace: str, key: str, generation: int, now: float) -> Optional[tuple]:
+        return self._connection().execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND generation = ? AND expires_at > ?",
+            (namespace, key, generation, now)
+        ).fetchone()
+
+    def _db_set(self, namespace: str, key: str, value_json: str, expires_at: float, generation: int, purge: bool) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, generation) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, value_json, expires_at, generation)
+        )
+        if purge:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+
+    def _db_delete(self, namespace: str, key: str) -> None:
+        self._connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _db_invalidate(self, namespace: str) -> Optional[Dict[str, int]]:
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+            "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+            (namespace,)
+        )
+        conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+        return self._db_generations(force=True)
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        """Runs a SQLite call on the cache thread (one thread, so the connection is never shared concurrently)."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-cache")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+    # --- Public API (event loop) --- #
+
+    async def _sync_generations(self) -> None:
+        """Reloads namespace generations at most every DATA_VERSION_CHECK_INTERVAL_SECONDS."""
+        now = time.monotonic()
+        if self.path is None or now - self._last_version_check < DATA_VERSION_CHECK_INTERVAL_SECONDS:
+            return
+        self._last_version_check = now
+        generations = await self._run(self._db_generations, False)
+        if generations is not None:
+            self._generations = generations
+
+    async def get(self, namespace: str, key: str, use_local: bool = True) -> Optional[Any]:
+        """Returns the cached value, checking the local LRU before SQLite, or None on a miss.
+
+        With `use_local=False` the value is always read from SQLite, for entries that other workers
+        overwrite in place (e.g. job status) rather than invalidate.
+        """
+        try:
+            await self._sync_generations()
+            generation = self._generations.get(namespace, 0)
+            now = time.time()
+            local = self._local.get((namespace, key)) if use_local else None
+            if local is not None:
+                value, expires_at, local_generation = local
+                if expires_at > now and local_generation == generation:
+                    self._local.move_to_end((namespace, key))
+                    metrics.record_cache_lookup("shared_cache_local", True)
+                    metrics.record_cache_lookup(namespace, True)
+                    return value
+                self._local.pop((namespace, key), None)
+            if use_local:
+                metrics.record_cache_lookup("shared_cache_local", False)
+            if self.path is None:
+                metrics.record_cache_lookup(namespace, False)
+                return None
+            row = await self._run(self._db_get, namespace, key, generation, now)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache read failed for {namespace}/{key}: {e}")
+            return None
+        metrics.record_cache_lookup(namespace, row is not None)
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        if use_local:
+            self._remember(namespace, key, value, row[1], generation)
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any, ttl_seconds: float) -> None:
+        """Stores a JSON-serializable value in both tiers for `ttl_seconds`."""
+        if ttl_seconds <= 0:
+            return
+        expires_at = time.time() + ttl_seconds
+        try:
+            await self._sync_generations()
+            generation = self._generations.get(namespace, 0)
+            if self.path is not None:
+                self._writes += 1
+                await self._run(self._db_set, namespace, key, json.dumps(value), expires_at, generation, self._writes % PURGE_EVERY_WRITES == 0)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache write failed for {namespace}/{key}: {e}")
+            return
+        self._remember(namespace, key, value, expires_at, generation)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        """Removes one entry. Other workers drop their local copy when their entry expires; use
+        invalidate() when they must stop using it immediately."""
+        self._local.pop((namespace, key), None)
+        if self.path is None:
+            return
+        try:
+            await self._run(self._db_delete, namespace, key)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache delete failed for {namespace}/{key}: {e}")
+
+    async def invalidate(self, namespace: str) -> None:
+        """Invalidates every entry of a namespace in all workers by bumping its generation."""
+        for cache_key in [cache_key for cache_key in self._local if cache_key[0] == namespace]:
+            del self._local[cache_key]
+        if self.path is None:
+            return
+        try:
+            generations = await self._run(self._db_invalidate, namespace)
+            if generations is not None:
+                self._generations = generations
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Shared cache invalidation failed for {namespace}: {e}")
+
+    def _remember(self, namespace: str, key: str, value: Any, expires_at: float, generation: int) -> None:
+        self._local[(namespace, key)] = (value, expires_at, generation)
+        self._local.move_to_end((namespace, key))
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
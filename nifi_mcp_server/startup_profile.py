@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Optional
+
+# --- Startup Profiling --- #
+# Enabled with `python -m nifi_mcp_server.server --profile-startup` or NIFI_MCP_PROFILE_STARTUP=1 (for
+# uvicorn). Times every module imported after this one is (self and cumulative time, like
+# `python -X importtime`) plus named initialization steps, and reports them once startup completes.
+# When disabled, step() only costs a perf_counter call and no import hook is installed.
+
+PROFILE_STARTUP = "--profile-startup" in sys.argv or os.environ.get("NIFI_MCP_PROFILE_STARTUP", "").lower() in ("1", "true", "yes")
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module; all other attributes are delegated."""
+
+    def __init__(self, loader, fullname: str, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._fullname = fullname
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._import_started(self._fullname)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._import_finished(self._fullname)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimer(MetaPathFinder):
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, fullname, self._profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    """Collects import and initialization timings for the startup report."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.steps: List[tuple] = []
+        self.imports: Dict[str, List[float]] = {}  # module -> [cumulative, self]
+        self._stack: List[list] = []  # [module, start, children_seconds]
+        self._finder: Optional[_ImportTimer] = None
+        if enabled:
+            self._finder = _ImportTimer(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def _import_started(self, fullname: str) -> None:
+        self._stack.append([fullname, time.perf_counter(), 0.0])
+
+    def _import_finished(self, fullname: str) -> None:
+        name, start, children = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        self.imports[name] = [elapsed, elapsed - children]
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextmanager
+    def step(self, name: str):
+        """Times a named initialization step (recorded only when profiling is enabled)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.steps.append((name, time.perf_counter() - start))
+
+    def stop(self) -> None:
+        """Removes the import hook; later imports are no longer timed."""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def report(self, top: int = 25) -> str:
+        """Formats steps, the slowest modules and per-package import totals as a text report."""
+        lines = [f"Startup profile: {(time.perf_counter() - self.started) * 1000:.1f} ms since profiling started"]
+        lines.append("Initialization steps:")
+        for name, seconds in self.steps:
+            lines.append(f"  {seconds * 1000:9.1f} ms  {name}")
+        packages: Dict[str, float] = {}
+        for module, (_, self_seconds) in self.imports.items():
+            package = module.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + self_seconds
+        lines.append(f"Import time by top-level package ({len(self.imports)} modules):")
+        for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"  {seconds * 1000:9.1f} ms  {package}")
+        lines.append("Slowest modules (cumulative / self):")
+        for module, (cumulative, self_seconds) in sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]:
+            lines.append(f"  {cumulative * 1000:9.1f} ms  {self_seconds * 1000:9.1f} ms  {module}")
+        return "\n".join(lines)
+
+
+startup_profiler = StartupProfiler(PROFILE_STARTUP)
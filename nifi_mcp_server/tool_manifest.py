@@ -0,0 +1,114 @@
+"""Precomputed manifest of the MCP tools for fast REST bridge startup.
+
+Importing the tool modules registers every tool with FastMCP, which builds a pydantic argument
+model per tool, and formatting the /tools catalog parses every docstring. The manifest records, per
+tool, its module, phases and formatted catalog definition, keyed by a fingerprint of the tool
+sources, the catalog formatter and the installed mcp/pydantic/docstring_parser versions. When it is present and current, the bridge serves /tools from it and imports a tool module
+only when one of its tools is first called (the rest are loaded in the background after startup).
+A missing or stale manifest simply means all tool modules are imported eagerly, as before.
+
+Regenerate it after changing tools (e.g. as a build step of the deployment image):
+    python -m nifi_mcp_server.tool_manifest
+"""
+import ast
+import hashlib
+import importlib
+import importlib.metadata
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+TOOL_MODULES = ["review", "creation", "modification", "operation", "lookup"]
+MANIFEST_PATH = Path(__file__).parent / "tool_manifest.json"
+_API_TOOLS_DIR = Path(__file__).parent / "api_tools"
+_SERVER_PATH = Path(__file__).parent / "server.py"
+# Packages that shape the registered tools (FastMCP's argument schemas) or their catalog definitions
+FINGERPRINT_PACKAGES = ["mcp", "pydantic", "docstring_parser"]
+
+
+def _formatter_source() -> str:
+    """Returns the source of server._format_tool_definition.
+
+    Read from the file rather than with inspect.getsource: the manifest is checked while server.py is
+    still being imported, before the formatter is defined.
+    """
+    source = _SERVER_PATH.read_text()
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.FunctionDef) and node.name == "_format_tool_definition":
+            return ast.get_source_segment(source, node) or ""
+    return ""
+
+
+def _package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return "not installed"
+
+
+def source_fingerprint() -> str:
+    """Hashes what the manifest was built from: the tool module sources (and the shared utils), the
+    catalog formatter's source and the versions of the packages that shape tool definitions."""
+    digest = hashlib.sha256()
+    for name in sorted(TOOL_MODULES + ["utils"]):
+        digest.update(name.encode("utf-8"))
+        digest.update((_API_TOOLS_DIR / f"{name}.py").read_bytes())
+    digest.update(_formatter_source().encode("utf-8"))
+    for package in FINGERPRINT_PACKAGES:
+        digest.update(f"{package}=={_package_version(package)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_manifest() -> Optional[Dict[str, Any]]:
+    """Returns the manifest if it exists and matches the current tool sources, else None."""
+    if not MANIFEST_PATH.exists():
+        return None
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable tool manifest {MANIFEST_PATH}: {e}")
+        return None
+    if manifest.get("fingerprint") != source_fingerprint():
+        logger.warning("Tool manifest is stale (tool sources changed); importing all tool modules. Regenerate it with `python -m nifi_mcp_server.tool_manifest`.")
+        return None
+    return manifest
+
+
+def import_tool_module(module_name: str) -> None:
+    """Imports one tool module, registering its tools (a no-op if already imported)."""
+    importlib.import_module(f"nifi_mcp_server.api_tools.{module_name}")
+
+
+def import_all_tool_modules() -> None:
+    for module_name in TOOL_MODULES:
+        import_tool_module(module_name)
+
+
+def build_manifest() -> Dict[str, Any]:
+    """Imports every tool module and records each tool's module, phases and catalog definition."""
+    from .server import mcp, _format_tool_definition
+    from .api_tools.utils import _tool_phase_registry
+
+    import_all_tool_modules()
+    tools: List[Dict[str, Any]] = []
+    for tool_info in mcp._tool_manager.list_tools():
+        phases = _tool_phase_registry.get(tool_info.name, [])
+        tools.append({
+            "name": tool_info.name,
+            "module": tool_info.fn.__module__.rsplit(".", 1)[-1],
+            "definition": _format_tool_definition(tool_info, phases, logger),
+        })
+    return {"fingerprint": source_fingerprint(), "tools": tools}
+
+
+def main() -> None:
+    manifest = build_manifest()
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=1))
+    print(f"Wrote {len(manifest['tools'])} tools to {MANIFEST_PATH}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# --- Request Tracing --- #
+# A RequestTrace collects one span per NiFi API call made while serving a request (recorded by the
+# NiFiClient response hook) plus named phases of the request itself (login, tool, serialize). It
+# feeds the Server-Timing header, the optional `_timing` result section and trace file export.
+
+MAX_SPANS_PER_TRACE = 2000
+
+# Set by the REST bridge for the duration of a request; the NiFiClient hooks record into it when set
+current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("current_trace", default=None)
+
+
+class RequestTrace:
+    """Spans of NiFi API calls and request phases for one tool execution."""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.calls: List[Dict[str, Any]] = []
+        self.phases: List[Dict[str, Any]] = []
+        self.call_count = 0
+        self.call_seconds = 0.0
+        self.dropped = 0
+
+    def record_call(self, method: str, endpoint: str, status: int, started: float, duration: float, size: int) -> None:
+        """Records one NiFi API call; `started` is a perf_counter timestamp."""
+        self.call_count += 1
+        self.call_seconds += duration
+        if len(self.calls) >= MAX_SPANS_PER_TRACE:
+            self.dropped += 1
+            return
+        self.calls.append({
+            "method": method,
+            "endpoint": endpoint,
+            "status": status,
+            "start_ms": round((started - self.start) * 1000, 1),
+            "duration_ms": round(duration * 1000, 1),
+            "bytes": size,
+        })
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a named phase of the request (e.g. 'login', 'tool', 'serialize')."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                "name": name,
+                "start_ms": round((started - self.start) * 1000, 1),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+    def server_timing(self) -> str:
+        """Formats the phases and the NiFi call total as a Server-Timing header value."""
+        entries = [f"{phase['name']};dur={phase['duration_ms']}" for phase in self.phases]
+        entries.append(f'nifi;dur={round(self.call_seconds * 1000, 1)};desc="{self.call_count} calls"')
+        entries.append(f"total;dur={round((time.perf_counter() - self.start) * 1000, 1)}")
+        return ", ".join(entries)
+
+    def summary(self, slowest: int = 5) -> Dict[str, Any]:
+        """Returns the `_timing` section: call count, summed NiFi wait time, phases and the slowest calls."""
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 1),
+            "nifi_calls": self.call_count,
+            "nifi_wait_ms": round(self.call_seconds * 1000, 1),
+            "nifi_bytes": sum(call["bytes"] for call in self.calls),
+            "phases": self.phases,
+            "slowest_calls": sorted(self.calls, key=lambda call: call["duration_ms"], reverse=True)[:slowest],
+        }
+
+    def to_trace_events(self) -> Dict[str, Any]:
+        """Exports the trace in the Chrome Trace Event format (viewable in Perfetto or chrome://tracing)."""
+        base_us = self.wall_start * 1_000_000
+        events = [{
+            "name": self.name, "cat": "request", "ph": "X", "pid": os.getpid(), "tid": 0,
+            "ts": base_us, "dur": (time.perf_counter() - self.start) * 1_000_000,
+            "args": {"trace_id": self.trace_id, "nifi_calls": self.call_count, "dropped_spans": self.dropped},
+        }]
+        for phase in self.phases:
+            events.append({
+                "name": phase["name"], "cat": "phase", "ph": "X", "pid": os.getpid(), "tid": 0,
+                "ts": base_us + phase["start_ms"] * 1000, "dur": phase["duration_ms"] * 1000,
+            })
+        for call in self.calls:
+            events.append({
+                "name": f"{call['method']} {call['endpoint']}", "cat": "nifi", "ph": "X", "pid": os.getpid(), "tid": 1,
+                "ts": base_us + call["start_ms"] * 1000, "dur": call["duration_ms"] * 1000,
+                "args": {"status": call["status"], "bytes": call["bytes"]},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_trace(trace: RequestTrace, directory: Path, max_files: Optional[int] = None) -> Path:
+    """Writes a trace as a Chrome Trace Event JSON file into `directory` and returns its path.
+
+    With `max_files`, the oldest trace files beyond that number are deleted afterwards.
+    """
+    timestamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(trace.wall_start))
+    path = directory / f"{timestamp}-{trace.name}-{trace.trace_id[:12]}.json"
+    directory.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(trace.to_trace_events()))
+    if max_files is not None:
+        prune_traces(directory, max_files)
+    return path
+
+
+def prune_traces(directory: Path, max_files: int) -> int:
+    """Deletes the oldest trace files (by their timestamp prefix) beyond `max_files`; returns how many went."""
+    files = sorted(directory.glob("*.json"))
+    removed = 0
+    for path in files[:max(0, len(files) - max_files)]:
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass # Another worker pruned it first
+    return removed
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+# --- Start-up Warm-up --- #
+# Optionally, right after startup, every configured NiFi server is warmed concurrently: log in (the
+# token lands in the shared cache), resolve the root process group id, load the processor type
+# catalog and crawl the process group tree into the "flow" parent cache. Each server has its own
+# timeout, so one slow or unreachable NiFi cannot hold back the others. Warm-up runs in the
+# background; the bridge serves requests meanwhile and reports progress through /health/warm.
+
+WARMUP_STATES = ("pending", "warming", "warm", "failed", "timeout")
+
+
+class Warmup:
+    """Concurrent warm-up of the configured NiFi servers with per-server state for health checks."""
+
+    def __init__(self, server_ids: List[str], timeout_seconds: float = 30.0, max_process_groups: int = 500, crawl_concurrency: int = 8):
+        self.timeout_seconds = timeout_seconds
+        self.max_process_groups = max_process_groups
+        self.crawl_concurrency = crawl_concurrency
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.servers: Dict[str, Dict[str, Any]] = {
+            server_id: {"state": "pending", "steps_ms": {}, "error": None} for server_id in server_ids
+        }
+
+    @property
+    def done(self) -> bool:
+        return self.finished is not None
+
+    @property
+    def all_warm(self) -> bool:
+        return all(status["state"] == "warm" for status in self.servers.values())
+
+    @property
+    def overall(self) -> str:
+        """'warming' until finished, then 'warm' (every server), 'partial' (some) or 'cold' (none)."""
+        if not self.done:
+            return "warming"
+        if self.all_warm:
+            return "warm"
+        return "partial" if any(status["state"] == "warm" for status in self.servers.values()) else "cold"
+
+    async def run(self, get_client: Callable[..., Awaitable[Any]]) -> None:
+        """Warms every server concurrently; `get_client(server_id, bound_logger)` returns an authenticated NiFiClient."""
+        self.started = time.perf_counter()
+        try:
+            await asyncio.gather(*(self._warm_server(server_id, get_client) for server_id in self.servers))
+        finally:
+            self.finished = time.perf_counter()
+        states = [status["state"] for status in self.servers.values()]
+        logger.info(f"Warm-up finished in {self.finished - self.started:.2f}s: {states.count('warm')}/{len(states)} NiFi servers warm")
+
+    async def _warm_server(self, server_id: str, get_client: Callable[..., Awaitable[Any]]) -> None:
+        status = self.servers[server_id]
+        status["state"] = "warming"
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._run_steps(server_id, get_client, status), timeout=self.timeout_seconds)
+            status["state"] = "warm"
+        except asyncio.TimeoutError:
+            status["state"] = "timeout"
+            status["error"] = f"Warm-up did not finish within {self.timeout_seconds}s"
+            logger.warning(f"Warm-up of NiFi server '{server_id}' timed out after {self.timeout_seconds}s")
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+            logger.warning(f"Warm-up of NiFi server '{server_id}' failed: {e}")
+        status["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _run_steps(self, server_id: str, get_client: Callable[..., Awaitable[Any]], status: Dict[str, Any]) -> None:
+        async def timed(name: str, awaitable: Awaitable[Any]) -> Any:
+            step_started = time.perf_counter()
+            result = await awaitable
+            status["steps_ms"][name] = round((time.perf_counter() - step_started) * 1000, 1)
+            return result
+
+        bound_logger = logger.bind(user_request_id="warmup", action_id=server_id)
+        nifi_client = await timed("login", get_client(server_id, bound_logger))
+        try:
+            async def root_and_hierarchy() -> None:
+                root_id = await timed("root_process_group", nifi_client.get_root_process_group_id())
+                status["process_groups"] = await timed(
+                    "process_group_hierarchy",
+                    nifi_client.crawl_process_group_hierarchy(root_id, self.max_process_groups, self.crawl_concurrency)
+                )
+
+            async def processor_types() -> None:
+                status["processor_types"] = len(await timed("processor_types", nifi_client.get_processor_types()))
+
+            await asyncio.gather(root_and_hierarchy(), processor_types())
+        finally:
+            await nifi_client.close()
+
+    def status(self) -> Dict[str, Any]:
+        """Returns overall and per-server warm-up progress."""
+        return {
+            "done": self.done,
+            "all_warm": self.all_warm,
+            "status": self.overall,
+            "elapsed_ms": round(((self.finished or time.perf_counter()) - self.started) * 1000, 1) if self.started else None,
+            "servers": self.servers,
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from loguru import logger
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+
+try:
+    from mcp.client.streamable_http import streamablehttp_client
+except ImportError:  # mcp<1.8
+    streamablehttp_client = None
+
+# --- Configuration ---
+# Compares the latency of the same tool call through the REST bridge (server.py) and through the
+# native MCP stdio, SSE and streamable HTTP transports (native_server.py). Every path logs in to
+# NiFi per call, so the difference is the transport and result re-encoding overhead.
+BASE_URL = os.environ.get("MCP_SERVER_URL", "http://localhost:8000")
+TARGET_NIFI_SERVER_ID = os.environ.get("NIFI_TEST_SERVER_ID")
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", "20"))
+TOOL_NAME = os.environ.get("BENCH_TOOL", "list_nifi_objects")
+TOOL_ARGUMENTS = json.loads(os.environ.get("BENCH_ARGUMENTS", '{"object_type": "processors"}'))
+# Session process group (X-Nifi-Pg-Id / --process-group-id) that scopes the tools on every path
+PROCESS_GROUP_ID = os.environ.get("BENCH_PROCESS_GROUP_ID")
+SSE_PORT = int(os.environ.get("BENCH_SSE_PORT", "8011"))
+STREAMABLE_HTTP_PORT = int(os.environ.get("BENCH_HTTP_PORT", "8012"))
+SERVER_START_TIMEOUT_SECONDS = 30.0
+
+logger.remove()
+logger.add(sys.stderr, level="INFO")
+
+
+def _summarize(label: str, samples: list) -> dict:
+    ordered = sorted(samples)
+    summary = {
+        "path": label,
+        "calls": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 1),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+    }
+    logger.info(f"{label}: {summary}")
+    return summary
+
+
+async def bench_rest() -> list:
+    """Times tool calls through POST /tools/{tool_name}."""
+    headers = {"X-Nifi-Server-Id": TARGET_NIFI_SERVER_ID, "Content-Type": "application/json"}
+    if PROCESS_GROUP_ID:
+        headers["X-Nifi-Pg-Id"] = PROCESS_GROUP_ID
+    samples = []
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for _ in range(ITERATIONS):
+            start = time.perf_counter()
+            response = await client.post(f"{BASE_URL}/tools/{TOOL_NAME}", json={"arguments": TOOL_ARGUMENTS}, headers=headers)
+            response.raise_for_status()
+            response.json()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _time_session_calls(session: ClientSession) -> list:
+    await session.initialize()
+    samples = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        result = await session.call_tool(TOOL_NAME, TOOL_ARGUMENTS)
+        if result.isError:
+            raise RuntimeError(f"Tool call failed: {result.content}")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _native_server_args(transport: str) -> list:
+    args = ["-m", "nifi_mcp_server.native_server", "--transport", transport, "--nifi-server-id", TARGET_NIFI_SERVER_ID]
+    if PROCESS_GROUP_ID:
+        args += ["--process-group-id", PROCESS_GROUP_ID]
+    return args
+
+
+@asynccontextmanager
+async def _native_http_server(transport: str, port: int):
+    """Starts native_server.py on a local port and stops it afterwards."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, *_native_server_args(transport), "--port", str(port),
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_SECONDS
+        while True:
+            if process.returncode is not None:
+                raise RuntimeError(f"native_server --transport {transport} exited with code {process.returncode}")
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.close()
+                await writer.wait_closed()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"native_server --transport {transport} did not listen on port {port}")
+                await asyncio.sleep(0.2)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        if process.returncode is None:
+            process.terminate()
+            await process.wait()
+
+
+async def bench_native_stdio() -> list:
+    """Times tool calls through an MCP ClientSession connected to native_server over stdio."""
+    params = StdioServerParameters(command=sys.executable, args=_native_server_args("stdio"))
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            return await _time_session_calls(session)
+
+
+async def bench_native_sse() -> list:
+    """Times tool calls through an MCP ClientSession connected to native_server over SSE."""
+    async with _native_http_server("sse", SSE_PORT) as base_url:
+        async with sse_client(f"{base_url}/sse") as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                return await _time_session_calls(session)
+
+
+async def bench_native_streamable_http() -> list:
+    """Times tool calls through an MCP ClientSession connected to native_server over streamable HTTP."""
+    async with _native_http_server("streamable-http", STREAMABLE_HTTP_PORT) as base_url:
+        async with streamablehttp_client(f"{base_url}/mcp") as (read_stream, write_stream, _):
+            async with ClientSession(read_stream, write_stream) as session:
+                return await _time_session_calls(session)
+
+
+async def main():
+    if not TARGET_NIFI_SERVER_ID:
+        logger.error("FATAL: NIFI_TEST_SERVER_ID environment variable is not set.")
+        sys.exit(1)
+    logger.info(f"Benchmarking '{TOOL_NAME}' x{ITERATIONS} with arguments {TOOL_ARGUMENTS}")
+    rest = _summarize("rest_bridge", await bench_rest())
+    results = [
+        _summarize("native_stdio", await bench_native_stdio()),
+        _summarize("native_sse", await bench_native_sse()),
+    ]
+    if streamablehttp_client is None:
+        logger.warning("Skipping native_streamable_http: the installed mcp package lacks it (requires mcp>=1.8).")
+    else:
+        results.append(_summarize("native_streamable_http", await bench_native_streamable_http()))
+    for native in results:
+        logger.info(f"{native['path']}/REST mean latency ratio: {native['mean_ms'] / rest['mean_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
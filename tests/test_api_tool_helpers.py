@@ -0,0 +1,153 @@
+import pytest
+from mcp.server.fastmcp.exceptions import ToolError
+
+from nifi_mcp_server.api_tools.creation import _parameterize_properties
+from nifi_mcp_server.api_tools.modification import _plan_process_group_spec
+from nifi_mcp_server.api_tools.operation import _fill_load_placeholders, _percentile
+
+
+def _processor(processor_id, name, state="STOPPED", properties=None, descriptors=None, auto_terminated=None):
+    return {
+        "id": processor_id,
+        "revision": {"version": 1},
+        "component": {
+            "id": processor_id,
+            "name": name,
+            "type": f"org.apache.nifi.processors.standard.{name}",
+            "state": state,
+            "config": {
+                "properties": properties or {},
+                "descriptors": descriptors or {},
+                "autoTerminatedRelationships": auto_terminated or [],
+            },
+        },
+    }
+
+
+def _connection(connection_id, source_id, destination_id, relationships):
+    return {
+        "id": connection_id,
+        "revision": {"version": 1},
+        "component": {
+            "source": {"id": source_id},
+            "destination": {"id": destination_id},
+            "selectedRelationships": relationships,
+        },
+    }
+
+
+FLOW = {
+    "processors": [
+        _processor("gen", "GenerateFlowFile", state="RUNNING", properties={"File Size": "1KB"}),
+        _processor("log", "LogAttribute", auto_terminated=["success"]),
+    ],
+    "connections": [_connection("c1", "gen", "log", ["success"])],
+}
+
+SPEC = {
+    "processors": [
+        {"name": "GenerateFlowFile", "properties": {"File Size": "1KB"}, "state": "RUNNING"},
+        {"name": "LogAttribute", "auto_terminated_relationships": ["success"]},
+    ],
+    "connections": [{"source": "GenerateFlowFile", "target": "LogAttribute", "relationships": ["success"]}],
+}
+
+
+def _operations(plan):
+    return {key: plan[key] for key in ("stop", "delete_connections", "delete_processors", "create_processors",
+                                       "update_processors", "create_connections", "update_connections", "states")}
+
+
+def test_unchanged_spec_plans_nothing():
+    assert _operations(_plan_process_group_spec(FLOW, SPEC, prune=True)) == {
+        "stop": set(), "delete_connections": [], "delete_processors": [], "create_processors": [],
+        "update_processors": [], "create_connections": [], "update_connections": [], "states": {},
+    }
+
+
+def test_changed_property_of_running_processor_stops_and_restarts_it():
+    spec = {"processors": [{"name": "GenerateFlowFile", "properties": {"File Size": "2KB"}}]}
+    plan = _plan_process_group_spec(FLOW, spec, prune=False)
+    assert [(op["name"], op["properties"]) for op in plan["update_processors"]] == [("GenerateFlowFile", {"File Size": "2KB"})]
+    assert plan["stop"] == {"GenerateFlowFile"}
+    assert plan["states"] == {"GenerateFlowFile": "RUNNING"}
+
+
+def test_new_processor_and_connection_are_created():
+    spec = {
+        "processors": [{"name": "PutFile", "type": "org.apache.nifi.processors.standard.PutFile", "state": "RUNNING"}],
+        "connections": [{"source": "LogAttribute", "target": "PutFile", "relationships": ["success"]}],
+    }
+    plan = _plan_process_group_spec(FLOW, spec, prune=False)
+    assert [op["name"] for op in plan["create_processors"]] == ["PutFile"]
+    assert plan["create_connections"] == [{"key": ("LogAttribute", "PutFile"), "relationships": ["success"]}]
+    assert plan["states"] == {"PutFile": "RUNNING"}
+
+
+def test_prune_deletes_unlisted_processors_and_their_connections():
+    spec = {"processors": [{"name": "LogAttribute"}]}
+    plan = _plan_process_group_spec(FLOW, spec, prune=True)
+    assert [op["entity"]["id"] for op in plan["delete_connections"]] == ["c1"]
+    assert [op["name"] for op in plan["delete_processors"]] == ["GenerateFlowFile"]
+    assert "GenerateFlowFile" not in plan["states"]
+
+
+def test_prune_keeps_processors_connected_to_ports():
+    flow = {"processors": FLOW["processors"], "connections": FLOW["connections"] + [_connection("c2", "gen", "output-port", ["success"])]}
+    plan = _plan_process_group_spec(flow, {"processors": [{"name": "LogAttribute"}]}, prune=True)
+    assert plan["delete_processors"] == []
+    assert [row[1] for row in plan["skipped"]] == ["GenerateFlowFile"]
+
+
+def test_masked_sensitive_properties_are_only_written_when_forced():
+    flow = {"processors": [_processor("db", "PutDatabaseRecord", properties={"Password": "********", "Table": "t1"},
+                                      descriptors={"Password": {"sensitive": True}})]}
+    spec = {"processors": [{"name": "PutDatabaseRecord", "properties": {"Password": "secret", "Table": "t1"}}]}
+    plan = _plan_process_group_spec(flow, spec, prune=False)
+    assert plan["update_processors"] == []
+    assert plan["sensitive_skipped"] == {"PutDatabaseRecord": ["Password"]}
+    forced = _plan_process_group_spec(flow, spec, prune=False, update_sensitive=True)
+    assert forced["update_processors"][0]["properties"] == {"Password": "secret"}
+
+
+def test_prune_rejects_spec_connections_to_unlisted_processors():
+    spec = {"processors": [{"name": "LogAttribute"}],
+            "connections": [{"source": "GenerateFlowFile", "target": "LogAttribute", "relationships": ["success"]}]}
+    with pytest.raises(ToolError, match="GenerateFlowFile"):
+        _plan_process_group_spec(FLOW, spec, prune=True)
+    # Without pruning the live processor is simply left alone
+    assert _plan_process_group_spec(FLOW, spec, prune=False)["delete_processors"] == []
+
+
+def test_invalid_specs_are_rejected():
+    with pytest.raises(ToolError):
+        _plan_process_group_spec(FLOW, {"processors": [{"name": "A"}, {"name": "A"}]}, prune=False)
+    with pytest.raises(ToolError):
+        _plan_process_group_spec(FLOW, {"processors": [{"name": "New"}]}, prune=False)
+    with pytest.raises(ToolError):
+        _plan_process_group_spec(FLOW, {"connections": [{"source": "GenerateFlowFile", "target": "Nope", "relationships": ["success"]}]}, prune=False)
+
+
+@pytest.mark.parametrize("pct, expected", [(0, 1.0), (50, 5.0), (95, 10.0), (99, 10.0), (100, 10.0)])
+def test_percentile_uses_the_nearest_rank(pct, expected):
+    assert _percentile([float(v) for v in range(1, 11)], pct) == expected
+
+
+def test_percentile_of_nothing_is_none():
+    assert _percentile([], 50) is None
+    assert _percentile([3.0], 99) == 3.0
+
+
+def test_load_placeholders_leave_other_dollar_signs_alone():
+    filled = _fill_load_placeholders('{"id": "${request_index}", "price": "$$5", "expr": "${other}"}', 7)
+    assert filled == '{"id": "7", "price": "$$5", "expr": "${other}"}'
+
+
+def test_parameterize_replaces_only_whole_property_values():
+    definition = {"processors": [{"component": {"config": {"properties": {
+        "Port": "80", "Other Port": "8080", "URL": "http://host:80/path", "Expression": "${size:gt(80)}", "Unset": None,
+    }}}}]}
+    properties = _parameterize_properties(definition, {"port": "80"})["processors"][0]["component"]["config"]["properties"]
+    assert properties == {
+        "Port": "{{port}}", "Other Port": "8080", "URL": "http://host:80/path", "Expression": "${size:gt(80)}", "Unset": None,
+    }
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from nifi_mcp_server.jobs import ToolJobStore
+from nifi_mcp_server.shared_cache import SharedCache
+
+
+async def _succeed(job):
+    job.result = {"echo": job.arguments}
+
+
+def test_job_result_and_idempotency_key():
+    async def scenario():
+        store = ToolJobStore()
+        job = await store.submit("list_nifi_objects", {"object_type": "processors"}, _succeed, job_key="call-1")
+        await store.wait(job, 1)
+        return store, job
+
+    store, job = asyncio.run(scenario())
+    assert job.to_dict()["status"] == "succeeded"
+    assert job.to_dict()["result"] == {"echo": {"object_type": "processors"}}
+    assert store.get(job.job_id) is job
+    assert store.find_by_key("call-1") is job
+    assert store.find_by_key("call-2") is None
+
+
+def test_finished_jobs_expire_with_their_key():
+    async def scenario():
+        store = ToolJobStore(result_ttl_seconds=60)
+        job = await store.submit("list_nifi_objects", {}, _succeed, job_key="call-1")
+        await store.wait(job, 1)
+        job.finished_at = time.time() - 61
+        return store, job
+
+    store, job = asyncio.run(scenario())
+    assert store.get(job.job_id) is None
+    assert store.find_by_key("call-1") is None
+
+
+def test_full_store_purges_finished_jobs_but_never_running_ones():
+    async def scenario():
+        store = ToolJobStore(max_jobs=2)
+        finished = await store.submit("a", {}, _succeed)
+        await store.wait(finished, 1)
+        release = asyncio.Event()
+
+        async def block(job):
+            await release.wait()
+
+        running = await store.submit("b", {}, block)
+        # The finished job makes room for the new one
+        newest = await store.submit("c", {}, block)
+        with pytest.raises(OverflowError):
+            await store.submit("d", {}, block)
+        purged = store.get(finished.job_id)
+        release.set()
+        await asyncio.gather(running.task, newest.task)
+        return purged
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_cancelled_and_failed_jobs_report_errors():
+    async def scenario():
+        store = ToolJobStore()
+
+        async def never(job):
+            await asyncio.Event().wait()
+
+        async def boom(job):
+            raise RuntimeError("boom")
+
+        slow = await store.submit("slow", {}, never)
+        broken = await store.submit("broken", {}, boom)
+        await store.wait(broken, 1)
+        await store.cancel(slow)
+        return slow.to_dict(), broken.to_dict()
+
+    cancelled, failed = asyncio.run(scenario())
+    assert cancelled["status"] == "cancelled" and cancelled["error"]["status_code"] == 499
+    assert failed["status"] == "failed" and failed["error"]["status_code"] == 500
+
+
+def test_jobs_are_visible_to_another_worker_through_the_shared_cache(tmp_path):
+    async def scenario():
+        owner = ToolJobStore(shared_cache=SharedCache(tmp_path / "cache.sqlite3"))
+        other = ToolJobStore()
+        other.attach_shared_cache(SharedCache(tmp_path / "cache.sqlite3"))
+        release = asyncio.Event()
+
+        async def block(job):
+            await release.wait()
+            job.result = 42
+
+        job = await owner.submit("slow", {}, block, job_key="call-1")
+        running = await other.get_remote(job.job_id)
+        by_key = await other.find_by_key_anywhere("call-1")
+        release.set()
+        finished = await other.get_remote(job.job_id, wait=2)
+        owner.shared_cache.close()
+        other.shared_cache.close()
+        return running, by_key, finished
+
+    running, by_key, finished = asyncio.run(scenario())
+    assert running["status"] == "running"
+    assert by_key["job_id"] == running["job_id"]
+    assert finished["status"] == "succeeded" and finished["result"] == 42
+
+
+def test_memory_only_cache_keeps_jobs_local():
+    store = ToolJobStore()
+    store.attach_shared_cache(SharedCache(None))
+    assert store.shared_cache is None
@@ -0,0 +1,162 @@
+import asyncio
+import functools
+
+import httpx
+
+from nifi_mcp_server import nifi_client
+from nifi_mcp_server.nifi_client import ComponentLockManager, NiFiClient, _extract_revisions
+
+
+def test_extract_revisions_collects_nested_entities():
+    body = {
+        "processGroupFlow": {
+            "id": "pg-1",
+            "flow": {
+                "processors": [
+                    {"id": "proc-1", "revision": {"version": 3, "clientId": "c"}, "component": {"id": "proc-1"}},
+                    {"id": "proc-2", "revision": {"version": 0}},
+                ],
+                "connections": [{"id": "conn-1", "revision": {"version": 7}}],
+            },
+        }
+    }
+    found = {}
+    _extract_revisions(body, found)
+    assert found == {
+        "proc-1": {"version": 3, "clientId": "c"},
+        "proc-2": {"version": 0},
+        "conn-1": {"version": 7},
+    }
+
+
+def test_extract_revisions_ignores_malformed_and_too_deep_entities():
+    found = {}
+    _extract_revisions([{"id": "a", "revision": {"clientId": "c"}}, {"id": 5, "revision": {"version": 1}}], found)
+    assert found == {}
+
+    deep = {"id": "deep", "revision": {"version": 1}}
+    for _ in range(10):
+        deep = {"child": deep}
+    _extract_revisions(deep, found)
+    assert found == {}
+
+
+def _client_with_routes(monkeypatch, base_url, routes):
+    """Returns an authenticated NiFiClient whose requests are answered from {(method, path): (status, body)}."""
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path))
+        status, body = routes.get((request.method, request.url.path), (404, {}))
+        return httpx.Response(status, json=body)
+
+    monkeypatch.setattr(nifi_client.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)))
+    client = NiFiClient(base_url)
+    client._token = "token"
+    return client, seen
+
+
+def test_listings_feed_the_revision_cache_from_their_parsed_entities(monkeypatch):
+    processors = {"processors": [{"id": "proc-1", "revision": {"version": 4}, "component": {"id": "proc-1"}}]}
+    client, _ = _client_with_routes(monkeypatch, "http://listing/nifi-api", {
+        ("GET", "/nifi-api/process-groups/pg-1/processors"): (200, processors),
+    })
+
+    async def scenario():
+        found = await client.list_processors("pg-1")
+        await client.close()
+        return found
+
+    assert [p["id"] for p in asyncio.run(scenario())] == ["proc-1"]
+    assert client.get_cached_revision("proc-1") == {"version": 4}
+
+
+def test_deleting_a_missing_component_without_a_version_returns_false(monkeypatch):
+    client, seen = _client_with_routes(monkeypatch, "http://missing/nifi-api", {})
+
+    async def scenario():
+        deleted = await client.delete_processor("gone")
+        await client.close()
+        return deleted
+
+    assert asyncio.run(scenario()) is False
+    assert seen == [("GET", "/nifi-api/processors/gone")]
+
+
+def test_component_lock_serializes_writes_to_one_component():
+    async def scenario():
+        locks = ComponentLockManager()
+        events = []
+
+        async def write(component_id, label):
+            async with locks.hold(component_id):
+                events.append(f"{label}-start")
+                await asyncio.sleep(0.01)
+                events.append(f"{label}-end")
+
+        await asyncio.gather(write("proc-1", "a"), write("proc-1", "b"))
+        return locks, events
+
+    locks, events = asyncio.run(scenario())
+    assert events == ["a-start", "a-end", "b-start", "b-end"]
+    stats = locks.stats()
+    assert (stats["acquisitions"], stats["contended"], stats["waiting"]) == (2, 1, 0)
+    # Locks are dropped once nobody holds or waits for them
+    assert stats["locked_components"] == 0
+
+
+def test_component_locks_do_not_block_other_components():
+    async def scenario():
+        locks = ComponentLockManager()
+        events = []
+
+        async def write(component_id):
+            async with locks.hold(component_id):
+                events.append(f"{component_id}-start")
+                await asyncio.sleep(0.01)
+                events.append(f"{component_id}-end")
+
+        await asyncio.gather(write("proc-1"), write("proc-2"))
+        return locks, events
+
+    locks, events = asyncio.run(scenario())
+    assert events[:2] == ["proc-1-start", "proc-2-start"]
+    assert locks.stats()["contended"] == 0
+
+
+def test_cancelled_waiter_releases_its_lock_entry():
+    async def scenario():
+        locks = ComponentLockManager()
+        release = asyncio.Event()
+
+        async def hold():
+            async with locks.hold("proc-1"):
+                await release.wait()
+
+        async def wait_for_lock():
+            async with locks.hold("proc-1"):
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait_for_lock())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+        return locks.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["acquisitions"], stats["waiting"], stats["locked_components"]) == (1, 0, 0)
+
+
+def test_connection_pair_locks_are_not_counted_as_component_writes():
+    client = NiFiClient("http://pairs/nifi-api")
+
+    async def scenario():
+        async with client.hold_connection_pair("pg-1", "a", "b"):
+            pass
+
+    asyncio.run(scenario())
+    assert nifi_client.get_component_lock_stats()["http://pairs/nifi-api"]["acquisitions"] == 0
@@ -0,0 +1,48 @@
+import gzip
+import json
+
+from nifi_mcp_server import result_encoding
+from nifi_mcp_server.result_encoding import encode_json_body, project_fields, shape_result, to_table
+
+
+def test_to_table_encodes_single_records_and_unions_columns():
+    assert to_table([{"id": "a", "name": "A"}]) == {"columns": ["id", "name"], "rows": [["a", "A"]]}
+    assert to_table([{"id": "a"}, {"id": "b", "state": "RUNNING"}]) == {
+        "columns": ["id", "state"],
+        "rows": [["a", None], ["b", "RUNNING"]],
+    }
+
+
+def test_to_table_leaves_other_values_and_encodes_nested_lists():
+    assert to_table([]) == []
+    assert to_table([1, {"id": "a"}]) == [1, {"id": "a"}]
+    nested = {"status": "success", "results": [{"group": "g", "objects": [{"id": "p"}]}]}
+    assert to_table(nested) == {
+        "status": "success",
+        "results": {"columns": ["group", "objects"], "rows": [["g", {"columns": ["id"], "rows": [["p"]]}]]},
+    }
+
+
+def test_project_fields_keeps_requested_paths_inside_envelopes():
+    result = {
+        "status": "success",
+        "results": [{"id": "a", "component": {"name": "A", "state": "RUNNING"}, "revision": {"version": 3}}],
+    }
+    assert project_fields(result, ["id", "component.state"]) == {
+        "status": "success",
+        "results": [{"id": "a", "component": {"state": "RUNNING"}}],
+    }
+    assert shape_result(result, "id", "table") == {"status": "success", "results": {"columns": ["id"], "rows": [["a"]]}}
+
+
+def test_encode_json_body_compresses_only_accepted_encodings(monkeypatch):
+    monkeypatch.setattr(result_encoding, "brotli", None)
+    data = [{"id": str(i), "name": "processor"} for i in range(200)]
+
+    body, encoding = encode_json_body(data, "gzip, deflate")
+    assert encoding == "gzip" and json.loads(gzip.decompress(body)) == data
+    assert encode_json_body(data, "gzip;q=0, deflate")[1] is None
+    assert encode_json_body(data, "*")[1] == "gzip"
+    assert encode_json_body(data, "*, gzip;q=0")[1] is None
+    assert encode_json_body(data, None)[1] is None
+    assert encode_json_body({"small": True}, "gzip") == (b'{"small":true}', None)
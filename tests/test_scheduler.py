@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from nifi_mcp_server.scheduler import FairScheduler, SchedulerOverloaded
+
+
+async def _settle():
+    """Lets every ready task run until it blocks."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_light_user_overtakes_another_users_backlog():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("nifi", "alice", "list_nifi_objects"):
+                await release.wait()
+
+        async def run(user_id, label):
+            async with scheduler.slot("nifi", user_id, "list_nifi_objects"):
+                order.append(label)
+
+        holder = asyncio.create_task(hold())
+        await _settle()
+        waiters = []
+        for user_id, label in (("alice", "alice-1"), ("alice", "alice-2"), ("bob", "bob-1")):
+            waiters.append(asyncio.create_task(run(user_id, label)))
+            await _settle()
+        assert scheduler.stats()["nifi"]["queued"] == 3
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["bob-1", "alice-1", "alice-2"]
+
+
+def test_heavy_cap_lets_light_tools_pass_queued_heavy_ones():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=4, max_heavy=1, heavy_tools=["teardown_process_group"])
+        release_heavy = asyncio.Event()
+        light_ran = asyncio.Event()
+
+        async def heavy():
+            async with scheduler.slot("nifi", "alice", "teardown_process_group"):
+                await release_heavy.wait()
+
+        async def light():
+            async with scheduler.slot("nifi", "bob", "list_nifi_objects"):
+                light_ran.set()
+
+        first = asyncio.create_task(heavy())
+        await _settle()
+        second = asyncio.create_task(heavy())
+        await _settle()
+        assert scheduler.stats()["nifi"] == {
+            "running": 1, "heavy_running": 1, "queued": 1, "queued_users": 1, "avg_service_seconds": 1.0
+        }
+        await asyncio.wait_for(asyncio.create_task(light()), 1)
+        assert light_ran.is_set()
+        assert scheduler.stats()["nifi"]["queued"] == 1
+        release_heavy.set()
+        await asyncio.gather(first, second)
+        return scheduler.stats()["nifi"]
+
+    stats = asyncio.run(scenario())
+    assert (stats["running"], stats["heavy_running"], stats["queued"]) == (0, 0, 0)
+
+
+def test_cancel_while_queued_frees_the_queue_entry():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("nifi", "alice", "list_nifi_objects"):
+                await release.wait()
+
+        async def queued():
+            async with scheduler.slot("nifi", "bob", "list_nifi_objects"):
+                pytest.fail("A cancelled execution must never get a slot")
+
+        holder = asyncio.create_task(hold())
+        await _settle()
+        waiter = asyncio.create_task(queued())
+        await _settle()
+        assert scheduler.stats()["nifi"]["queued"] == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.stats()["nifi"]["queued"] == 0
+        release.set()
+        await holder
+        async with scheduler.slot("nifi", "carol", "list_nifi_objects") as waited:
+            assert waited < 0.5
+        return scheduler.stats()["nifi"]
+
+    stats = asyncio.run(scenario())
+    assert (stats["running"], stats["queued"], stats["queued_users"]) == (0, 0, 0)
+
+
+def test_full_queue_is_rejected_with_a_retry_hint():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold(user_id):
+            async with scheduler.slot("nifi", user_id, "list_nifi_objects"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold("alice"))]
+        await _settle()
+        tasks.append(asyncio.create_task(hold("bob")))
+        await _settle()
+        with pytest.raises(SchedulerOverloaded) as excinfo:
+            scheduler.check_capacity("nifi", "carol", "list_nifi_objects")
+        # Other servers are scheduled independently
+        scheduler.check_capacity("other-nifi", "carol", "list_nifi_objects")
+        release.set()
+        await asyncio.gather(*tasks)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.retry_after >= 1
@@ -0,0 +1,76 @@
+import asyncio
+import stat
+
+import pytest
+
+from nifi_mcp_server import shared_cache
+from nifi_mcp_server.shared_cache import SharedCache
+
+
+@pytest.fixture(autouse=True)
+def _check_generations_on_every_call(monkeypatch):
+    monkeypatch.setattr(shared_cache, "DATA_VERSION_CHECK_INTERVAL_SECONDS", 0.0)
+
+
+def test_values_are_shared_between_connections(tmp_path):
+    async def scenario():
+        first, second = SharedCache(tmp_path / "cache.sqlite3"), SharedCache(tmp_path / "cache.sqlite3")
+        await first.set("processor_types", "all", [{"type": "GenerateFlowFile"}], ttl_seconds=60)
+        value = await second.get("processor_types", "all")
+        missing = await second.get("processor_types", "other")
+        first.close()
+        second.close()
+        return value, missing
+
+    assert asyncio.run(scenario()) == ([{"type": "GenerateFlowFile"}], None)
+
+
+def test_invalidation_reaches_the_other_connections_local_copy(tmp_path):
+    async def scenario():
+        first, second = SharedCache(tmp_path / "cache.sqlite3"), SharedCache(tmp_path / "cache.sqlite3")
+        await first.set("flow", "pg-1", "root", ttl_seconds=60)
+        assert await second.get("flow", "pg-1") == "root"  # now also in second's local LRU
+        await first.invalidate("flow")
+        after_invalidate = await second.get("flow", "pg-1")
+        # Entries written after the bump use the new generation and are visible again
+        await first.set("flow", "pg-1", "moved", ttl_seconds=60)
+        after_rewrite = await second.get("flow", "pg-1")
+        first.close()
+        second.close()
+        return after_invalidate, after_rewrite
+
+    assert asyncio.run(scenario()) == (None, "moved")
+
+
+def test_expired_entries_are_misses(tmp_path):
+    async def scenario():
+        cache = SharedCache(tmp_path / "cache.sqlite3")
+        await cache.set("root_pg", "nifi", "abc", ttl_seconds=0.05)
+        await asyncio.sleep(0.1)
+        value = await cache.get("root_pg", "nifi")
+        cache.close()
+        return value
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_database_is_private_to_the_owner(tmp_path):
+    path = tmp_path / "private" / "cache.sqlite3"
+
+    async def scenario():
+        cache = SharedCache(path)
+        await cache.set("token", "nifi", "secret", ttl_seconds=60)
+        cache.close()
+
+    asyncio.run(scenario())
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+
+
+def test_memory_only_cache_keeps_values_per_instance():
+    async def scenario():
+        cache, other = SharedCache(None), SharedCache(None)
+        await cache.set("root_pg", "nifi", "abc", ttl_seconds=60)
+        return await cache.get("root_pg", "nifi"), await other.get("root_pg", "nifi")
+
+    assert asyncio.run(scenario()) == ("abc", None)